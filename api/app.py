@@ -5,12 +5,16 @@ import pickle
 import sqlite3
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-import ast
 import io
-from flask import Flask, request, jsonify
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.applications import mobilenet_v2
+import sys
+import json
+import atexit
+import time
+import math
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from types import SimpleNamespace
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 
 app = Flask(__name__)
 
@@ -18,33 +22,166 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
 
-DB_PATH = os.path.join(PROJECT_ROOT, 'data', 'oven_logs.db')
+DB_PATH = os.environ.get('OVEN_DB_PATH', os.path.join(PROJECT_ROOT, 'data', 'oven_logs.db'))
 MODEL_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'models')
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 
+sys.path.append(os.path.join(PROJECT_ROOT, 'ml_model'))
+from recipe_index import RecipeNameIndex
+from feature_cache import load_feature_cache, default_sources
+from recipe_catalog import load_catalog
+from sparse_inputs import to_sparse_model, dummy_inputs, CompiledModel
+from batching import MicroBatcher
+import lite_runtime
+from components import ComponentRegistry
+from image_pipeline import ImagePipeline
+from feedback_writer import FeedbackWriter, FEEDBACK_COLUMNS
+from feedback_stats import FeedbackStats, ensure_schema as ensure_feedback_stats_schema
+from model_registry import ModelRegistry, REGISTRY_DIR
+from model_watcher import ModelWatcher
+from prediction_cache import PredictionCache
+from telemetry_store import TelemetryStore, TelemetryWriter
+from metrics import MetricsRegistry, SamplingProfiler
+from personalization import PersonalizationStore
+
+# 'keras' loads the .h5 models with TensorFlow. 'lite' loads the TFLite/NumPy
+# runtime written by ml_model/export_runtime.py and never imports TensorFlow.
+SERVING_RUNTIME = os.environ.get('OVEN_RUNTIME', 'keras')
+RUNTIME_DIR = os.path.join(MODEL_DIR, 'runtime')
+# OVEN_SPARSE_INPUTS=1 feeds ingredient/tag multi-hots to the model as
+# sparse matrices built from the recipe catalog instead of dense vectors
+# (Keras mode only; the lite runtime always takes dense inputs).
+SPARSE_INPUTS = os.environ.get('OVEN_SPARSE_INPUTS', '0') == '1' and SERVING_RUNTIME == 'keras'
+if SERVING_RUNTIME not in ('keras', 'lite'):
+    raise ValueError(f"Unknown OVEN_RUNTIME '{SERVING_RUNTIME}', expected 'keras' or 'lite'.")
+
+# Keras mode serves the active version of this model registry and polls
+# it for new versions every OVEN_MODEL_WATCH_INTERVAL_S seconds
+# (0 disables hot-swapping).
+model_registry = ModelRegistry(os.environ.get('OVEN_MODEL_REGISTRY', REGISTRY_DIR))
+MODEL_WATCH_INTERVAL_S = float(os.environ.get('OVEN_MODEL_WATCH_INTERVAL_S', 10.0))
+
+# Artifacts are loaded on first use. When run as a server they are also
+# warmed in a background thread once the socket is bound; set
+# OVEN_WARM_ON_START=0 to load strictly on demand.
+WARM_ON_START = os.environ.get('OVEN_WARM_ON_START', '1') != '0'
+
+# Concurrent /predict calls are coalesced into one model.predict call.
+# Set OVEN_PREDICT_BATCH_MAX_SIZE=1 to disable micro-batching.
+PREDICT_BATCH_MAX_SIZE = int(os.environ.get('OVEN_PREDICT_BATCH_MAX_SIZE', 32))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.environ.get('OVEN_PREDICT_BATCH_MAX_WAIT_MS', 5.0))
+# A /predict waiting longer than this on the batcher gets a 503.
+PREDICT_BATCH_TIMEOUT_S = float(os.environ.get('OVEN_PREDICT_BATCH_TIMEOUT_S', 10.0))
+# Single predictions are cached per (model version, recipe, sensor bucket).
+# Readings are snapped to OVEN_CACHE_TEMP_STEP / OVEN_CACHE_HUMIDITY_STEP
+# wide buckets; OVEN_PREDICTION_CACHE_SIZE=0 disables the cache.
+PREDICTION_CACHE_SIZE = int(os.environ.get('OVEN_PREDICTION_CACHE_SIZE', 4096))
+PREDICTION_CACHE_TTL_S = float(os.environ.get('OVEN_PREDICTION_CACHE_TTL_S', 3600.0))
+CACHE_TEMP_STEP = float(os.environ.get('OVEN_CACHE_TEMP_STEP', 0.5))
+CACHE_HUMIDITY_STEP = float(os.environ.get('OVEN_CACHE_HUMIDITY_STEP', 1.0))
+# A /predict for a name that only matches partially or fuzzily lists up
+# to this many other candidate recipes in 'alternatives'.
+NAME_ALTERNATIVES = int(os.environ.get('OVEN_NAME_ALTERNATIVES', 5))
+# /predict_batch runs the model on chunks of this many rows at a time.
+BULK_PREDICT_CHUNK_SIZE = int(os.environ.get('OVEN_BULK_PREDICT_CHUNK_SIZE', 1024))
+# Image uploads are decoded/resized on this many threads and classified
+# in batches of CV_BATCH_SIZE; CLASSIFY_TOP_K classes are returned.
+IMAGE_PREP_WORKERS = int(os.environ.get('OVEN_IMAGE_PREP_WORKERS', 4))
+CV_BATCH_SIZE = int(os.environ.get('OVEN_CV_BATCH_SIZE', 32))
+CLASSIFY_TOP_K = int(os.environ.get('OVEN_CLASSIFY_TOP_K', 3))
+# /feedback rows are group-committed by a write-behind thread. With
+# OVEN_FEEDBACK_ACK=commit (default) a request is acknowledged once its
+# row is committed; with 'queued' as soon as it is in the write queue.
+FEEDBACK_ACK = os.environ.get('OVEN_FEEDBACK_ACK', 'commit')
+FEEDBACK_ACK_TIMEOUT_S = float(os.environ.get('OVEN_FEEDBACK_ACK_TIMEOUT_S', 5.0))
+FEEDBACK_BATCH_MAX_SIZE = int(os.environ.get('OVEN_FEEDBACK_BATCH_MAX_SIZE', 256))
+FEEDBACK_BATCH_MAX_WAIT_MS = float(os.environ.get('OVEN_FEEDBACK_BATCH_MAX_WAIT_MS', 0.0))
+
+# Oven sensor telemetry: hourly partitions sharded by oven, raw readings
+# kept OVEN_TELEMETRY_RAW_RETENTION_H hours, per-minute rollups
+# OVEN_TELEMETRY_ROLLUP_RETENTION_H hours.
+TELEMETRY_DIR = os.environ.get('OVEN_TELEMETRY_DIR', os.path.join(DATA_DIR, 'telemetry'))
+TELEMETRY_SHARDS = int(os.environ.get('OVEN_TELEMETRY_SHARDS', 16))
+TELEMETRY_RAW_RETENTION_H = int(os.environ.get('OVEN_TELEMETRY_RAW_RETENTION_H', 48))
+TELEMETRY_ROLLUP_RETENTION_H = int(os.environ.get('OVEN_TELEMETRY_ROLLUP_RETENTION_H', 24 * 90))
+# Readings stamped more than OVEN_TELEMETRY_MAX_CLOCK_SKEW_S seconds in the
+# future, or older than the rollup retention, are rejected (e.g. a
+# millisecond timestamp would otherwise create a partition far in the future).
+TELEMETRY_MAX_CLOCK_SKEW_S = float(os.environ.get('OVEN_TELEMETRY_MAX_CLOCK_SKEW_S', 300))
+# Streamed (NDJSON) uploads are handed to the writer in chunks of this many readings.
+TELEMETRY_CHUNK_SIZE = int(os.environ.get('OVEN_TELEMETRY_CHUNK_SIZE', 5000))
+# Per-stage latency histograms and counters are served at /metrics.
+# OVEN_PROFILER=1 additionally enables /debug/profiler, a sampling
+# profiler that can be started and stopped in the running server.
+PROFILER_ENABLED = os.environ.get('OVEN_PROFILER', '0') == '1'
+PROFILER_INTERVAL_MS = float(os.environ.get('OVEN_PROFILER_INTERVAL_MS', 5.0))
+# Requests with a user_id or oven_id get per-profile corrections learned
+# online from that profile's /feedback, on top of the model's prediction.
+# At most OVEN_PERSONALIZATION_MAX_PROFILES profiles (0 disables it) of
+# OVEN_PERSONALIZATION_MAX_DISHES dishes each are kept in memory; on
+# load they are rebuilt from the last OVEN_PERSONALIZATION_REPLAY_ROWS
+# feedback rows.
+PERSONALIZATION_MAX_PROFILES = int(os.environ.get('OVEN_PERSONALIZATION_MAX_PROFILES', 100000))
+PERSONALIZATION_MAX_DISHES = int(os.environ.get('OVEN_PERSONALIZATION_MAX_DISHES', 32))
+PERSONALIZATION_DISH_RATE = float(os.environ.get('OVEN_PERSONALIZATION_DISH_RATE', 0.5))
+PERSONALIZATION_PROFILE_RATE = float(os.environ.get('OVEN_PERSONALIZATION_PROFILE_RATE', 0.1))
+PERSONALIZATION_REPLAY_ROWS = int(os.environ.get('OVEN_PERSONALIZATION_REPLAY_ROWS', 100000))
+
 print(f"Project Root: {PROJECT_ROOT}")
 print(f"Model Dir: {MODEL_DIR}")
 print(f"Data Dir: {DATA_DIR}")
 print(f"DB Path: {DB_PATH}")
-try:
-    print("Loading recipe lookup data...")
-    lookup_path = os.path.join(DATA_DIR, 'processed', 'processed_oven_recipes_v2.csv')
-    recipe_lookup = pd.read_csv(lookup_path)
-    
-    recipe_lookup['ingredient_ids'] = recipe_lookup['ingredient_ids'].apply(ast.literal_eval)
-    recipe_lookup['tags'] = recipe_lookup['tags'].apply(ast.literal_eval)
-    
-    recipe_lookup.set_index('name', inplace=True)
-    print(f"Loaded {len(recipe_lookup)} recipes into lookup table.")
 
-except Exception as e:
-    print(f"CRITICAL ERROR: Could not load recipe lookup data. {e}")
-    recipe_lookup = None
 
+metrics = MetricsRegistry()
+http_request_seconds = metrics.histogram('http_request_seconds', "Request latency by endpoint and status.")
+http_requests_total = metrics.counter('http_requests_total', "Requests by endpoint and status.")
+profiler = SamplingProfiler()
+
+
+def load_recipes():
+    """
+    Recipe name index plus either the memory-mapped feature cache or,
+    if there is no up-to-date cache, the binary recipe catalog. Sparse
+    inputs always come from the catalog.
+    """
+    feature_cache = None
+    if not SPARSE_INPUTS:
+        feature_cache = load_feature_cache(sources=default_sources())
+    if feature_cache is not None:
+        print(f"Loaded feature cache with {len(feature_cache)} encoded recipes.")
+        return SimpleNamespace(feature_cache=feature_cache, catalog=None,
+                               index=RecipeNameIndex(feature_cache.names))
+
+    catalog = load_catalog()
+    print(f"Loaded recipe catalog with {len(catalog)} recipes.")
+    return SimpleNamespace(feature_cache=None, catalog=catalog,
+                           index=RecipeNameIndex(catalog.names))
+
+
+def load_predictor(version=None):
+    """
+    The V2 prediction model and its preprocessors.
+
+    In Keras mode the model comes from the model registry's active
+    version (or `version`), falling back to oven_predictor_v2.h5 when the
+    registry is empty.
+    """
+    if SERVING_RUNTIME == 'lite':
+        print(f"Loading lite predictor from {RUNTIME_DIR}...")
+        return SimpleNamespace(version='lite', **lite_runtime.load_predictor(RUNTIME_DIR))
 
-try:
-    print("Loading AI v2 model and preprocessors...")
-    model_path = os.path.join(MODEL_DIR, 'oven_predictor_v2.h5')
+    import tensorflow as tf
+
+    version = version or model_registry.active_version()
+    if version is not None:
+        model_registry.verify(version)
+        model_path = model_registry.model_path(version)
+    else:
+        version = 'base'
+        model_path = os.path.join(MODEL_DIR, 'oven_predictor_v2.h5')
+
+    print(f"Loading AI model {version} ({os.path.basename(model_path)}) and preprocessors...")
     model = tf.keras.models.load_model(model_path, compile=False)
     
     with open(os.path.join(MODEL_DIR, 'name_encoder_v2.pkl'), 'rb') as f:
@@ -57,27 +194,161 @@ try:
         ingredient_binarizer = pickle.load(f)
     with open(os.path.join(MODEL_DIR, 'tag_binarizer.pkl'), 'rb') as f:
         tag_binarizer = pickle.load(f)
-        
-    print("All V2 models loaded successfully.")
 
-    print("Loading CV model...")
-    cv_model_path = os.path.join(MODEL_DIR, 'dish_classifier_v1.h5')
-    cv_model = tf.keras.models.load_model(cv_model_path, compile=False)
+    if SPARSE_INPUTS:
+        model = CompiledModel(to_sparse_model(model))
+
+    return SimpleNamespace(version=version, model=model, name_encoder=name_encoder, env_scaler=env_scaler,
+                           output_scaler=output_scaler, ingredient_binarizer=ingredient_binarizer,
+                           tag_binarizer=tag_binarizer)
+
+
+def warm_predictor(predictor):
+    """
+    Runs one dummy prediction so the first real request does not pay for
+    graph tracing.
+    """
+    predictor.model.predict(dummy_inputs(predictor.model), verbose=0)
+
+
+def load_classifier():
+    """
+    The MobileNetV2 dish classifier and the Food-101 class names.
+    """
+    if SERVING_RUNTIME == 'lite':
+        print(f"Loading lite CV model from {RUNTIME_DIR}...")
+        cv_model = lite_runtime.load_classifier(RUNTIME_DIR)
+    else:
+        import tensorflow as tf
+
+        print("Loading CV model...")
+        cv_model_path = os.path.join(MODEL_DIR, 'dish_classifier_v1.h5')
+        cv_model = tf.keras.models.load_model(cv_model_path, compile=False)
     
     class_names_path = os.path.join(MODEL_DIR, 'food_101_class_names.txt')
     with open(class_names_path, 'r') as f:
         food_101_class_names = [line.strip() for line in f.readlines()]
-    print("CV model loaded.")
 
-except Exception as e:
-    print(f"CRITICAL ERROR: Could not load models. {e}")
-    model = None
-    cv_model = None
+    return SimpleNamespace(model=cv_model, class_names=food_101_class_names)
+
+
+def load_feedback_writer():
+    """
+    The write-behind feedback writer, with its persistent DB connection.
+    """
+    init_db()
+    writer = FeedbackWriter(DB_PATH, max_batch_size=FEEDBACK_BATCH_MAX_SIZE,
+                            max_wait_ms=FEEDBACK_BATCH_MAX_WAIT_MS, metrics=metrics,
+                            columns=FEEDBACK_COLUMNS + ('profile_id',))
+    # Flush queued feedback on a clean shutdown.
+    atexit.register(writer.close)
+    return writer
+
+
+def load_feedback_stats():
+    """
+    Read-only per-dish and time-window feedback aggregates.
+    """
+    init_db()
+    return FeedbackStats(DB_PATH)
+
+
+def load_personalization():
+    """
+    The per-profile correction store, rebuilt from the profile feedback
+    among the last PERSONALIZATION_REPLAY_ROWS feedback rows.
+    """
+    init_db()
+    store = PersonalizationStore(max_profiles=PERSONALIZATION_MAX_PROFILES,
+                                 max_dishes=PERSONALIZATION_MAX_DISHES,
+                                 dish_rate=PERSONALIZATION_DISH_RATE,
+                                 profile_rate=PERSONALIZATION_PROFILE_RATE)
+    conn = sqlite3.connect(f'file:{DB_PATH}?mode=ro', uri=True)
+    try:
+        last_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM feedback_log").fetchone()[0]
+        rows = conn.execute(
+            "SELECT profile_id, dish_name, predicted_temp, predicted_duration, user_feedback "
+            "FROM feedback_log WHERE id > ? AND profile_id IS NOT NULL ORDER BY id",
+            (last_id - PERSONALIZATION_REPLAY_ROWS,)).fetchall()
+    finally:
+        conn.close()
+
+    positions = {}
+    for profile_id, dish_name, served_temp, served_duration, value in rows:
+        if dish_name not in positions:
+            try:
+                positions[dish_name] = resolve_dish(dish_name, log=False).position
+            except Exception:
+                positions[dish_name] = None
+        if positions[dish_name] is not None and served_temp is not None and served_duration is not None:
+            store.update(profile_id, positions[dish_name], served_temp, served_duration, value)
+    print(f"Personalization: replayed {len(rows)} feedback rows into {store.stats()['profiles']} profiles.")
+    return store
+
+
+def load_telemetry_writer():
+    """
+    Telemetry store plus its background writer.
+    """
+    store = TelemetryStore(TELEMETRY_DIR, n_shards=TELEMETRY_SHARDS,
+                           raw_retention_h=TELEMETRY_RAW_RETENTION_H,
+                           rollup_retention_h=TELEMETRY_ROLLUP_RETENTION_H)
+    writer = TelemetryWriter(store)
+    atexit.register(writer.close)
+    return writer
+
+
+components = ComponentRegistry()
+components.register('recipes', load_recipes)
+components.register('predictor', load_predictor)
+# Not required for readiness: /predict can take traffic while the CV model loads.
+components.register('classifier', load_classifier, required=False)
+components.register('feedback_writer', load_feedback_writer, required=False)
+components.register('feedback_stats', load_feedback_stats, required=False)
+if PERSONALIZATION_MAX_PROFILES > 0:
+    components.register('personalization', load_personalization, required=False)
+components.register('telemetry', load_telemetry_writer, required=False)
+
+# Swaps in new registry versions; polling starts with start_model_watcher().
+model_watcher = ModelWatcher(model_registry, components['predictor'], load_predictor,
+                             warm_predictor, MODEL_WATCH_INTERVAL_S)
+
+
+def start_model_watcher():
+    """
+    Starts hot-swapping the predictor when the registry's active version
+    changes. Only Keras mode serves registry models.
+    """
+    if SERVING_RUNTIME == 'keras' and MODEL_WATCH_INTERVAL_S > 0:
+        model_watcher.start()
+    return model_watcher
+
+
+_db_init_lock = threading.Lock()
+_db_initialized = False
+
 
 def init_db():
+    """
+    Creates or migrates the feedback database. Every component that uses
+    the database calls this; the work runs once per process (forked
+    workers inherit it from the master).
+    """
+    global _db_initialized
+    with _db_init_lock:
+        if _db_initialized:
+            return
+        _init_db()
+        _db_initialized = True
+
+
+def _init_db():
     print(f"Initializing database at {DB_PATH}")
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     conn = sqlite3.connect(DB_PATH)
+    # WAL lets readers (the reinforcement engine, analytics) run while the
+    # API is writing; the setting is persistent in the database file.
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS feedback_log (
@@ -88,62 +359,318 @@ def init_db():
         room_humidity REAL,
         predicted_temp REAL,
         predicted_duration REAL,
-        user_feedback INTEGER
+        user_feedback INTEGER,
+        profile_id TEXT
     )
     ''')
+    # Databases created before personalization lack the profile column.
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(feedback_log)")]
+    if 'profile_id' not in columns:
+        cursor.execute("ALTER TABLE feedback_log ADD COLUMN profile_id TEXT")
     conn.commit()
+    # Dish/timestamp indexes and the trigger-maintained aggregates behind /stats.
+    ensure_feedback_stats_schema(conn)
     conn.close()
     print("Database initialized.")
 
 
-def make_prediction_v2(dish_name, room_temp, room_humidity):
+def encode_recipes(positions):
     """
-    Uses the loaded V2 models to make a single smart prediction.
+    Returns the (name, ingredients, tags) model inputs for the given
+    recipe row positions, from the feature cache when available. With
+    SPARSE_INPUTS the ingredient and tag inputs are scipy CSR matrices.
     """
-    if model is None:
-        raise Exception("Model is not loaded.")
-    if recipe_lookup is None:
-        raise Exception("Recipe lookup data is not loaded.")
-        
+    recipes = components.get('recipes')
+    if recipes.feature_cache is not None:
+        return recipes.feature_cache.gather(positions)
+
+    predictor = components.get('predictor')
+    catalog = recipes.catalog
+    names_encoded = predictor.name_encoder.transform([[catalog.names[p]] for p in positions])
+    multi_hot = catalog.sparse_multi_hot if SPARSE_INPUTS else catalog.multi_hot
+    ingr_encoded = multi_hot('ingredients', positions, predictor.ingredient_binarizer.classes_)
+    tags_encoded = multi_hot('tags', positions, predictor.tag_binarizer.classes_)
+    return names_encoded, ingr_encoded, tags_encoded
+
+
+def resolve_dish(dish_name, log=True):
+    """
+    Resolves a user-supplied dish name to a recipe in the lookup table.
+    """
+    recipe_index = components.get('recipes').index
+
     query_name = dish_name.strip().lower()
     if not query_name:
         raise Exception("Dish name is empty.")
 
-    possible_matches = recipe_lookup[recipe_lookup.index.str.lower().str.contains(query_name)]
-    
-    if possible_matches.empty:
+    match = recipe_index.resolve(query_name)
+    if match is None:
+        raise Exception(f"Dish '{dish_name}' not found in recipe database.")
+
+    if log:
+        print(f"User query '{dish_name}' matched to recipe: {match.name}")
+    return match
+
+
+def match_details(dish_name, match):
+    """
+    Describes how a dish name was resolved, so a caller can tell when it
+    got a substring or fuzzy match rather than the dish it asked for.
+    """
+    alternatives = []
+    if match.kind != 'exact' and NAME_ALTERNATIVES > 0:
+        recipe_index = components.get('recipes').index
+        candidates = recipe_index.search(dish_name, limit=NAME_ALTERNATIVES + 1)
+        alternatives = [c.name for c in candidates if c.position != match.position][:NAME_ALTERNATIVES]
+    return {
+        'matched_name': match.name,
+        'match_kind': match.kind,
+        'alternatives': alternatives,
+    }
+
+
+def predict_from_positions(positions, room_temps, room_humidities):
+    """
+    Runs the V2 model once for a batch of resolved recipes.
+    Returns an (N, 2) array of [oven_temp, oven_duration].
+    """
+    predictor = components.get('predictor')
+    with metrics.timer('predict.encode'):
+        names_encoded, ingr_encoded, tags_encoded = encode_recipes(positions)
+    with metrics.timer('predict.env_scale'):
+        env_scaled = predictor.env_scaler.transform(np.column_stack([room_temps, room_humidities]))
+
+    X_pred_list = [names_encoded, env_scaled, ingr_encoded, tags_encoded]
+
+    with metrics.timer('predict.model'):
+        scaled_pred_temp, scaled_pred_duration = predictor.model.predict(X_pred_list, verbose=0)
+
+    with metrics.timer('predict.inverse_transform'):
+        scaled_pred = np.hstack([scaled_pred_temp, scaled_pred_duration])
+        return predictor.output_scaler.inverse_transform(scaled_pred)
+
+
+def _predict_batch(items):
+    positions, room_temps, room_humidities = zip(*items)
+    final_prediction = predict_from_positions(list(positions), room_temps, room_humidities)
+    return [(row[0], row[1]) for row in final_prediction]
+
+
+def profile_key(data):
+    """
+    The personalization profile of a request: 'user:<user_id>' or else
+    'oven:<oven_id>', or None without either (or with personalization off).
+    """
+    if PERSONALIZATION_MAX_PROFILES <= 0:
+        return None
+    for field in ('user_id', 'oven_id'):
+        value = data.get(field)
+        if value is not None and str(value) != '':
+            return f"{field[:-3]}:{value}"
+    return None
+
+
+def personalize(profile_id, position, prediction):
+    """A model prediction with the profile's learned corrections applied."""
+    if profile_id is None:
+        return prediction
+    with metrics.timer('predict.personalize'):
+        return components.get('personalization').adjust(profile_id, position, prediction)
+
+
+def finite_float(data, field, default=None):
+    """data[field] (or `default` if absent) as a finite float; ValueError otherwise."""
+    value = data.get(field, default)
+    if value is None:
+        raise ValueError(f"'{field}' is required.")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{field}' must be a number.")
+    if not math.isfinite(value):
+        raise ValueError(f"'{field}' must be finite.")
+    return value
+
+
+def feedback_row(data):
+    """
+    The feedback_log row (FeedbackWriter column order, then the profile)
+    for a /feedback body, checked and coerced on the request thread: a
+    malformed row must not fail the group commit it shares with other
+    users' ratings. Raises ValueError.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Body must be a JSON object.")
+    dish_name = data.get('dish_name')
+    if not isinstance(dish_name, str) or not dish_name.strip():
+        raise ValueError("'dish_name' must be a non-empty string.")
+    user_feedback = data.get('user_feedback')
+    if isinstance(user_feedback, bool) or user_feedback not in (-1, 0, 1):
+        raise ValueError("'user_feedback' must be 1 (perfect), 0 (undercooked) or -1 (overcooked).")
+    return (dish_name, finite_float(data, 'room_temp', 20.0), finite_float(data, 'room_humidity', 50.0),
+            finite_float(data, 'predicted_temp'), finite_float(data, 'predicted_duration'),
+            int(user_feedback), profile_key(data))
+
+
+def load_personalization_for(profile_id):
+    """
+    Loads the personalization store before a profile's rating is logged:
+    its first load replays feedback_log, which would otherwise count a
+    row that was just committed twice. Failures are left to
+    learn_from_feedback().
+    """
+    if profile_id is None or components.is_ready('personalization'):
+        return
+    try:
+        components.get('personalization')
+    except Exception:
+        pass
+
+
+def learn_from_feedback(row, future):
+    """
+    Updates the profile's corrections from one feedback_row() once its
+    write is committed, i.e. when `future` (from the feedback writer)
+    resolves without error; a rating that is never logged is never
+    learned, and a client retrying a timed-out write is only counted for
+    the rows that commit. The dish lookup runs here, the O(1) update in
+    the writer's callback. Never raises: a failure here must not turn a
+    queued rating into an error that the client would retry, logging it
+    twice. The profile catches up from feedback_log on the next restart.
+    """
+    dish_name, _, _, predicted_temp, predicted_duration, user_feedback, profile_id = row
+    if profile_id is None:
+        return
+    try:
+        position = resolve_dish(dish_name, log=False).position
+        store = components.get('personalization')
+    except Exception as e:
+        print(f"Personalization update for {profile_id} skipped: {e}")
+        return
+
+    def apply(done):
+        if done.exception() is not None:
+            return
         try:
-            recipe_data = recipe_lookup.loc[query_name]
-        except KeyError:
-            raise Exception(f"Dish '{dish_name}' not found in recipe database.")
-    else:
-        recipe_data = possible_matches.iloc[0]
+            store.update(profile_id, position, predicted_temp, predicted_duration, user_feedback)
+        except Exception as e:
+            print(f"Personalization update for {profile_id} skipped: {e}")
 
-    print(f"User query '{dish_name}' matched to recipe: {recipe_data.name}")
+    future.add_done_callback(apply)
 
-    sample_name_encoded = name_encoder.transform([[recipe_data.name]]) 
-    sample_env = [[room_temp, room_humidity]]
-    sample_env_scaled = env_scaler.transform(sample_env)
-    sample_ingredients = [recipe_data['ingredient_ids']]
-    sample_ingr_encoded = ingredient_binarizer.transform(sample_ingredients)
-    sample_tags = [recipe_data['tags']]
-    sample_tags_encoded = tag_binarizer.transform(sample_tags)
 
-    X_pred_list = [sample_name_encoded, sample_env_scaled, sample_ingr_encoded, sample_tags_encoded]
+def make_prediction_v2(dish_name, room_temp, room_humidity, profile_id=None, match=None):
+    """
+    Uses the loaded V2 models to make a single smart prediction, with
+    the corrections of `profile_id` (see profile_key()) if given. Pass
+    `match` if the dish was already resolved with resolve_dish().
+    """
+    predictor = components.get('predictor')
+    # Checked here, on the request thread: a bad value inside a coalesced
+    # batch would fail every request in it.
+    room_temp = finite_float({'room_temp': room_temp}, 'room_temp')
+    room_humidity = finite_float({'room_humidity': room_humidity}, 'room_humidity')
 
-    scaled_pred_temp, scaled_pred_duration = model.predict(X_pred_list)
+    if match is None:
+        with metrics.timer('predict.resolve_dish'):
+            match = resolve_dish(dish_name)
 
-    scaled_pred = np.array([[scaled_pred_temp[0][0], scaled_pred_duration[0][0]]])
-    final_prediction = output_scaler.inverse_transform(scaled_pred)
-    
-    return final_prediction[0][0], final_prediction[0][1]
+    version = getattr(predictor, 'version', None)
+    if prediction_cache is not None:
+        with metrics.timer('predict.cache_lookup'):
+            room_temp, room_humidity = prediction_cache.quantize(room_temp, room_humidity)
+            cached = prediction_cache.get(version, match.position, room_temp, room_humidity)
+        if cached is not None:
+            return personalize(profile_id, match.position, cached)
+
+    if predict_batcher is not None:
+        # Queueing plus the batched model call, as seen by this request.
+        with metrics.timer('predict.batched'):
+            prediction = predict_batcher((match.position, room_temp, room_humidity),
+                                         timeout=PREDICT_BATCH_TIMEOUT_S)
+    else:
+        final_prediction = predict_from_positions([match.position], [room_temp], [room_humidity])
+        prediction = (final_prediction[0][0], final_prediction[0][1])
+
+    # Skip caching if the model was swapped while this request ran.
+    if prediction_cache is not None and components.get('predictor') is predictor:
+        prediction_cache.put(version, match.position, room_temp, room_humidity, prediction)
+    return personalize(profile_id, match.position, prediction)
 
 def load_and_prep_image(img_bytes):
+    if SERVING_RUNTIME == 'lite':
+        return lite_runtime.load_and_prep_image(img_bytes)
+
+    from tensorflow.keras.preprocessing import image
+    from tensorflow.keras.applications import mobilenet_v2
+
     img = image.load_img(io.BytesIO(img_bytes), target_size=(224, 224))
     img_array = image.img_to_array(img)
     img_array_expanded = np.expand_dims(img_array, axis=0)
     return mobilenet_v2.preprocess_input(img_array_expanded)
 
+image_pipeline = ImagePipeline(load_and_prep_image, max_workers=IMAGE_PREP_WORKERS,
+                               batch_size=CV_BATCH_SIZE, metrics=metrics)
+
+prediction_cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(
+        max_entries=PREDICTION_CACHE_SIZE,
+        ttl_s=PREDICTION_CACHE_TTL_S,
+        temp_step=CACHE_TEMP_STEP,
+        humidity_step=CACHE_HUMIDITY_STEP,
+    )
+
+def start_predict_batcher():
+    """
+    (Re)creates the /predict micro-batcher. Threads do not survive fork(),
+    so a preforked worker calls this again in the child.
+    """
+    global predict_batcher
+    predict_batcher = None
+    if PREDICT_BATCH_MAX_SIZE > 1:
+        predict_batcher = MicroBatcher(
+            _predict_batch,
+            max_batch_size=PREDICT_BATCH_MAX_SIZE,
+            max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+            name='predict-batcher',
+        )
+    return predict_batcher
+
+start_predict_batcher()
+
+
+def _collect_batcher_stats():
+    return predict_batcher.stats() if predict_batcher is not None else None
+
+
+def _collect_component_stats(name):
+    return lambda: components.get(name).stats() if components.is_ready(name) else None
+
+
+metrics.register_collector('predict_batcher', _collect_batcher_stats)
+if prediction_cache is not None:
+    metrics.register_collector('prediction_cache', prediction_cache.stats)
+metrics.register_collector('feedback_writer', _collect_component_stats('feedback_writer'))
+metrics.register_collector('telemetry', _collect_component_stats('telemetry'))
+metrics.register_collector('personalization', _collect_component_stats('personalization'))
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Streamed responses (/predict_batch) are timed to the first byte.
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = str(response.status_code)
+        http_request_seconds.observe(time.perf_counter() - start, endpoint=endpoint, status=status)
+        http_requests_total.inc(endpoint=endpoint, status=status)
+    return response
+
 @app.route('/')
 def home():
     return "Smart Oven AIoT API (V2 - Smart) is running."
@@ -153,51 +680,398 @@ def predict():
     """
     Endpoint to get a new cooking prediction (V2).
     """
-    if model is None:
-        return jsonify({"error": "Model is not loaded"}), 500
+    try:
+        components.get('predictor')
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
         
     try:
         data = request.get_json()
         dish_name = data['dish_name']
-        room_temp = data.get('room_temp', 20.0)
-        room_humidity = data.get('room_humidity', 50.0)
+        room_temp = finite_float(data, 'room_temp', 20.0)
+        room_humidity = finite_float(data, 'room_humidity', 50.0)
 
-        pred_temp, pred_duration = make_prediction_v2(dish_name, room_temp, room_humidity)
+        with metrics.timer('predict.resolve_dish'):
+            match = resolve_dish(dish_name)
+        pred_temp, pred_duration = make_prediction_v2(dish_name, room_temp, room_humidity,
+                                                      profile_key(data), match=match)
         
-        return jsonify({
-            'predicted_temp': int(round(pred_temp, 0)),
-            'predicted_duration': int(round(pred_duration, 0))
-        })
+        return jsonify(dict(
+            match_details(dish_name, match),
+            predicted_temp=int(round(pred_temp, 0)),
+            predicted_duration=int(round(pred_duration, 0)),
+        ))
         
+    except FutureTimeoutError:
+        return jsonify({"error": "Prediction timed out; try again."}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+def parse_bulk_rows(req):
+    """
+    Reads the /predict_batch body: a JSON array, or NDJSON with one
+    object per line. An NDJSON line that is not valid JSON becomes an
+    Exception in its slot, so only that row fails.
+    """
+    body = req.get_data(as_text=True)
+    if req.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                rows.append(Exception(f"Invalid JSON: {e}"))
+        return rows
+    rows = json.loads(body)
+    if not isinstance(rows, list):
+        raise Exception("Request body must be a JSON array or NDJSON.")
+    return rows
+
+
+def predict_bulk(rows, chunk_size=BULK_PREDICT_CHUNK_SIZE):
+    """
+    Yields one result dict per input row, in input order.
+
+    All dish names are resolved up front (each distinct name once), then
+    the valid rows are encoded and predicted chunk by chunk with a single
+    model call per chunk. Bad rows get an 'error' entry instead of
+    failing the whole batch.
+    """
+    resolved = {}
+    parsed = []
+    for i, row in enumerate(rows):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise Exception("Row must be a JSON object.")
+            dish_name = row['dish_name']
+            if not isinstance(dish_name, str):
+                raise Exception("dish_name must be a string.")
+            room_temp = finite_float(row, 'room_temp', 20.0)
+            room_humidity = finite_float(row, 'room_humidity', 50.0)
+
+            key = dish_name.strip().lower()
+            if key not in resolved:
+                try:
+                    resolved[key] = resolve_dish(dish_name, log=False)
+                except Exception as e:
+                    resolved[key] = e
+            match = resolved[key]
+            if isinstance(match, Exception):
+                raise match
+            parsed.append((i, match, room_temp, room_humidity, None, profile_key(row)))
+        except KeyError as e:
+            parsed.append((i, None, None, None, f"Missing field {e}", None))
+        except Exception as e:
+            parsed.append((i, None, None, None, str(e), None))
+
+    for start in range(0, len(parsed), chunk_size):
+        chunk = parsed[start:start + chunk_size]
+        valid = [entry for entry in chunk if entry[4] is None]
+
+        predictions = {}
+        chunk_error = None
+        if valid:
+            try:
+                final_prediction = predict_from_positions(
+                    [entry[1].position for entry in valid],
+                    [entry[2] for entry in valid],
+                    [entry[3] for entry in valid],
+                )
+                predictions = {entry[0]: pred for entry, pred in zip(valid, final_prediction)}
+            except Exception as e:
+                chunk_error = str(e)
+
+        for i, match, _, _, error, profile_id in chunk:
+            if error is None and chunk_error is not None:
+                error = chunk_error
+            if error is not None:
+                yield {'index': i, 'error': error}
+                continue
+            pred_temp, pred_duration = personalize(profile_id, match.position, predictions[i])
+            yield {
+                'index': i,
+                'matched_recipe': match.name,
+                'predicted_temp': int(round(pred_temp, 0)),
+                'predicted_duration': int(round(pred_duration, 0)),
+            }
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """
+    Bulk prediction endpoint. Accepts a JSON array or NDJSON of
+    {dish_name, room_temp, room_humidity} rows (optionally with user_id
+    or oven_id) and streams back one NDJSON result line per row, in
+    input order.
+    """
+    try:
+        components.get('predictor')
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    try:
+        rows = parse_bulk_rows(request)
+    except Exception as e:
+        return jsonify({"error": f"Could not parse request body: {e}"}), 400
+
+    def generate():
+        for result in predict_bulk(rows):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/metrics/batching')
+def batching_metrics():
+    """
+    Queue depth and batch-size histograms of the /predict micro-batcher.
+    """
+    if predict_batcher is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(predict_batcher.stats(), enabled=True))
+
+@app.route('/metrics/cache')
+def cache_metrics():
+    """
+    Size and hit/miss/eviction counters of the /predict cache.
+    """
+    if prediction_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(prediction_cache.stats(), enabled=True))
+
 @app.route('/feedback', methods=['POST'])
 def feedback():
     """
-    Endpoint to log user feedback for reinforcement learning.
+    Endpoint to log user feedback for reinforcement learning. With a
+    user_id or oven_id, the rating also updates that profile's
+    personalization.
     """
     try:
         data = request.get_json()
-        
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO feedback_log (
-                dish_name, room_temp, room_humidity, 
-                predicted_temp, predicted_duration, user_feedback
-            ) VALUES (?, ?, ?, ?, ?, ?)
-        ''', (data['dish_name'], data.get('room_temp', 20.0), 
-              data.get('room_humidity', 50.0), data['predicted_temp'], 
-              data['predicted_duration'], data['user_feedback']))
-        conn.commit()
-        conn.close()
-        
-        return jsonify({"status": "success", "message": "Feedback logged."})
+        row = feedback_row(data)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        load_personalization_for(row[-1])
+        future = components.get('feedback_writer').submit(row)
+        learn_from_feedback(row, future)
+        if FEEDBACK_ACK == 'commit':
+            with metrics.timer('feedback.ack_wait'):
+                future.result(timeout=FEEDBACK_ACK_TIMEOUT_S)
+        else:
+            return jsonify({"status": "queued", "message": "Feedback queued."}), 202
+    except FutureTimeoutError:
+        return jsonify({"status": "queued", "message": "Feedback queued; commit is delayed."}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
+    return jsonify({"status": "success", "message": "Feedback logged."})
+
+@app.route('/metrics/feedback')
+def feedback_metrics():
+    """
+    Queue depth, group-commit sizes and throughput of the feedback writer.
+    """
+    if not components.is_ready('feedback_writer'):
+        return jsonify({"enabled": False})
+    return jsonify(dict(components.get('feedback_writer').stats(), enabled=True))
+
+@app.route('/personalization', methods=['GET', 'DELETE'])
+def personalization_profile():
+    """
+    GET: the learned corrections of one profile (user_id= or oven_id=),
+    per dish by recipe name. DELETE: forgets them.
+    """
+    profile_id = profile_key(request.args)
+    if profile_id is None:
+        return jsonify({"error": "user_id or oven_id is required (and personalization enabled)."}), 400
+    try:
+        store = components.get('personalization')
+        if request.method == 'DELETE':
+            return jsonify({"profile_id": profile_id, "deleted": store.reset(profile_id)})
+        profile = store.profile(profile_id)
+        if profile is None:
+            return jsonify({"error": f"No personalization for '{profile_id}'."}), 404
+        names = components.get('recipes').index.names
+        profile['dishes'] = {names[position]: dish for position, dish in profile['dishes'].items()}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(dict(profile, profile_id=profile_id))
+
+@app.route('/metrics/personalization')
+def personalization_metrics():
+    """
+    Profile and per-dish entry counts, updates and applied corrections.
+    """
+    if not components.is_ready('personalization'):
+        return jsonify({"enabled": False})
+    return jsonify(dict(components.get('personalization').stats(), enabled=True))
+
+@app.route('/stats')
+def feedback_stats():
+    """
+    Feedback counts by value, perfect rate, mean predicted temperature
+    and duration and mean correction, for one dish (dish=, exact name as
+    logged) or all dishes, between start and end (epoch seconds, end
+    exclusive; default: all time). bucket=hour adds an hourly "series".
+    """
+    try:
+        dish_name = request.args.get('dish')
+        start = float(request.args['start']) if 'start' in request.args else None
+        end = float(request.args['end']) if 'end' in request.args else None
+        if start is not None and end is not None and start >= end:
+            raise Exception("start must be before end.")
+        bucket = request.args.get('bucket')
+        if bucket not in (None, 'hour'):
+            raise Exception("bucket must be hour.")
+        stats = components.get('feedback_stats')
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+    with metrics.timer('stats.query'):
+        body = stats.query(dish_name, start, end)
+        if bucket == 'hour':
+            body['series'] = stats.hourly(dish_name, start, end)
+    return jsonify(body)
+
+def json_column(values):
+    """A numpy column as a JSON-safe list: NaN (not reported) becomes None."""
+    if values.dtype.kind != 'f' or np.isfinite(values).all():
+        return values.tolist()
+    column = values.astype(object)
+    column[~np.isfinite(values)] = None
+    return column.tolist()
+
+
+def submit_telemetry(rows):
+    """
+    Validates a list of reading dicts and queues the valid ones.
+    Returns (accepted, rejected).
+    """
+    now = time.time()
+    oldest = now - TELEMETRY_ROLLUP_RETENTION_H * 3600
+    newest = now + TELEMETRY_MAX_CLOCK_SKEW_S
+    columns = {'oven_ids': [], 'ts': [], 'temperature_c': [], 'humidity_percent': [],
+               'time_remaining_s': [], 'relay_on': [], 'is_cooking': []}
+    rejected = 0
+    for row in rows:
+        try:
+            oven_id = row['oven_id']
+            temperature = finite_float(row, 'temperature_c')
+            ts = float(row.get('ts', now))
+            # Missing humidity is stored as NaN and returned as null.
+            humidity = (math.nan if row.get('humidity_percent') is None
+                        else finite_float(row, 'humidity_percent'))
+            remaining = finite_float(row, 'time_remaining_s', 0)
+            relay_on = row.get('relay_on', row.get('relay_state') == 'ON')
+            is_cooking = bool(row.get('is_cooking', False))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            rejected += 1
+            continue
+        if not (oldest <= ts <= newest):
+            # Also false for a NaN ts.
+            rejected += 1
+            continue
+        columns['oven_ids'].append(oven_id)
+        columns['ts'].append(ts)
+        columns['temperature_c'].append(temperature)
+        columns['humidity_percent'].append(humidity)
+        columns['time_remaining_s'].append(remaining)
+        columns['relay_on'].append(bool(relay_on))
+        columns['is_cooking'].append(is_cooking)
+
+    if not columns['oven_ids']:
+        return 0, rejected
+    if not components.get('telemetry').submit(**columns):
+        return 0, rejected + len(columns['oven_ids'])
+    return len(columns['oven_ids']), rejected
+
+@app.route('/telemetry', methods=['POST'])
+def ingest_telemetry():
+    """
+    Accepts sensor readings from many ovens: a JSON array (or
+    {"readings": [...]}) or a streamed NDJSON body, one reading per line.
+    Each reading has oven_id and temperature_c, and optionally ts (epoch
+    seconds, default: now), humidity_percent, time_remaining_s,
+    relay_state ("ON"/"OFF") and is_cooking, as returned by
+    SimulatedOven.get_sensor_values().
+    """
+    try:
+        components.get('telemetry')
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    accepted = rejected = 0
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+            chunk = []
+            for line in request.stream:
+                if not line.strip():
+                    continue
+                try:
+                    chunk.append(json.loads(line))
+                except ValueError:
+                    rejected += 1
+                if len(chunk) >= TELEMETRY_CHUNK_SIZE:
+                    a, r = submit_telemetry(chunk)
+                    accepted, rejected, chunk = accepted + a, rejected + r, []
+            a, r = submit_telemetry(chunk)
+            accepted, rejected = accepted + a, rejected + r
+        else:
+            data = request.get_json()
+            rows = data.get('readings', []) if isinstance(data, dict) else data
+            if not isinstance(rows, list):
+                raise Exception("Body must be a JSON array of readings, {\"readings\": [...]} or NDJSON.")
+            accepted, rejected = submit_telemetry(rows)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    status = 202 if accepted or not rejected else 400
+    return jsonify({"accepted": accepted, "rejected": rejected}), status
+
+@app.route('/telemetry/<oven_id>', methods=['GET'])
+def query_telemetry(oven_id):
+    """
+    Readings of one oven between start and end (epoch seconds; default:
+    the last hour) as columns under "readings". resolution=raw|1m|auto
+    (default).
+    """
+    try:
+        end = finite_float(request.args, 'end', time.time())
+        start = finite_float(request.args, 'start', end - 3600)
+        resolution = request.args.get('resolution', 'auto')
+        if resolution not in ('raw', '1m', 'auto'):
+            raise Exception("resolution must be raw, 1m or auto.")
+        if start >= end:
+            raise Exception("start must be before end.")
+        store = components.get('telemetry').store
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    resolution, records = store.query(oven_id, start, end, resolution)
+    readings = {name: json_column(records[name]) for name in records.dtype.names if name != 'oven'}
+    return jsonify({"oven_id": oven_id, "resolution": resolution, "count": len(records),
+                    "start": start, "end": end, "readings": readings})
+
+@app.route('/metrics/telemetry')
+def telemetry_metrics():
+    """
+    Queue depth, accepted/written/dropped counts and last maintenance run
+    of the telemetry writer.
+    """
+    if not components.is_ready('telemetry'):
+        return jsonify({"enabled": False})
+    return jsonify(dict(components.get('telemetry').stats(), enabled=True))
+
+def requested_top_k():
+    try:
+        return int(request.values.get('top_k', CLASSIFY_TOP_K))
+    except ValueError:
+        raise Exception("top_k must be an integer.")
+
 @app.route('/classify_image', methods=['POST'])
 def classify_image():
     if 'file' not in request.files:
@@ -207,32 +1081,158 @@ def classify_image():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    if file and cv_model:
-        try:
-            img_bytes = file.read()
-            prepped_image = load_and_prep_image(img_bytes)
-            
-            predictions = cv_model.predict(prepped_image)
-            predicted_index = np.argmax(predictions[0])
-            dish_name = food_101_class_names[predicted_index]
-            
-            dish_name = dish_name.replace("_", " ")
-            
-            print(f"CV Model classified image as: {dish_name}")
-            
-            pred_temp, pred_duration = make_prediction_v2(dish_name, 20.0, 50.0)
-
-            return jsonify({
-                'classified_dish': dish_name,
-                'predicted_temp': int(round(pred_temp, 0)),
-                'predicted_duration': int(round(pred_duration, 0))
-            })
+    try:
+        classifier = components.get('classifier')
+    except Exception as e:
+        return jsonify({"error": f"CV model not loaded. {e}"}), 500
 
-        except Exception as e:
-            return jsonify({"error": str(e)}), 400
-    
-    return jsonify({"error": "CV model not loaded"}), 500
+    try:
+        top_k = requested_top_k()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        img_bytes = file.read()
+        result = image_pipeline.classify(classifier.model, classifier.class_names,
+                                         [img_bytes], top_k=top_k)[0]
+        if 'error' in result:
+            # 400 for an image that doesn't decode, 500 if the model failed on it.
+            return jsonify({"error": result['error']}), result['status']
+        dish_name = result['classified_dish']
+        
+        print(f"CV Model classified image as: {dish_name}")
+        
+        pred_temp, pred_duration = make_prediction_v2(dish_name, 20.0, 50.0)
+
+        return jsonify({
+            'classified_dish': dish_name,
+            'top_k': result['top_k'],
+            'predicted_temp': int(round(pred_temp, 0)),
+            'predicted_duration': int(round(pred_duration, 0))
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/classify_images', methods=['POST'])
+def classify_images():
+    """
+    Multi-file version of /classify_image. Upload images under the
+    'files' field (optionally with room_temp, room_humidity and top_k
+    form fields). Images are decoded in parallel, classified in batches
+    and all recognized dishes are predicted in one vectorized pass.
+    Returns one result per upload, in upload order.
+    """
+    files = request.files.getlist('files') or request.files.getlist('file')
+    files = [f for f in files if f.filename != '']
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    try:
+        classifier = components.get('classifier')
+    except Exception as e:
+        return jsonify({"error": f"CV model not loaded. {e}"}), 500
+
+    try:
+        top_k = requested_top_k()
+        room_temp = finite_float(request.form, 'room_temp', 20.0)
+        room_humidity = finite_float(request.form, 'room_humidity', 50.0)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Per-image failures come back as {'error'} entries; this only
+        # catches failures of the request as a whole.
+        results = image_pipeline.classify(classifier.model, classifier.class_names,
+                                          [f.read() for f in files], top_k=top_k)
+
+        classified = [i for i, result in enumerate(results) if 'error' not in result]
+        rows = [{'dish_name': results[i]['classified_dish'], 'room_temp': room_temp,
+                 'room_humidity': room_humidity} for i in classified]
+        for i, prediction in zip(classified, predict_bulk(rows)):
+            prediction.pop('index')
+            results[i].update(prediction)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    for f, result in zip(files, results):
+        result['filename'] = f.filename
+    return jsonify({"results": results})
+
+@app.route('/model', methods=['GET', 'POST'])
+def model_version():
+    """
+    GET: the model version being served and the registry's active version.
+    POST: check the registry now instead of waiting for the next poll.
+    """
+    if request.method == 'POST':
+        if SERVING_RUNTIME != 'keras':
+            return jsonify({"error": "Model hot-swap is only available with OVEN_RUNTIME=keras."}), 400
+        model_watcher.check()
+    return jsonify(model_watcher.status())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Prometheus text exposition: per-stage and per-endpoint latency
+    histograms, request counters and the stats of the batcher, cache,
+    feedback writer and telemetry writer as gauges.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profiler', methods=['GET', 'POST'])
+def debug_profiler():
+    """
+    GET: the current profile (top functions and collapsed stacks).
+    POST action=start (optional interval_ms) or action=stop.
+    Only available with OVEN_PROFILER=1.
+    """
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler is disabled; set OVEN_PROFILER=1."}), 404
+    if request.method == 'POST':
+        action = request.values.get('action')
+        if action == 'start':
+            try:
+                interval_ms = finite_float(request.values, 'interval_ms', PROFILER_INTERVAL_MS)
+                if interval_ms <= 0:
+                    raise ValueError("'interval_ms' must be positive.")
+                profiler.start(interval_ms / 1000.0)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        elif action == 'stop':
+            profiler.stop()
+        else:
+            return jsonify({"error": "action must be start or stop."}), 400
+    report = profiler.report()
+    if request.args.get('format') == 'collapsed':
+        return Response(report['collapsed'] + "\n", mimetype='text/plain')
+    return jsonify(report)
+
+@app.route('/healthz')
+def healthz():
+    """
+    Liveness probe. Always 200 while the process is serving, with the
+    load state and load time of every component.
+    """
+    return jsonify({"status": "ok", "runtime": SERVING_RUNTIME, "pid": os.getpid(),
+                    "components": components.status()})
+
+@app.route('/readyz')
+def readyz():
+    """
+    Readiness probe. 200 once the recipe data and prediction model are
+    loaded (the CV model may still be loading), 503 before that.
+    """
+    ready = components.ready()
+    body = {"ready": ready, "components": components.status()}
+    return jsonify(body), (200 if ready else 503)
 
 if __name__ == '__main__':
     init_db() 
+    # The debug reloader runs this file in a watcher process and again in the
+    # serving child (which inherits the already-bound socket). Only warm there.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if WARM_ON_START:
+            components.warm()
+        start_model_watcher()
     app.run(debug=True, port=5000)
\ No newline at end of file
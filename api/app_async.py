@@ -0,0 +1,282 @@
+"""
+ASGI serving mode for the Smart Oven API.
+
+Serves the same /predict, /feedback, /classify_image and /metrics
+contracts as the Flask app in app.py, and shares its components, caches,
+micro-batcher, feedback writer and metrics registry. One event loop handles every connection:
+
+* model inference (recipe encoding, model.predict, image decoding and
+  classification) runs on a bounded thread pool, so a slow prediction or
+  upload never blocks other requests; when more than
+  OVEN_ASYNC_MAX_PENDING inference calls are waiting, requests get a 503
+  instead of queueing without bound,
+* /feedback hands the row to the write-behind FeedbackWriter and awaits
+  its commit future, so SQLite I/O never runs on the event loop.
+
+Run with:
+    cd api
+    uvicorn app_async:app --port 5000
+or `python app_async.py`.
+"""
+
+import os
+import time
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+import app as core
+
+# Threads that run inference. Each /predict call blocks its thread while
+# the micro-batcher fills a batch, so this should be at least
+# OVEN_PREDICT_BATCH_MAX_SIZE to let batches fill.
+ASYNC_INFERENCE_WORKERS = int(os.environ.get('OVEN_ASYNC_INFERENCE_WORKERS',
+                                             max(core.PREDICT_BATCH_MAX_SIZE, 4)))
+# Inference calls allowed to be running or waiting before requests are shed.
+ASYNC_MAX_PENDING = int(os.environ.get('OVEN_ASYNC_MAX_PENDING', 256))
+
+inference_executor = ThreadPoolExecutor(max_workers=ASYNC_INFERENCE_WORKERS,
+                                        thread_name_prefix='inference')
+_pending = 0
+
+
+class Overloaded(Exception):
+    pass
+
+
+async def run_inference(fn, *args, **kwargs):
+    """
+    Runs a blocking call on the inference pool. The counter is only
+    touched from the event loop thread, so it needs no lock.
+    """
+    global _pending
+    if _pending >= ASYNC_MAX_PENDING:
+        raise Overloaded("Server is overloaded, try again later.")
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(inference_executor, lambda: fn(*args, **kwargs))
+    finally:
+        _pending -= 1
+
+
+async def get_component(name):
+    """A loaded component directly; a pending one is loaded on the pool."""
+    if core.components.is_ready(name):
+        return core.components.get(name)
+    return await run_inference(core.components.get, name)
+
+
+def overloaded_response(e):
+    return JSONResponse({"error": str(e)}, status_code=503)
+
+
+def _predict(dish_name, room_temp, room_humidity, profile_id):
+    match = core.resolve_dish(dish_name)
+    pred_temp, pred_duration = core.make_prediction_v2(dish_name, room_temp, room_humidity,
+                                                       profile_id, match=match)
+    return dict(
+        core.match_details(dish_name, match),
+        predicted_temp=int(round(pred_temp, 0)),
+        predicted_duration=int(round(pred_duration, 0)),
+    )
+
+
+async def predict(request):
+    """
+    Endpoint to get a new cooking prediction (V2).
+    """
+    try:
+        await get_component('predictor')
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    try:
+        data = await request.json()
+        dish_name = data['dish_name']
+        room_temp = core.finite_float(data, 'room_temp', 20.0)
+        room_humidity = core.finite_float(data, 'room_humidity', 50.0)
+
+        result = await run_inference(_predict, dish_name, room_temp, room_humidity,
+                                     core.profile_key(data))
+        return JSONResponse(result)
+
+    except Overloaded as e:
+        return overloaded_response(e)
+    except FutureTimeoutError:
+        return JSONResponse({"error": "Prediction timed out; try again."}, status_code=503)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+
+async def feedback(request):
+    """
+    Endpoint to log user feedback for reinforcement learning. With a
+    user_id or oven_id, the rating also updates that profile's
+    personalization.
+    """
+    try:
+        data = await request.json()
+        row = core.feedback_row(data)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    try:
+        # First use opens the database on the pool, off the event loop.
+        writer = await get_component('feedback_writer')
+        if row[-1] is not None and not core.components.is_ready('personalization'):
+            try:
+                await run_inference(core.load_personalization_for, row[-1])
+            except Overloaded:
+                pass
+        future = writer.submit(row)
+        if row[-1] is not None:
+            try:
+                # The dish lookup (and first load of the store) also run on the pool.
+                await run_inference(core.learn_from_feedback, row, future)
+            except Overloaded:
+                pass  # The row is queued; only this online update is skipped.
+        if core.FEEDBACK_ACK != 'commit':
+            return JSONResponse({"status": "queued", "message": "Feedback queued."}, status_code=202)
+        with core.metrics.timer('feedback.ack_wait'):
+            await asyncio.wait_for(asyncio.wrap_future(future), timeout=core.FEEDBACK_ACK_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        return JSONResponse({"status": "queued", "message": "Feedback queued; commit is delayed."},
+                            status_code=202)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    return JSONResponse({"status": "success", "message": "Feedback logged."})
+
+
+def _classify_and_predict(classifier, img_bytes, top_k):
+    """(body, status): 400 for an image that doesn't decode, 500 if the model failed on it."""
+    result = core.image_pipeline.classify(classifier.model, classifier.class_names,
+                                          [img_bytes], top_k=top_k)[0]
+    if 'error' in result:
+        return {"error": result['error']}, result['status']
+    dish_name = result['classified_dish']
+    print(f"CV Model classified image as: {dish_name}")
+    pred_temp, pred_duration = core.make_prediction_v2(dish_name, 20.0, 50.0)
+    return {
+        'classified_dish': dish_name,
+        'top_k': result['top_k'],
+        'predicted_temp': int(round(pred_temp, 0)),
+        'predicted_duration': int(round(pred_duration, 0))
+    }, 200
+
+
+async def classify_image(request):
+    form = await request.form()
+    if 'file' not in form:
+        return JSONResponse({"error": "No file part"}, status_code=400)
+
+    file = form['file']
+    if not getattr(file, 'filename', ''):
+        return JSONResponse({"error": "No selected file"}, status_code=400)
+
+    try:
+        classifier = await get_component('classifier')
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return JSONResponse({"error": f"CV model not loaded. {e}"}, status_code=500)
+
+    try:
+        top_k = int(form.get('top_k', request.query_params.get('top_k', core.CLASSIFY_TOP_K)))
+    except ValueError:
+        return JSONResponse({"error": "top_k must be an integer."}, status_code=400)
+
+    try:
+        img_bytes = await file.read()
+        body, status = await run_inference(_classify_and_predict, classifier, img_bytes, top_k)
+        return JSONResponse(body, status_code=status)
+
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def healthz(request):
+    return JSONResponse({"status": "ok", "runtime": core.SERVING_RUNTIME,
+                         "components": core.components.status()})
+
+
+async def readyz(request):
+    ready = core.components.ready()
+    body = {"ready": ready, "components": core.components.status()}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(core.metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+async def home(request):
+    return PlainTextResponse("Smart Oven AIoT API (V2 - Smart, async) is running.")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    core.init_db()
+    if core.WARM_ON_START:
+        core.components.warm()
+    core.start_model_watcher()
+    yield
+    inference_executor.shutdown(wait=False)
+
+
+class RequestMetrics:
+    """
+    ASGI middleware that records the same per-endpoint latency histogram
+    and request counter as the Flask app's request hooks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = ['500']
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = str(message['status'])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            endpoint = scope['path'] if scope['path'] in ROUTE_PATHS else 'unmatched'
+            core.http_request_seconds.observe(time.perf_counter() - start,
+                                              endpoint=endpoint, status=status[0])
+            core.http_requests_total.inc(endpoint=endpoint, status=status[0])
+
+
+routes = [
+    Route('/', home),
+    Route('/predict', predict, methods=['POST']),
+    Route('/feedback', feedback, methods=['POST']),
+    Route('/classify_image', classify_image, methods=['POST']),
+    Route('/healthz', healthz),
+    Route('/readyz', readyz),
+    Route('/metrics', prometheus_metrics),
+]
+ROUTE_PATHS = {route.path for route in routes}
+
+app = Starlette(routes=routes, lifespan=lifespan)
+app.add_middleware(RequestMetrics)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='127.0.0.1', port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,136 @@
+import threading
+import time
+import queue
+from concurrent.futures import Future
+
+from metrics import Histogram
+
+
+def _power_of_two_buckets(limit):
+    buckets = [1]
+    while buckets[-1] < limit:
+        buckets.append(buckets[-1] * 2)
+    return buckets
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-sample requests into one batched call.
+
+    Callers `submit()` an item and get a Future back. A background thread
+    takes the first queued item, waits up to `max_wait_ms` for more (or
+    until `max_batch_size` items are queued), calls `batch_fn` once with
+    the list of items and fans the results back out to the futures.
+
+    `batch_fn` must return one result per item, in order. If it raises
+    for a batch of several items, each item is retried on its own, so a
+    bad item fails only its own future.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=5.0, name='batcher'):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Histogram(f'{name}_batch_size', buckets=_power_of_two_buckets(max_batch_size))
+        self._queue_depths = Histogram(f'{name}_queue_depth',
+                                       buckets=_power_of_two_buckets(max(max_batch_size * 4, 1)))
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed.")
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        """Submits one item and blocks until its result is ready."""
+        return self.submit(item).result(timeout=timeout)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Put the shutdown marker back so the loop exits after this batch.
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            with self._lock:
+                self._queue_depths.observe(self._queue.qsize() + len(batch))
+                self._batch_sizes.observe(len(batch))
+                self._batches += 1
+                self._items += len(batch)
+
+            try:
+                results = self._call([item for item, _ in batch])
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                for item, future in batch:
+                    try:
+                        future.set_result(self._call([item])[0])
+                    except Exception as item_error:
+                        future.set_exception(item_error)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _call(self, items):
+        results = self.batch_fn(items)
+        if len(results) != len(items):
+            raise RuntimeError(f"{self.name} returned {len(results)} results for {len(items)} items.")
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_s * 1000.0,
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'items': self._items,
+                'errors': self._errors,
+                'batch_size_histogram': self._batch_sizes.series(),
+                'queue_depth_histogram': self._queue_depths.series(),
+            }
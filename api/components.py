@@ -0,0 +1,127 @@
+import threading
+import time
+
+
+class Component:
+    """
+    One lazily loaded artifact (recipe table, model, ...).
+
+    `get()` runs the loader the first time it is called and caches the
+    result. Concurrent callers wait on the same load instead of loading
+    twice. A failed load is recorded and retried on the next `get()`.
+    """
+
+    def __init__(self, name, loader, required=True):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = 'pending'
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state == 'ready':
+            return self.value
+        with self._lock:
+            if self.state == 'ready':
+                return self.value
+            self.state = 'loading'
+            start = time.perf_counter()
+            try:
+                value = self.loader()
+            except Exception as e:
+                self.state = 'failed'
+                self.error = str(e)
+                self.load_seconds = time.perf_counter() - start
+                print(f"CRITICAL ERROR: Could not load {self.name}. {e}")
+                raise Exception(f"Could not load {self.name}: {e}")
+            self.value = value
+            self.error = None
+            self.load_seconds = time.perf_counter() - start
+            self.loaded_at = time.time()
+            self.state = 'ready'
+            print(f"Loaded {self.name} in {self.load_seconds:.2f}s.")
+            return value
+
+    def swap(self, value):
+        """
+        Atomically replaces the loaded value (e.g. a new model version).
+        Callers that already hold the old value keep using it until they
+        finish; every later `get()` returns the new one.
+        """
+        with self._lock:
+            self.value = value
+            self.error = None
+            self.loaded_at = time.time()
+            self.state = 'ready'
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def status(self):
+        status = {
+            'state': self.state,
+            'required': self.required,
+            'load_seconds': self.load_seconds,
+            'loaded_at': self.loaded_at,
+            'error': self.error,
+        }
+        version = getattr(self.value, 'version', None)
+        if version is not None:
+            status['version'] = version
+        return status
+
+
+class ComponentRegistry:
+    """
+    Named set of lazily loaded components with background warm-up and
+    health/readiness reporting.
+    """
+
+    def __init__(self):
+        self._components = {}
+
+    def register(self, name, loader, required=True):
+        self._components[name] = Component(name, loader, required)
+        return self._components[name]
+
+    def __getitem__(self, name):
+        return self._components[name]
+
+    def get(self, name):
+        return self._components[name].get()
+
+    def is_ready(self, name):
+        return self._components[name].ready
+
+    def warm(self, names=None, background=True):
+        """
+        Loads the given components (all of them by default) in
+        registration order. Failures are recorded, not raised.
+        """
+        names = list(names or self._components)
+
+        def _warm():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass
+
+        if not background:
+            _warm()
+            return None
+        thread = threading.Thread(target=_warm, name='component-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        return {name: component.status() for name, component in self._components.items()}
+
+    def ready(self):
+        """True once every required component has loaded."""
+        return all(c.ready for c in self._components.values() if c.required)
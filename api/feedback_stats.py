@@ -0,0 +1,222 @@
+import math
+import time
+import sqlite3
+import threading
+
+from feedback_corrections import CORRECTION_FACTORS
+
+# feedback_log.user_feedback values: 1 = perfect, 0 = undercooked, -1 = overcooked.
+FEEDBACK_LABELS = {1: 'perfect', 0: 'undercooked', -1: 'overcooked'}
+
+# Aggregate columns and the per-row value each one sums. Every aggregate
+# table has all of them, so a window can add up hourly rows and raw rows
+# the same way.
+AGGREGATES = [('n', "1")]
+for _value, _label in FEEDBACK_LABELS.items():
+    AGGREGATES += [
+        (f'n_{_label}', f"IFNULL({{row}}user_feedback = {_value}, 0)"),
+        (f'sum_temp_{_label}',
+         f"CASE WHEN {{row}}user_feedback = {_value} THEN IFNULL({{row}}predicted_temp, 0) ELSE 0 END"),
+        (f'sum_duration_{_label}',
+         f"CASE WHEN {{row}}user_feedback = {_value} THEN IFNULL({{row}}predicted_duration, 0) ELSE 0 END"),
+    ]
+AGGREGATE_COLUMNS = [name for name, _ in AGGREGATES]
+
+# 'YYYY-MM-DD HH' of a CURRENT_TIMESTAMP-style timestamp.
+HOUR_KEY = "IFNULL(replace(substr({row}timestamp, 1, 13), 'T', ' '), '')"
+
+# Aggregate tables and their keys (besides the aggregate columns).
+TABLES = {
+    # All-time totals per dish.
+    'feedback_dish_stats': ['dish_name'],
+    # Per dish per hour, for per-dish time windows.
+    'feedback_dish_hourly': ['dish_name', 'hour'],
+    # All dishes per hour, for time windows over everything.
+    'feedback_hourly': ['hour'],
+}
+KEY_EXPRESSIONS = {'dish_name': "{row}dish_name", 'hour': HOUR_KEY}
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS feedback_log_dish_time ON feedback_log (dish_name, timestamp)",
+    "CREATE INDEX IF NOT EXISTS feedback_log_time ON feedback_log (timestamp)",
+]
+
+
+def _table_sql(table, keys):
+    columns = [f"{key} TEXT NOT NULL" for key in keys]
+    columns += [f"{name} REAL NOT NULL DEFAULT 0" for name in AGGREGATE_COLUMNS]
+    return (f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)}, "
+            f"PRIMARY KEY ({', '.join(keys)})) WITHOUT ROWID")
+
+
+def _upsert_sql(table, keys, row, sign):
+    """Adds (sign=+1) or subtracts (sign=-1) one feedback_log row `row` to `table`."""
+    names = keys + AGGREGATE_COLUMNS
+    values = [KEY_EXPRESSIONS[key].format(row=row) for key in keys]
+    values += [f"{'-' if sign < 0 else ''}({expr.format(row=row)})" for _, expr in AGGREGATES]
+    updates = ', '.join(f"{name} = {name} + excluded.{name}" for name in AGGREGATE_COLUMNS)
+    # "WHERE true" keeps SQLite from parsing ON CONFLICT as part of a join.
+    return (f"INSERT INTO {table} ({', '.join(names)}) SELECT {', '.join(values)} WHERE true "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}")
+
+
+def _backfill_sql(table, keys):
+    """Rebuilds `table` from feedback_log with one full scan."""
+    key_exprs = [KEY_EXPRESSIONS[key].format(row='') for key in keys]
+    sums = [f"SUM({expr.format(row='')})" for _, expr in AGGREGATES]
+    return (f"INSERT INTO {table} ({', '.join(keys + AGGREGATE_COLUMNS)}) "
+            f"SELECT {', '.join(key_exprs + sums)} FROM feedback_log GROUP BY {', '.join(key_exprs)}")
+
+
+def ensure_schema(conn):
+    """
+    Adds the dish/time indexes, the aggregate tables and the triggers that
+    keep them up to date to a database with a feedback_log table. The
+    aggregates are built from the existing rows the first time (a full
+    scan per table); after that every insert or delete on feedback_log updates them
+    in the same transaction, so they are never stale.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for sql in INDEXES:
+            conn.execute(sql)
+        existing = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'feedback_stats_%'")}
+        if existing != {'feedback_stats_insert', 'feedback_stats_delete'}:
+            print("Building feedback aggregates from feedback_log...")
+            for table, keys in TABLES.items():
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(_table_sql(table, keys))
+                conn.execute(_backfill_sql(table, keys))
+            conn.execute("DROP TRIGGER IF EXISTS feedback_stats_insert")
+            conn.execute("DROP TRIGGER IF EXISTS feedback_stats_delete")
+            for trigger, event, row, sign in (('feedback_stats_insert', 'INSERT', 'NEW.', 1),
+                                              ('feedback_stats_delete', 'DELETE', 'OLD.', -1)):
+                body = ''.join(f"{_upsert_sql(table, keys, row, sign)};\n"
+                               for table, keys in TABLES.items())
+                conn.execute(f"CREATE TRIGGER {trigger} AFTER {event} ON feedback_log BEGIN\n{body}END")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def format_timestamp(ts):
+    """Epoch seconds as a feedback_log timestamp ('YYYY-MM-DD HH:MM:SS', UTC)."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts))
+
+
+def summarize(totals, dish_name=None):
+    """A response dict from summed aggregate columns."""
+    n = int(totals['n'])
+    counts = {label: int(totals[f'n_{label}']) for label in FEEDBACK_LABELS.values()}
+    labelled = sum(counts.values())
+    summary = {'dish_name': dish_name, 'count': n,
+               'feedback': dict(counts, other=n - labelled),
+               'perfect_rate': counts['perfect'] / labelled if labelled else None}
+    if labelled:
+        sum_temp = sum(totals[f'sum_temp_{label}'] for label in FEEDBACK_LABELS.values())
+        sum_duration = sum(totals[f'sum_duration_{label}'] for label in FEEDBACK_LABELS.values())
+        temp_correction = sum((CORRECTION_FACTORS[value][0] - 1) * totals[f'sum_temp_{label}']
+                              for value, label in FEEDBACK_LABELS.items())
+        duration_correction = sum((CORRECTION_FACTORS[value][1] - 1) * totals[f'sum_duration_{label}']
+                                  for value, label in FEEDBACK_LABELS.items())
+        summary.update(mean_predicted_temp=sum_temp / labelled,
+                       mean_predicted_duration=sum_duration / labelled,
+                       mean_temp_correction=temp_correction / labelled,
+                       mean_duration_correction=duration_correction / labelled)
+    return summary
+
+
+class FeedbackStats:
+    """
+    Read-only per-dish and time-window queries over feedback_log, answered
+    from the aggregate tables maintained by ensure_schema(). A window
+    sums the hourly aggregates for the whole hours it covers and reads
+    the raw rows of the partial hours at its edges through the timestamp
+    indexes, so no query scans more than two hours of raw feedback.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._totals_sql = ', '.join(f"TOTAL({name})" for name in AGGREGATE_COLUMNS)
+        self._raw_sql = ', '.join(f"TOTAL({expr.format(row='')})" for _, expr in AGGREGATES)
+
+    def _conn(self):
+        # One read-only connection per thread; WAL lets them read while the writer commits.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+            self._local.conn = conn
+        return conn
+
+    def _totals(self, sql, params):
+        row = self._conn().execute(sql, params).fetchone()
+        return dict(zip(AGGREGATE_COLUMNS, row))
+
+    def _rollup(self, dish_name, first_hour=None, end_hour=None):
+        table, where, params = 'feedback_hourly', [], []
+        if dish_name is not None:
+            table, where, params = 'feedback_dish_hourly', ["dish_name = ?"], [dish_name]
+        if first_hour is not None:
+            where.append("hour >= ? AND hour < ?")
+            params += [first_hour, end_hour]
+        sql = f"SELECT {self._totals_sql} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._totals(sql, params)
+
+    def _raw(self, dish_name, start, end):
+        where, params = "timestamp >= ? AND timestamp < ?", [start, end]
+        if dish_name is not None:
+            where, params = "dish_name = ? AND " + where, [dish_name] + params
+        return self._totals(f"SELECT {self._raw_sql} FROM feedback_log WHERE {where}", params)
+
+    def query(self, dish_name=None, start=None, end=None):
+        """
+        Feedback counts, perfect rate, mean prediction and mean correction
+        for one dish (or all dishes) between start and end, epoch seconds
+        (default: all time), end exclusive.
+        """
+        if start is None and end is None:
+            if dish_name is None:
+                return summarize(self._rollup(None))
+            totals = self._totals(f"SELECT {self._totals_sql} FROM feedback_dish_stats WHERE dish_name = ?",
+                                  [dish_name])
+            return summarize(totals, dish_name)
+
+        # feedback_log timestamps have whole seconds.
+        start = 0 if start is None else math.ceil(start)
+        end = math.ceil(time.time()) + 1 if end is None else math.ceil(end)
+        first_hour = -(-start // 3600) * 3600
+        last_hour = end // 3600 * 3600
+        if first_hour >= last_hour:
+            totals = self._raw(dish_name, format_timestamp(start), format_timestamp(end))
+        else:
+            parts = [self._rollup(dish_name, format_timestamp(first_hour)[:13], format_timestamp(last_hour)[:13]),
+                     self._raw(dish_name, format_timestamp(start), format_timestamp(first_hour)),
+                     self._raw(dish_name, format_timestamp(last_hour), format_timestamp(end))]
+            totals = {name: sum(part[name] for part in parts) for name in AGGREGATE_COLUMNS}
+        return dict(summarize(totals, dish_name), start=start, end=end)
+
+    def hourly(self, dish_name=None, start=None, end=None):
+        """Per-hour summaries of the hours overlapping [start, end), oldest first."""
+        table, where, params = 'feedback_hourly', [], []
+        if dish_name is not None:
+            table, where, params = 'feedback_dish_hourly', ["dish_name = ?"], [dish_name]
+        if start is not None:
+            where.append("hour >= ?")
+            params.append(format_timestamp(start)[:13])
+        if end is not None:
+            where.append("hour < ?")
+            params.append(format_timestamp(math.ceil(end) + 3599)[:13])
+        sql = f"SELECT hour, {', '.join(AGGREGATE_COLUMNS)} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        series = []
+        for row in self._conn().execute(sql + " ORDER BY hour", params):
+            summary = summarize(dict(zip(AGGREGATE_COLUMNS, row[1:])), dish_name)
+            summary['hour'] = row[0] + ':00:00'
+            series.append(summary)
+        return series
@@ -0,0 +1,172 @@
+import sqlite3
+import threading
+import time
+import queue
+from concurrent.futures import Future
+
+FEEDBACK_COLUMNS = ('dish_name', 'room_temp', 'room_humidity',
+                    'predicted_temp', 'predicted_duration', 'user_feedback')
+
+
+class FeedbackWriter:
+    """
+    Write-behind ingestion for feedback_log.
+
+    One background thread owns a persistent WAL-mode SQLite connection.
+    Request threads `submit()` rows into an in-memory queue and get a
+    Future back. The writer commits everything that queued up while the
+    previous commit was running as one group (up to `max_batch_size`
+    rows), optionally waiting up to `max_wait_ms` after the first row for
+    more, so many ratings share a single commit/fsync. Each Future
+    resolves after the commit that made its row durable. With a `metrics`
+    registry, each group commit is timed as the feedback.commit stage.
+    """
+
+    def __init__(self, db_path, max_batch_size=256, max_wait_ms=0.0, synchronous='FULL',
+                 table='feedback_log', columns=FEEDBACK_COLUMNS, metrics=None):
+        self.db_path = db_path
+        self.metrics = metrics
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.synchronous = synchronous
+        self._insert_sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join('?' for _ in columns)})")
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+        self._submitted = 0
+        self._committed = 0
+        self._commits = 0
+        self._failed = 0
+        self._commit_seconds = 0.0
+        self._closed = False
+
+        # Open the connection up front so configuration errors surface to the caller.
+        self._conn = self._connect()
+        self._thread = threading.Thread(target=self._run, name='feedback-writer', daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def submit(self, row):
+        """Queues one row (a tuple in column order). Returns a Future."""
+        if self._closed:
+            raise RuntimeError("Feedback writer is closed.")
+        future = Future()
+        with self._lock:
+            self._submitted += 1
+        self._queue.put((row, future))
+        return future
+
+    def close(self, timeout=None):
+        """Commits everything still queued and closes the connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None, True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _write_rows(self, batch):
+        """
+        Inserts a group that failed on a bad row one row at a time, in one
+        transaction; a failed INSERT only rolls back itself. Returns the
+        entries that were written and sets the exception on the others.
+        """
+        written = []
+        with self._conn:
+            for row, future in batch:
+                try:
+                    self._conn.execute(self._insert_sql, row)
+                except (sqlite3.IntegrityError, sqlite3.InterfaceError) as e:
+                    future.set_exception(e)
+                else:
+                    written.append((row, future))
+        return written
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            try:
+                with self._conn:
+                    self._conn.executemany(self._insert_sql, [row for row, _ in batch])
+            except (sqlite3.IntegrityError, sqlite3.InterfaceError):
+                # One bad row must not fail everyone else's rating.
+                written = self._write_rows(batch)
+                with self._lock:
+                    self._failed += len(batch) - len(written)
+                batch = written
+        except Exception as e:
+            with self._lock:
+                self._failed += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        elapsed = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.observe_stage('feedback.commit', elapsed)
+        with self._lock:
+            self._committed += len(batch)
+            self._commits += 1
+            self._commit_seconds += elapsed
+        for _, future in batch:
+            future.set_result(True)
+
+    def _run(self):
+        try:
+            while True:
+                batch, stop = self._collect()
+                if batch:
+                    self._write(batch)
+                if stop:
+                    # Drain anything queued after the shutdown marker.
+                    rest = []
+                    while True:
+                        try:
+                            entry = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if entry is not None:
+                            rest.append(entry)
+                    if rest:
+                        self._write(rest)
+                    return
+        finally:
+            self._conn.close()
+
+    def stats(self):
+        with self._lock:
+            uptime = max(time.time() - self._started_at, 1e-9)
+            return {
+                'queue_depth': self._queue.qsize(),
+                'submitted': self._submitted,
+                'committed': self._committed,
+                'failed': self._failed,
+                'commits': self._commits,
+                'rows_per_commit': self._committed / self._commits if self._commits else 0.0,
+                'mean_commit_ms': 1000.0 * self._commit_seconds / self._commits if self._commits else 0.0,
+                'committed_per_second': self._committed / uptime,
+                'uptime_seconds': uptime,
+            }
@@ -0,0 +1,110 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ImagePipeline:
+    """
+    Decode -> resize -> preprocess on a thread pool, then classify in
+    batches.
+
+    `prep_fn` turns raw image bytes into a (1, H, W, 3) preprocessed
+    array (app.load_and_prep_image). Image decoding and resizing release
+    the GIL in PIL, so several uploads are prepared in parallel. With a
+    `metrics` registry, per-image prep and per-batch CV inference times
+    are recorded as the image.prep / image.cv_inference stages.
+
+    A failed image gets an {'error', 'status'} entry, where status is the
+    HTTP code it maps to: 400 for an upload that doesn't decode (the
+    client's fault), 500 for a model failure on it (ours).
+    """
+
+    def __init__(self, prep_fn, max_workers=4, batch_size=32, metrics=None):
+        self.prep_fn = prep_fn
+        self.batch_size = batch_size
+        self.metrics = metrics
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-prep')
+
+    def _prep(self, img_bytes):
+        start = time.perf_counter()
+        try:
+            return self.prep_fn(img_bytes)[0], None
+        except Exception as e:
+            return None, (f"Could not decode image: {e}", 400)
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_stage('image.prep', time.perf_counter() - start)
+
+    def prepare(self, images):
+        """
+        Preprocesses a list of raw image bytes.
+        Returns (batch, errors): a stacked array of the images that decoded
+        and a per-input list with None or an (error message, status). Rows of `batch`
+        follow the inputs whose error is None, in order.
+        """
+        prepared = list(self._executor.map(self._prep, images))
+        arrays = [array for array, error in prepared if error is None]
+        errors = [error for _, error in prepared]
+        batch = np.stack(arrays) if arrays else None
+        return batch, errors
+
+    def _predict(self, cv_model, batch):
+        t = time.perf_counter()
+        try:
+            return cv_model.predict(batch, verbose=0)
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_stage('image.cv_inference', time.perf_counter() - t)
+
+    def _predict_rows(self, cv_model, batch):
+        """
+        Class probabilities per row of `batch` (None for rows the model
+        failed on) and the matching (error message, status). A failed batch is
+        retried one image at a time, so one bad input fails only itself.
+        """
+        try:
+            return list(self._predict(cv_model, batch)), [None] * len(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                return [None], [(f"Classification failed: {e}", 500)]
+        rows, errors = [], []
+        for i in range(len(batch)):
+            row, error = self._predict_rows(cv_model, batch[i:i + 1])
+            rows += row
+            errors += error
+        return rows, errors
+
+    def classify(self, cv_model, class_names, images, top_k=3):
+        """
+        Classifies a list of raw image bytes with batched model calls.
+
+        Returns one entry per input, in order: either
+        {'classified_dish', 'top_k': [{'dish', 'probability'}, ...]} or
+        {'error', 'status'}.
+        """
+        batch, errors = self.prepare(images)
+        probabilities, predict_errors = [], []
+        if batch is not None:
+            for start in range(0, len(batch), self.batch_size):
+                rows, row_errors = self._predict_rows(cv_model, batch[start:start + self.batch_size])
+                probabilities += rows
+                predict_errors += row_errors
+
+        top_k = max(1, min(top_k, len(class_names)))
+        results = []
+        row = 0
+        for error in errors:
+            if error is not None:
+                results.append({'error': error[0], 'status': error[1]})
+                continue
+            probs = probabilities[row]
+            error = predict_errors[row]
+            row += 1
+            if error is not None:
+                results.append({'error': error[0], 'status': error[1]})
+                continue
+            best = np.argsort(probs)[::-1][:top_k]
+            ranked = [{'dish': class_names[i].replace("_", " "), 'probability': float(probs[i])}
+                      for i in best]
+            results.append({'classified_dish': ranked[0]['dish'], 'top_k': ranked})
+        return results
@@ -0,0 +1,138 @@
+import os
+import io
+import json
+import threading
+import numpy as np
+
+RUNTIME_MANIFEST = 'runtime_manifest.json'
+
+
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            # Last resort: works, but pulls in the full TensorFlow import.
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class LiteModel:
+    """
+    A converted Keras model behind a TFLite signature runner.
+
+    `predict` takes the inputs in Keras order and returns the outputs in
+    Keras order, like `keras.Model.predict`. The interpreter is not
+    thread-safe, so calls are serialized.
+    """
+
+    def __init__(self, model_path, input_names, output_names, num_threads=None):
+        Interpreter = _interpreter_class()
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.runner = self.interpreter.get_signature_runner()
+        self.input_names = list(input_names)
+        self.output_names = list(output_names)
+        self._lock = threading.Lock()
+
+    def predict(self, inputs, verbose=0):
+        if not isinstance(inputs, (list, tuple)):
+            inputs = [inputs]
+        feed = {name: np.asarray(value, dtype=np.float32)
+                for name, value in zip(self.input_names, inputs)}
+        with self._lock:
+            outputs = self.runner(**feed)
+        results = [np.array(outputs[name]) for name in self.output_names]
+        return results if len(results) > 1 else results[0]
+
+
+class OrdinalEncoder:
+    def __init__(self, categories, unknown_value=-1):
+        self.categories_ = [categories]
+        self.unknown_value = float(unknown_value)
+        self._codes = {str(name): float(i) for i, name in enumerate(categories)}
+
+    def transform(self, X):
+        return np.array([[self._codes.get(str(row[0]), self.unknown_value)] for row in X],
+                        dtype=np.float32)
+
+
+class StandardScaler:
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+    def inverse_transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.mean_
+
+
+class MultiLabelBinarizer:
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self._index = {label: i for i, label in enumerate(self.classes_.tolist())}
+
+    def transform(self, y):
+        y = list(y)
+        out = np.zeros((len(y), len(self.classes_)), dtype=np.float32)
+        for row, labels in enumerate(y):
+            for label in labels:
+                col = self._index.get(label)
+                if col is not None:
+                    out[row, col] = 1.0
+        return out
+
+
+def load_preprocessors(path):
+    params = np.load(path)
+    return {
+        'name_encoder': OrdinalEncoder(params['name_categories'].tolist(),
+                                       float(params['name_unknown_value'])),
+        'env_scaler': StandardScaler(params['env_mean'], params['env_scale']),
+        'output_scaler': StandardScaler(params['output_mean'], params['output_scale']),
+        'ingredient_binarizer': MultiLabelBinarizer(params['ingredient_classes']),
+        'tag_binarizer': MultiLabelBinarizer(params['tag_classes']),
+    }
+
+
+def load_manifest(runtime_dir):
+    with open(os.path.join(runtime_dir, RUNTIME_MANIFEST)) as f:
+        return json.load(f)
+
+
+def load_predictor(runtime_dir, num_threads=None):
+    """
+    Loads the exported V2 predictor and its preprocessors.
+    Returns a dict with the same names app.py uses for the Keras artifacts.
+    """
+    manifest = load_manifest(runtime_dir)
+    artifacts = load_preprocessors(os.path.join(runtime_dir, manifest['preprocessors']))
+    predictor = manifest['predictor']
+    artifacts['model'] = LiteModel(os.path.join(runtime_dir, predictor['file']),
+                                   predictor['inputs'], predictor['outputs'], num_threads)
+    return artifacts
+
+
+def load_classifier(runtime_dir, num_threads=None):
+    """Loads the exported CV dish classifier."""
+    classifier = load_manifest(runtime_dir)['classifier']
+    return LiteModel(os.path.join(runtime_dir, classifier['file']),
+                     classifier['inputs'], classifier['outputs'], num_threads)
+
+
+def load_and_prep_image(img_bytes, target_size=(224, 224)):
+    """
+    PIL/NumPy equivalent of keras load_img (nearest resize) followed by
+    mobilenet_v2.preprocess_input.
+    """
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(img_bytes)).convert('RGB')
+    img = img.resize((target_size[1], target_size[0]), Image.NEAREST)
+    img_array = np.asarray(img, dtype=np.float32)
+    img_array_expanded = np.expand_dims(img_array, axis=0)
+    return img_array_expanded / 127.5 - 1.0
@@ -0,0 +1,275 @@
+import re
+import math
+import sys
+import time
+import threading
+from collections import Counter as _StackCounter
+from contextlib import contextmanager
+
+# Seconds; covers a cache hit (well under 1 ms) up to a cold model load.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_:]', '_', name)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one value per label set."""
+
+    def __init__(self, name, help_text=''):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_text(key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, one series per label set, in the
+    Prometheus layout (`_bucket{le=...}`, `_sum`, `_count`).
+    """
+
+    def __init__(self, name, help_text='', buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        """{label_tuple: {'buckets': {le: cumulative}, 'sum', 'count'}}"""
+        out = {}
+        with self._lock:
+            for key, (counts, total, n) in self._series.items():
+                cumulative, running = {}, 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    running += count
+                    cumulative[bound] = running
+                out[key] = {'buckets': cumulative, 'sum': total, 'count': n}
+        return out
+
+    def series(self, **labels):
+        """One label set's snapshot with JSON-friendly bucket keys ('1', ..., '+Inf')."""
+        series = self.snapshot().get(tuple(sorted(labels.items())))
+        if series is None:
+            series = {'buckets': dict.fromkeys(self.buckets + (float('inf'),), 0), 'sum': 0, 'count': 0}
+        return dict(series, buckets={_format_value(bound): count for bound, count in series['buckets'].items()})
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, series in sorted(self.snapshot().items()):
+            for bound, count in series['buckets'].items():
+                lines.append(f'{self.name}_bucket{_label_text(key + (("le", _format_value(bound)),))} {count}')
+            lines.append(f'{self.name}_sum{_label_text(key)} {_format_value(series["sum"])}')
+            lines.append(f'{self.name}_count{_label_text(key)} {series["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms for the API, plus collectors that turn the
+    `stats()` dicts of other components (micro-batcher, feedback writer,
+    prediction cache, ...) into gauges at scrape time.
+    """
+
+    def __init__(self, namespace='oven'):
+        self.namespace = namespace
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+        self.stage_seconds = self.histogram('stage_seconds', "Time spent in each hot-path stage.")
+
+    def _get(self, cls, name, help_text, **kwargs):
+        full_name = f'{self.namespace}_{name}'
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name, help_text=''):
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    @contextmanager
+    def timer(self, stage):
+        """Times the body into oven_stage_seconds{stage=...}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - start, stage=stage)
+
+    def observe_stage(self, stage, seconds):
+        self.stage_seconds.observe(seconds, stage=stage)
+
+    def register_collector(self, name, stats_fn):
+        """`stats_fn()` returns a stats dict (or None to skip) at scrape time."""
+        self._collectors[name] = stats_fn
+
+    def _render_stats(self, prefix, stats, lines):
+        for key, value in stats.items():
+            name = _metric_name(f'{prefix}_{key}')
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, dict):
+                if 'buckets' in value and 'count' in value:
+                    # A Histogram.series(): cumulative bucket counts.
+                    lines.append(f'# TYPE {name} histogram')
+                    for bound, count in value['buckets'].items():
+                        lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum {_format_value(value["sum"])}')
+                    lines.append(f'{name}_count {value["count"]}')
+                else:
+                    self._render_stats(name, value, lines)
+            elif isinstance(value, (int, float)):
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {_format_value(value)}')
+
+    def render(self):
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        for name, stats_fn in list(self._collectors.items()):
+            try:
+                stats = stats_fn()
+            except Exception:
+                continue
+            if stats:
+                self._render_stats(f'{self.namespace}_{name}', stats, lines)
+        return '\n'.join(lines) + '\n'
+
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler that can be switched on and off in a
+    running server. A background thread samples the stack of every other
+    thread every `interval_s` and counts identical stacks, so the result
+    is a "collapsed stack" profile (one `frame;frame;frame count` line
+    per stack) that flamegraph tools read directly.
+    """
+
+    def __init__(self, max_depth=64):
+        self.max_depth = max_depth
+        self._stacks = _StackCounter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.interval_s = None
+        self.samples = 0
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_s=0.005):
+        # A zero, negative or NaN interval would make the sampler spin.
+        if not (math.isfinite(interval_s) and interval_s > 0):
+            raise ValueError(f"Sampling interval must be a positive number of seconds, not {interval_s}.")
+        if self.running:
+            return False
+        self.interval_s = interval_s
+        self._stop.clear()
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        if not self.running:
+            return False
+        self._stop.set()
+        self._thread.join()
+        return True
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            sampled = []
+            for thread_id, frame in frames.items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f'{code.co_filename.rsplit("/", 1)[-1]}:{code.co_name}')
+                    frame = frame.f_back
+                sampled.append(';'.join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(sampled)
+                self.samples += 1
+
+    def report(self, top=30):
+        """Collapsed stacks plus the functions most often on top of a stack."""
+        with self._lock:
+            stacks = dict(self._stacks)
+            samples = self.samples
+        leaf = _StackCounter()
+        for stack, count in stacks.items():
+            leaf[stack.rsplit(';', 1)[-1]] += count
+        total = sum(stacks.values()) or 1
+        return {
+            'running': self.running,
+            'interval_ms': 1000 * self.interval_s if self.interval_s else None,
+            'samples': samples,
+            'started_at': self.started_at,
+            'top_functions': [{'function': fn, 'fraction': count / total}
+                              for fn, count in leaf.most_common(top)],
+            'collapsed': '\n'.join(f'{stack} {count}' for stack, count in
+                                   sorted(stacks.items(), key=lambda kv: -kv[1])),
+        }
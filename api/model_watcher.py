@@ -0,0 +1,81 @@
+import threading
+import time
+
+
+class ModelWatcher:
+    """
+    Polls the model registry and hot-swaps the predictor component when
+    the active version changes.
+
+    The new version is loaded and warmed on this background thread, off
+    the request path, then swapped into the component in one step, so
+    in-flight requests finish on the model they started with and no
+    request waits for a load. If loading or warming fails, the current
+    model stays in place and the next change is tried again.
+    """
+
+    def __init__(self, registry, component, load_fn, warm_fn=None, interval_s=10.0):
+        self.registry = registry
+        self.component = component
+        self.load_fn = load_fn
+        self.warm_fn = warm_fn
+        self.interval_s = interval_s
+        self.last_error = None
+        self.swaps = 0
+        self._seen_mtime = registry.manifest_mtime()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            mtime = self.registry.manifest_mtime()
+            if mtime != self._seen_mtime:
+                self._seen_mtime = mtime
+                self.check()
+
+    def check(self):
+        """
+        Loads and swaps in the registry's active version if it differs from
+        the loaded one. Returns the version now being served.
+        """
+        with self._lock:
+            current = getattr(self.component.value, 'version', None)
+            try:
+                active = self.registry.active_version()
+                if active is None or active == current:
+                    return current
+                print(f"Model registry: loading version {active} (serving {current})...")
+                start = time.perf_counter()
+                predictor = self.load_fn(active)
+                if self.warm_fn is not None:
+                    self.warm_fn(predictor)
+                self.component.swap(predictor)
+                self.swaps += 1
+                self.last_error = None
+                print(f"Model registry: now serving {active} "
+                      f"(loaded and warmed in {time.perf_counter() - start:.2f}s).")
+                return active
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Model registry: could not switch to the active version, "
+                      f"keeping {current}. {e}")
+                return current
+
+    def status(self):
+        return {
+            'serving': getattr(self.component.value, 'version', None),
+            'active': self.registry.active_version(),
+            'swaps': self.swaps,
+            'interval_s': self.interval_s,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,170 @@
+import math
+import threading
+from array import array
+from collections import OrderedDict
+
+from feedback_corrections import CORRECTION_FACTORS
+
+
+class _Profile:
+    # One user's or oven's corrections. Dish i has recipe position
+    # positions[i] and (temp_offset, log_duration_scale) in
+    # offsets[2i:2i+2], least recently rated first. Flat typed arrays take
+    # 12 bytes per dish instead of a dict entry, tuple and two floats.
+    __slots__ = ('temp_offset', 'log_scale', 'updates', 'positions', 'offsets')
+
+    def __init__(self):
+        self.temp_offset = 0.0
+        self.log_scale = 0.0
+        self.updates = 0
+        self.positions = array('i')
+        self.offsets = array('f')
+
+    def find(self, position):
+        try:
+            return self.positions.index(position)
+        except ValueError:
+            return None
+
+    def remove(self, i):
+        del self.positions[i]
+        del self.offsets[2 * i:2 * i + 2]
+
+
+class PersonalizationStore:
+    """
+    Online per-user / per-oven corrections on top of model predictions.
+
+    A profile has an adapter for all of its dishes (an additive
+    temperature offset and a multiplicative duration scale) plus the same
+    pair per dish for up to `max_dishes` dishes. Each rating of a served
+    prediction adds a step to both: the correction r1_engine would train
+    on for it (CORRECTION_FACTORS applied to the served values), scaled by
+    `dish_rate` for the dish pair and `profile_rate` for the profile
+    adapter. Steps accumulate, so repeated 'undercooked' ratings keep
+    raising the dish's corrections until they reach the clamp: offsets
+    stop at +/-`max_temp_offset` degrees and duration scales at
+    [1/max_duration_scale, max_duration_scale]. A 'perfect' rating adds
+    nothing and does not undo earlier steps. Updates and lookups are
+    O(1): at most `max_dishes` entries are scanned, in C.
+
+    At most `max_profiles` profiles are kept; the least recently used is
+    evicted, and within a profile the least recently rated dish.
+
+    The store lives in process memory. Under serve_prefork.py every worker
+    has its own, learns only from the ratings that worker receives, and
+    is rebuilt from feedback_log (which all workers share) on restart.
+    """
+
+    def __init__(self, max_profiles=100000, max_dishes=32, dish_rate=0.5, profile_rate=0.1,
+                 max_temp_offset=40.0, max_duration_scale=1.5):
+        self.max_profiles = max_profiles
+        self.max_dishes = max_dishes
+        self.dish_rate = dish_rate
+        self.profile_rate = profile_rate
+        self.max_temp_offset = max_temp_offset
+        self.max_log_scale = math.log(max_duration_scale)
+
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self._dish_entries = 0
+        self._updates = 0
+        self._applied = 0
+        self._evictions = 0
+
+    def _clamp(self, temp_offset, log_scale):
+        return (min(max(temp_offset, -self.max_temp_offset), self.max_temp_offset),
+                min(max(log_scale, -self.max_log_scale), self.max_log_scale))
+
+    def adjust(self, key, position, prediction):
+        """(temp, duration) with the profile's corrections applied; unchanged for unknown profiles."""
+        temp, duration = prediction
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                return prediction
+            self._profiles.move_to_end(key)
+            i = profile.find(position)
+            dish_temp, dish_log_scale = (0.0, 0.0) if i is None else profile.offsets[2 * i:2 * i + 2]
+            self._applied += 1
+            return (temp + profile.temp_offset + dish_temp,
+                    duration * math.exp(profile.log_scale + dish_log_scale))
+
+    def update(self, key, position, served_temp, served_duration, feedback):
+        """
+        Learns from one rating of a served (temp, duration). Returns False
+        for feedback values without a correction.
+        """
+        factors = CORRECTION_FACTORS.get(feedback)
+        if factors is None:
+            return False
+        temp_delta = (factors[0] - 1.0) * float(served_temp)
+        log_scale_delta = math.log(factors[1])
+
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = _Profile()
+                while len(self._profiles) > self.max_profiles:
+                    _, evicted = self._profiles.popitem(last=False)
+                    self._dish_entries -= len(evicted.positions)
+                    self._evictions += 1
+            else:
+                self._profiles.move_to_end(key)
+
+            profile.temp_offset, profile.log_scale = self._clamp(
+                profile.temp_offset + self.profile_rate * temp_delta,
+                profile.log_scale + self.profile_rate * log_scale_delta)
+            # Moving the dish to the end keeps least-recently-rated order.
+            i = profile.find(position)
+            if i is None:
+                dish_temp = dish_log_scale = 0.0
+                self._dish_entries += 1
+            else:
+                dish_temp, dish_log_scale = profile.offsets[2 * i:2 * i + 2]
+                profile.remove(i)
+            profile.positions.append(position)
+            profile.offsets.extend(self._clamp(dish_temp + self.dish_rate * temp_delta,
+                                               dish_log_scale + self.dish_rate * log_scale_delta))
+            if len(profile.positions) > self.max_dishes:
+                profile.remove(0)
+                self._dish_entries -= 1
+            profile.updates += 1
+            self._updates += 1
+        return True
+
+    def profile(self, key):
+        """A profile's corrections, or None if it has none."""
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                return None
+            return {
+                'temp_offset': profile.temp_offset,
+                'duration_scale': math.exp(profile.log_scale),
+                'updates': profile.updates,
+                'dishes': {position: {'temp_offset': profile.offsets[2 * i],
+                                      'duration_scale': math.exp(profile.offsets[2 * i + 1])}
+                           for i, position in enumerate(profile.positions)},
+            }
+
+    def reset(self, key):
+        """Forgets a profile. Returns whether it existed."""
+        with self._lock:
+            profile = self._profiles.pop(key, None)
+            if profile is None:
+                return False
+            self._dish_entries -= len(profile.positions)
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'profiles': len(self._profiles),
+                'max_profiles': self.max_profiles,
+                'dish_entries': self._dish_entries,
+                'max_dishes': self.max_dishes,
+                'updates': self._updates,
+                'applied': self._applied,
+                'evictions': self._evictions,
+            }
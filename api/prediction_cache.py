@@ -0,0 +1,108 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Bounded LRU + TTL cache of (oven_temp, oven_duration) predictions.
+
+    Keys are (model version, recipe position, temperature bucket,
+    humidity bucket). Room temperature and humidity are snapped to
+    `temp_step` / `humidity_step` wide buckets and callers predict on the
+    bucket centre, so every request in a bucket gets the same answer
+    whether or not it was a hit. A step of 0 disables quantization for
+    that input.
+
+    When the model version changes, entries for the old version are
+    dropped on the next access.
+    """
+
+    def __init__(self, max_entries=4096, ttl_s=3600.0, temp_step=0.5, humidity_step=1.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.temp_step = temp_step
+        self.humidity_step = humidity_step
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _quantize(value, step):
+        value = float(value)
+        if step <= 0 or not math.isfinite(value):
+            return value
+        return round(math.floor(value / step + 0.5) * step, 6)
+
+    def quantize(self, room_temp, room_humidity):
+        """The bucket centre (room_temp, room_humidity) to predict on."""
+        return (self._quantize(room_temp, self.temp_step),
+                self._quantize(room_humidity, self.humidity_step))
+
+    def _check_version(self, version):
+        # Caller holds the lock.
+        if version != self._version:
+            if self._entries:
+                self._invalidations += len(self._entries)
+                self._entries.clear()
+            self._version = version
+
+    def get(self, version, position, room_temp, room_humidity):
+        """Cached prediction for the (already quantized) inputs, or None."""
+        key = (position, room_temp, room_humidity)
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, version, position, room_temp, room_humidity, value):
+        key = (position, room_temp, room_humidity)
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s > 0 else None
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'version': self._version,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_s': self.ttl_s,
+                'temp_step': self.temp_step,
+                'humidity_step': self.humidity_step,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+            }
@@ -0,0 +1,192 @@
+"""
+Preforked multi-process server for the Smart Oven API.
+
+The master process imports app.py, loads the recipe data once (the
+memory-mapped feature cache and the recipe name index), freezes the
+garbage collector so the loaded objects stay in pages shared with the
+workers, binds the listening socket and forks OVEN_WORKERS workers. Every
+worker serves the same Flask app on the shared socket.
+
+What is shared between workers:
+* feature cache arrays: memory-mapped .npy files, read-only, so every
+  worker maps the same page-cache pages,
+* recipe name index: built before fork and shared copy-on-write,
+* without a feature cache, the binary recipe catalog instead: its numpy
+  arrays are loaded before fork and shared copy-on-write,
+* with OVEN_RUNTIME=lite, the TFLite model files are memory-mapped by the
+  interpreter, so model weights are shared through the page cache too.
+
+Workers write to the same feedback database (SQLite serializes the
+commits) and the same telemetry store (per-worker shard files, a
+lock-guarded oven directory). Metrics, prediction caches and
+personalization profiles are per worker.
+
+On SIGTERM the master stops every worker. A worker stops accepting,
+commits its queued feedback and telemetry, then exits. Workers that die
+are restarted.
+
+TensorFlow is not fork-safe once initialized, so with OVEN_RUNTIME=keras
+each worker loads its own copy of the Keras models after the fork. Use
+the lite runtime when running many workers.
+
+Run with:
+    cd api
+    OVEN_RUNTIME=lite OVEN_WORKERS=4 python serve_prefork.py
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import threading
+
+import app as core
+
+PREFORK_WORKERS = int(os.environ.get('OVEN_WORKERS', os.cpu_count() or 1))
+# Components loaded before fork (shared); everything else loads in each worker.
+PRELOAD = ('recipes',)
+
+
+def preload():
+    for name in PRELOAD:
+        core.components.get(name)
+    recipes = core.components.get('recipes')
+    if recipes.feature_cache is None:
+        print("WARNING: no up-to-date feature cache; workers share the binary recipe catalog "
+              "copy-on-write and encode recipes per request. Build it with ml_model/feature_cache.py.")
+    # Objects that exist now are never touched by the cyclic GC again, so
+    # collections in the workers do not dirty (and un-share) their pages.
+    gc.collect()
+    gc.freeze()
+
+
+def close_writers():
+    """
+    Flushes queued feedback and telemetry. Workers leave with os._exit,
+    which skips the atexit hooks that do this in a single-process server.
+    """
+    for name in ('feedback_writer', 'telemetry'):
+        if core.components.is_ready(name):
+            try:
+                core.components.get(name).close()
+            except Exception as e:
+                print(f"Worker {os.getpid()}: closing {name} failed: {e}", flush=True)
+
+
+def worker_main(sock, ready_fd, threaded):
+    from werkzeug.serving import make_server
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Background threads from the master do not exist in the child.
+    core.start_predict_batcher()
+    core.components.warm(background=False)
+    core.start_model_watcher()
+    server = make_server(sock.getsockname()[0], sock.getsockname()[1], core.app,
+                         threaded=threaded, fd=sock.fileno())
+    # shutdown() waits for serve_forever() to return, so it cannot run in
+    # the handler, which interrupts serve_forever() on this thread.
+    signal.signal(signal.SIGTERM,
+                  lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    if ready_fd is not None:
+        os.write(ready_fd, b'.')
+        os.close(ready_fd)
+    server.serve_forever()
+
+
+def spawn(sock, threaded, report_ready=True):
+    """
+    Forks a worker. Returns (pid, fd) where fd is the read end of a pipe
+    the worker writes one byte to once it serves, and that reaches EOF
+    if it dies first. fd is None with report_ready=False.
+    """
+    ready_r, ready_w = os.pipe() if report_ready else (None, None)
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            if ready_r is not None:
+                os.close(ready_r)
+            worker_main(sock, ready_w, threaded)
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 0
+        finally:
+            close_writers()
+            os._exit(code)
+    if ready_w is not None:
+        # Only the worker may hold the write end, or EOF never arrives.
+        os.close(ready_w)
+    return pid, ready_r
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preforked multi-process Smart Oven API server.")
+    parser.add_argument('--workers', type=int, default=PREFORK_WORKERS)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--no-threads', action='store_true',
+                        help="Serve one request at a time per worker.")
+    args = parser.parse_args()
+
+    core.init_db()
+    preload()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    threaded = not args.no_threads
+    workers = set()
+    ready_fds = []
+    for _ in range(args.workers):
+        pid, ready_fd = spawn(sock, threaded)
+        workers.add(pid)
+        ready_fds.append(ready_fd)
+
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # A worker that dies while loading closes its pipe, so this never hangs;
+    # the wait loop below restarts it.
+    ready = 0
+    for ready_fd in ready_fds:
+        ready += len(os.read(ready_fd, 1))
+        os.close(ready_fd)
+    print(f"Serving on http://{args.host}:{args.port} with {ready} workers "
+          f"(runtime={core.SERVING_RUNTIME}).", flush=True)
+
+    # Replace workers that die until asked to stop.
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting.", flush=True)
+            time.sleep(1.0)
+            workers.add(spawn(sock, threaded, report_ready=False)[0])
+    sock.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,497 @@
+import os
+import time
+import calendar
+import queue
+import shutil
+import threading
+import numpy as np
+
+from file_lock import lock_file, unlock_file
+
+# One raw reading, packed: 26 bytes on disk.
+RAW_DTYPE = np.dtype([
+    ('ts', '<f8'),
+    ('oven', '<u4'),
+    ('temperature_c', '<f4'),
+    ('humidity_percent', '<f4'),  # NaN when the oven did not report it
+    ('time_remaining_s', '<f4'),
+    ('relay_on', 'u1'),
+    ('is_cooking', 'u1'),
+])
+
+# Per-oven, per-minute aggregate written by the downsampler.
+ROLLUP_DTYPE = np.dtype([
+    ('ts', '<f8'),
+    ('oven', '<u4'),
+    ('count', '<u2'),
+    ('temperature_mean', '<f4'),
+    ('temperature_min', '<f4'),
+    ('temperature_max', '<f4'),
+    ('humidity_mean', '<f4'),
+    ('relay_on_fraction', '<f4'),
+    ('cooking_fraction', '<f4'),
+])
+
+PARTITION_SECONDS = 3600
+ROLLUP_SECONDS = 60
+
+
+def partition_name(hour):
+    return time.strftime('%Y%m%d%H', time.gmtime(hour * PARTITION_SECONDS))
+
+
+def partition_hour(name):
+    return calendar.timegm(time.strptime(name, '%Y%m%d%H')) // PARTITION_SECONDS
+
+
+def partition_hours(names):
+    """Sorted hours of the partition names that parse; anything else in the directory is ignored."""
+    hours = []
+    for name in names:
+        try:
+            hours.append(partition_hour(name))
+        except ValueError:
+            continue
+    return sorted(hours)
+
+
+class OvenDirectory:
+    """
+    Maps external oven ids (any string) to dense uint32 ids. The mapping
+    is an append-only text file, one oven id per line; an oven's dense id
+    is its line number.
+
+    Several processes (preforked workers) can share the file: new ovens
+    are appended under an exclusive file lock after reading the lines other
+    processes appended, and lookups of unknown ovens re-read the file, so
+    every process agrees on every id.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._names = []
+        self._offset = 0
+        self._file = open(path, 'ab')
+        self._reader = open(path, 'rb')
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        """Reads the complete lines appended since the last refresh."""
+        self._reader.seek(self._offset)
+        data = self._reader.read()
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            name = line.decode('utf-8')
+            self._ids[name] = len(self._names)
+            self._names.append(name)
+        self._offset += end
+
+    def lookup(self, name):
+        """Dense id of an oven, or None if it never sent telemetry."""
+        name = str(name)
+        with self._lock:
+            if name not in self._ids:
+                self._refresh()
+            return self._ids.get(name)
+
+    def ids(self, names):
+        """Dense ids for a list of oven ids, registering new ones."""
+        names = [str(name) for name in names]
+        with self._lock:
+            missing = [name for name in dict.fromkeys(names) if name not in self._ids]
+            if missing:
+                lock_file(self._file)
+                try:
+                    self._refresh()
+                    new = [name for name in missing if name not in self._ids]
+                    if new:
+                        self._file.write(''.join(name + '\n' for name in new).encode('utf-8'))
+                        self._file.flush()
+                        self._refresh()
+                finally:
+                    unlock_file(self._file)
+            return np.array([self._ids[name] for name in names], dtype=np.uint32)
+
+    def name(self, dense):
+        with self._lock:
+            if dense >= len(self._names):
+                self._refresh()
+            return self._names[dense]
+
+    def __len__(self):
+        return len(self._names)
+
+    def close(self):
+        self._file.close()
+        self._reader.close()
+
+
+class TelemetryStore:
+    """
+    Time-partitioned, sharded, append-only store for oven sensor readings.
+
+    Layout under `root`:
+        ovens.txt                          oven id directory
+        raw/<YYYYMMDDHH>/shard_<k>.bin     packed RAW_DTYPE records
+        1m/<YYYYMMDDHH>.npy                per-minute ROLLUP_DTYPE rollups
+
+    Raw readings go to one file per (UTC hour, shard), where the shard is
+    oven_id % n_shards, so an append is one sequential write and a
+    per-oven range query reads only one shard per hour. `maintain()`
+    rolls finished hours up to per-minute aggregates and deletes raw
+    partitions older than `raw_retention_h` and rollups older than
+    `rollup_retention_h`.
+
+    Writes come from one writer thread (`TelemetryWriter`) per process.
+    Several processes (preforked workers) can share `root`: each appends
+    to its own shard files (raw/<hour>/shard_<k>.<pid>.bin), the oven
+    directory is shared (see OvenDirectory), and maintenance runs in one
+    process at a time under a file lock. Queries read every process's files
+    and may miss only the newest unflushed records.
+    """
+
+    def __init__(self, root, n_shards=16, raw_retention_h=48, rollup_retention_h=24 * 90):
+        self.root = root
+        self.n_shards = n_shards
+        self.raw_retention_h = raw_retention_h
+        self.rollup_retention_h = rollup_retention_h
+        os.makedirs(os.path.join(root, 'raw'), exist_ok=True)
+        os.makedirs(os.path.join(root, '1m'), exist_ok=True)
+        self.ovens = OvenDirectory(os.path.join(root, 'ovens.txt'))
+        self._files = {}
+        # append() runs on the writer thread, maintain() on the maintenance thread.
+        self._files_lock = threading.Lock()
+        self._maintenance_lock_path = os.path.join(root, 'maintenance.lock')
+
+    def _raw_dir(self, hour):
+        return os.path.join(self.root, 'raw', partition_name(hour))
+
+    def _shard_path(self, hour, shard):
+        # This process's file for the shard; other writers have their own.
+        return os.path.join(self._raw_dir(hour), f'shard_{shard:03d}.{os.getpid()}.bin')
+
+    def _rollup_path(self, hour):
+        return os.path.join(self.root, '1m', partition_name(hour) + '.npy')
+
+    def append(self, records):
+        """Appends a RAW_DTYPE array. Called from the writer thread only."""
+        if len(records) == 0:
+            return
+        hours = (records['ts'] // PARTITION_SECONDS).astype(np.int64)
+        shards = records['oven'] % self.n_shards
+        keys = hours * self.n_shards + shards
+        order = np.argsort(keys, kind='stable')
+        records, keys = records[order], keys[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        with self._files_lock:
+            for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(keys)]):
+                hour, shard = divmod(int(keys[start]), self.n_shards)
+                f = self._files.get((hour, shard))
+                if f is None:
+                    os.makedirs(self._raw_dir(hour), exist_ok=True)
+                    f = self._files[(hour, shard)] = open(self._shard_path(hour, shard), 'ab')
+                f.write(records[start:stop].tobytes())
+
+    def flush(self):
+        with self._files_lock:
+            for f in self._files.values():
+                f.flush()
+
+    def _close_files(self, before_hour=None):
+        with self._files_lock:
+            for key in list(self._files):
+                if before_hour is None or key[0] < before_hour:
+                    self._files.pop(key).close()
+
+    def close(self):
+        self._close_files()
+        self.ovens.close()
+
+    def raw_hours(self):
+        return partition_hours(os.listdir(os.path.join(self.root, 'raw')))
+
+    def rollup_hours(self):
+        return partition_hours(name[:-4] for name in os.listdir(os.path.join(self.root, '1m'))
+                               if name.endswith('.npy'))
+
+    def _raw_shards(self, hour):
+        """Shard numbers with raw files in an hour (whatever n_shards was when they were written)."""
+        directory = self._raw_dir(hour)
+        if not os.path.isdir(directory):
+            return []
+        return sorted({int(name.split('.')[0][len('shard_'):]) for name in os.listdir(directory)
+                       if name.startswith('shard_')})
+
+    def _read_raw(self, hour, shard=None):
+        directory = self._raw_dir(hour)
+        if not os.path.isdir(directory):
+            return np.empty(0, dtype=RAW_DTYPE)
+        names = sorted(os.listdir(directory))
+        if shard is not None:
+            names = [name for name in names if name.split('.')[0] == f'shard_{shard:03d}']
+        parts = []
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                # Ignore a trailing partial record from an interrupted write.
+                count = os.path.getsize(path) // RAW_DTYPE.itemsize
+                parts.append(np.fromfile(path, dtype=RAW_DTYPE, count=count))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RAW_DTYPE)
+
+    @staticmethod
+    def _aggregate(raw, hour):
+        """Per-oven, per-minute ROLLUP_DTYPE aggregates of one hour of raw records."""
+        if len(raw) == 0:
+            return np.empty(0, dtype=ROLLUP_DTYPE)
+        minutes_per_partition = PARTITION_SECONDS // ROLLUP_SECONDS
+        minute = ((raw['ts'] - hour * PARTITION_SECONDS) // ROLLUP_SECONDS).astype(np.int64)
+        keys = raw['oven'].astype(np.int64) * minutes_per_partition + minute
+        order = np.argsort(keys, kind='stable')
+        raw, keys = raw[order], keys[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+        counts = np.diff(np.r_[starts, len(keys)])
+
+        out = np.empty(len(starts), dtype=ROLLUP_DTYPE)
+        out['oven'] = raw['oven'][starts]
+        out['ts'] = hour * PARTITION_SECONDS + (keys[starts] % minutes_per_partition) * ROLLUP_SECONDS
+        out['count'] = counts
+        out['temperature_mean'] = np.add.reduceat(raw['temperature_c'].astype(np.float64), starts) / counts
+        out['temperature_min'] = np.minimum.reduceat(raw['temperature_c'], starts)
+        out['temperature_max'] = np.maximum.reduceat(raw['temperature_c'], starts)
+        # Mean of the readings that have humidity; NaN for a minute with none.
+        humidity = raw['humidity_percent'].astype(np.float64)
+        reported = np.isfinite(humidity)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out['humidity_mean'] = (np.add.reduceat(np.where(reported, humidity, 0.0), starts)
+                                    / np.add.reduceat(reported.astype(np.int64), starts))
+        out['relay_on_fraction'] = np.add.reduceat(raw['relay_on'].astype(np.float64), starts) / counts
+        out['cooking_fraction'] = np.add.reduceat(raw['is_cooking'].astype(np.float64), starts) / counts
+        return out
+
+    def rollup(self, hour):
+        """
+        Writes the per-minute rollup of one raw hour. Returns its row count.
+        Shards hold disjoint sets of ovens, so they are aggregated one at a
+        time: only one shard's raw hour is in memory at once.
+        """
+        parts = [self._aggregate(self._read_raw(hour, shard), hour) for shard in self._raw_shards(hour)]
+        out = np.concatenate(parts)
+        if len(out) == 0:
+            return 0
+
+        path = self._rollup_path(hour)
+        tmp_path = f'{path}.{os.getpid()}.tmp.npy'
+        np.save(tmp_path, out)
+        os.replace(tmp_path, path)
+        return len(out)
+
+    def maintain(self, now=None, grace_s=300):
+        """
+        Rolls up every finished hour whose raw data changed since its last
+        rollup (late readings included), then applies retention.
+        """
+        now = time.time() if now is None else now
+        current_hour = int(now // PARTITION_SECONDS)
+        self.flush()
+        # Hours that can no longer receive on-time data are closed for writing.
+        finished_before = int((now - grace_s) // PARTITION_SECONDS)
+        self._close_files(before_hour=finished_before)
+
+        with open(self._maintenance_lock_path, 'a') as lock:
+            if not lock_file(lock, blocking=False):
+                # Another process is maintaining the store right now.
+                return {'rolled_up': 0, 'dropped_raw_hours': 0, 'dropped_rollup_hours': 0, 'skipped': True}
+            try:
+                return self._maintain_locked(current_hour, finished_before)
+            finally:
+                unlock_file(lock)
+
+    def _maintain_locked(self, current_hour, finished_before):
+        rolled = 0
+        for hour in self.raw_hours():
+            if hour >= finished_before:
+                continue
+            raw_dir = self._raw_dir(hour)
+            newest = max((os.path.getmtime(os.path.join(raw_dir, n)) for n in os.listdir(raw_dir)), default=0)
+            path = self._rollup_path(hour)
+            if not os.path.exists(path) or os.path.getmtime(path) < newest:
+                self.rollup(hour)
+                rolled += 1
+
+        dropped_raw = dropped_rollups = 0
+        for hour in self.raw_hours():
+            if hour < current_hour - self.raw_retention_h and os.path.exists(self._rollup_path(hour)):
+                self._close_files(before_hour=hour + 1)
+                shutil.rmtree(self._raw_dir(hour), ignore_errors=True)
+                dropped_raw += 1
+        for hour in self.rollup_hours():
+            if hour < current_hour - self.rollup_retention_h:
+                os.remove(self._rollup_path(hour))
+                dropped_rollups += 1
+        return {'rolled_up': rolled, 'dropped_raw_hours': dropped_raw, 'dropped_rollup_hours': dropped_rollups}
+
+    def query(self, oven_id, start, end, resolution='auto'):
+        """
+        Readings of one oven with start <= ts < end, oldest first, as a
+        structured array. `resolution` is 'raw', '1m' or 'auto' (raw for
+        ranges up to 6 hours while raw data is retained, else 1m).
+        Returns (resolution, records).
+        """
+        dense = self.ovens.lookup(oven_id)
+        if resolution == 'auto':
+            oldest_raw = int(time.time() // PARTITION_SECONDS) - self.raw_retention_h
+            short = end - start <= 6 * PARTITION_SECONDS
+            resolution = 'raw' if short and start // PARTITION_SECONDS >= oldest_raw else '1m'
+        dtype = RAW_DTYPE if resolution == 'raw' else ROLLUP_DTYPE
+        if dense is None:
+            return resolution, np.empty(0, dtype=dtype)
+
+        # Only partitions that exist: a wide range (e.g. start=0) costs two
+        # directory listings, not one filesystem call per hour.
+        first, last = int(start // PARTITION_SECONDS), int((end - 1e-9) // PARTITION_SECONDS)
+        hours = set(self.raw_hours())
+        if resolution != 'raw':
+            hours.update(self.rollup_hours())
+        parts = []
+        for hour in sorted(h for h in hours if first <= h <= last):
+            if resolution == 'raw':
+                records = self._read_raw(hour, shard=dense % self.n_shards)
+            else:
+                path = self._rollup_path(hour)
+                if os.path.exists(path):
+                    records = np.load(path, mmap_mode='r')
+                else:
+                    # Hour not rolled up yet (e.g. the current one): aggregate its raw shard.
+                    records = self._aggregate(self._read_raw(hour, shard=dense % self.n_shards), hour)
+            mask = (records['oven'] == dense) & (records['ts'] >= start) & (records['ts'] < end)
+            parts.append(np.asarray(records[mask]))
+        if not parts:
+            return resolution, np.empty(0, dtype=dtype)
+        records = np.concatenate(parts)
+        return resolution, records[np.argsort(records['ts'], kind='stable')]
+
+
+class TelemetryWriter:
+    """
+    Write-behind ingestion for the telemetry store.
+
+    Request threads `submit()` batches of readings (columns as arrays);
+    one background thread concatenates whatever queued up, appends it and
+    flushes every `flush_interval_s`. A second thread runs
+    `store.maintain()` every `maintain_interval_s`, so a long rollup never
+    holds up ingestion.
+    """
+
+    def __init__(self, store, flush_interval_s=1.0, maintain_interval_s=60.0, max_queue=1024):
+        self.store = store
+        self.flush_interval_s = flush_interval_s
+        self.maintain_interval_s = maintain_interval_s
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._accepted = 0
+        self._written = 0
+        self._dropped = 0
+        self._appends = 0
+        self._last_maintenance = None
+        self._closed = False
+        self._stop_maintenance = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='telemetry-writer', daemon=True)
+        self._thread.start()
+        self._maintenance_thread = threading.Thread(target=self._run_maintenance, name='telemetry-maintenance',
+                                                    daemon=True)
+        self._maintenance_thread.start()
+
+    def submit(self, oven_ids, ts, temperature_c, humidity_percent, time_remaining_s, relay_on, is_cooking):
+        """
+        Queues one batch. Returns False (and counts the readings as
+        dropped) when the writer is too far behind.
+        """
+        if self._closed:
+            raise RuntimeError("Telemetry writer is closed.")
+        records = np.empty(len(oven_ids), dtype=RAW_DTYPE)
+        records['oven'] = self.store.ovens.ids(oven_ids)
+        records['ts'] = ts
+        records['temperature_c'] = temperature_c
+        records['humidity_percent'] = humidity_percent
+        records['time_remaining_s'] = time_remaining_s
+        records['relay_on'] = relay_on
+        records['is_cooking'] = is_cooking
+        try:
+            self._queue.put_nowait(records)
+        except queue.Full:
+            with self._lock:
+                self._dropped += len(records)
+            return False
+        with self._lock:
+            self._accepted += len(records)
+        return True
+
+    def close(self, timeout=None):
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_maintenance.set()
+        self._maintenance_thread.join(timeout)
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run_maintenance(self):
+        while True:
+            try:
+                self._last_maintenance = self.store.maintain()
+            except Exception as e:
+                print(f"Telemetry maintenance failed: {e}")
+            if self._stop_maintenance.wait(self.maintain_interval_s):
+                return
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval_s
+        stop = False
+        while not stop:
+            batches = []
+            try:
+                first = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+                if first is None:
+                    stop = True
+                else:
+                    batches.append(first)
+                while True:
+                    entry = self._queue.get_nowait()
+                    if entry is None:
+                        stop = True
+                        continue
+                    batches.append(entry)
+            except queue.Empty:
+                pass
+            if batches:
+                records = np.concatenate(batches)
+                try:
+                    self.store.append(records)
+                    with self._lock:
+                        self._written += len(records)
+                        self._appends += 1
+                except Exception as e:
+                    print(f"Telemetry append failed: {e}")
+                    with self._lock:
+                        self._dropped += len(records)
+            now = time.monotonic()
+            if now >= next_flush or stop:
+                self.store.flush()
+                next_flush = now + self.flush_interval_s
+        self.store.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'accepted': self._accepted,
+                'written': self._written,
+                'dropped': self._dropped,
+                'appends': self._appends,
+                'ovens': len(self.store.ovens),
+                'shards': self.store.n_shards,
+                'last_maintenance': self._last_maintenance,
+            }
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+ML_DIR = os.path.join(PROJECT_ROOT, 'ml_model')
+DEFAULT_CSV = os.path.join(PROJECT_ROOT, 'data', 'processed', 'processed_oven_recipes_v2.csv')
+
+RESULT_MARKER = 'BENCH_RESULT '
+
+# Each measurement runs in a fresh interpreter from ml_model/.
+CHILD_SCRIPT = r'''
+import gc, json, resource, sys, time
+import numpy as np, pandas as pd
+mode, csv_path, catalog_path = sys.argv[1:4]
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+objects_before = len(gc.get_objects())
+rss_before = rss_mb()
+t0 = time.perf_counter()
+if mode == 'csv':
+    import ast
+    recipe_lookup = pd.read_csv(csv_path)
+    recipe_lookup['ingredient_ids'] = recipe_lookup['ingredient_ids'].apply(ast.literal_eval)
+    recipe_lookup['tags'] = recipe_lookup['tags'].apply(ast.literal_eval)
+    recipe_lookup.set_index('name', inplace=True)
+    rows = len(recipe_lookup)
+else:
+    from recipe_catalog import RecipeCatalog
+    catalog = RecipeCatalog(catalog_path)
+    rows = len(catalog)
+load_s = time.perf_counter() - t0
+result = {
+    'rows': rows,
+    'load_s': load_s,
+    'rss_delta_mb': rss_mb() - rss_before,
+    'gc_tracked_objects_created': len(gc.get_objects()) - objects_before,
+}
+print(%r + json.dumps(result), flush=True)
+''' % RESULT_MARKER
+
+
+def write_synthetic_csv(path, n_rows, seed=0):
+    """A recipe CSV in the processed_oven_recipes_v2.csv layout."""
+    import pandas as pd
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        rows.append({
+            'id': i,
+            'name': f'recipe {i}',
+            'rating': round(rng.uniform(1, 5), 3),
+            'Room_Temp': round(rng.uniform(15, 30), 1),
+            'Room_Humidity': round(rng.uniform(30, 70), 1),
+            'ingredient_ids': str(rng.sample(range(5000), rng.randint(3, 15))),
+            'tags': str([f'tag{rng.randrange(500)}' for _ in range(rng.randint(1, 8))]),
+            'Oven_Temp': rng.choice([325, 350, 375, 400, 425]),
+            'Oven_Duration': rng.randint(10, 120),
+        })
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def measure(mode, csv_path, catalog_path):
+    proc = subprocess.run([sys.executable, '-c', CHILD_SCRIPT, mode, csv_path, catalog_path],
+                          cwd=ML_DIR, capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{mode} run failed:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+
+
+def summarize(runs):
+    summary = dict(runs[0])
+    for key in ('load_s', 'rss_delta_mb'):
+        summary[key] = statistics.median(run[key] for run in runs)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recipe table load time: CSV + literal_eval vs binary catalog.")
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help="Benchmark a generated CSV with this many rows instead of --csv.")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    sys.path.append(ML_DIR)
+    from recipe_catalog import build_catalog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv
+        if args.synthetic:
+            csv_path = os.path.join(tmp, 'recipes.csv')
+            print(f"Writing {args.synthetic} synthetic recipes...", file=sys.stderr)
+            write_synthetic_csv(csv_path, args.synthetic)
+        catalog_path = os.path.join(tmp, 'recipe_catalog.npz')
+        build_catalog(csv_path, catalog_path)
+
+        report = {
+            'csv_mb': os.path.getsize(csv_path) / 2**20,
+            'catalog_mb': os.path.getsize(catalog_path) / 2**20,
+        }
+        for mode in ('csv', 'catalog'):
+            print(f"Measuring {mode} load...", file=sys.stderr)
+            report[mode] = summarize([measure(mode, csv_path, catalog_path) for _ in range(args.repeats)])
+
+    report['speedup'] = report['csv']['load_s'] / report['catalog']['load_s']
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
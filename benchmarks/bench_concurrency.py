@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+API_DIR = os.path.join(PROJECT_ROOT, 'api')
+
+# Flask without the debug reloader, threaded like a typical single-process deployment.
+FLASK_SERVER = r'''
+import sys, app
+app.init_db()
+app.components.warm(background=False)
+app.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)
+'''
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, port, env):
+    if mode == 'flask':
+        cmd = [sys.executable, '-c', FLASK_SERVER, str(port)]
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'app_async:app', '--host', '127.0.0.1',
+               '--port', str(port), '--log-level', 'warning', '--no-access-log']
+    return subprocess.Popen(cmd, cwd=API_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def request(port, method, path, body=None, timeout=60):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def wait_ready(port, proc, timeout=300):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("Server exited during startup.")
+        try:
+            status, _ = request(port, 'GET', '/readyz', timeout=5)
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("Server did not become ready.")
+
+
+def run_level(port, path, make_body, concurrency, seconds):
+    """Closed loop: `concurrency` clients each send the next request as soon as the last returns."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client(worker_id):
+        local, failed, i = [], 0, 0
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                status, _ = request(port, 'POST', path, make_body(worker_id, i))
+                ok = status < 300
+            except OSError:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - start)
+            else:
+                failed += 1
+            i += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(w,)) for w in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    n = len(latencies)
+    return {
+        'concurrency': concurrency,
+        'requests': n,
+        'errors': errors[0],
+        'requests_per_second': n / elapsed,
+        'p50_ms': 1000 * latencies[n // 2] if n else None,
+        'p99_ms': 1000 * latencies[min(n - 1, int(n * 0.99))] if n else None,
+    }
+
+
+def load_dish_names(limit=200):
+    import pandas as pd
+    path = os.path.join(PROJECT_ROOT, 'data', 'processed', 'processed_oven_recipes_v2.csv')
+    return pd.read_csv(path, usecols=['name'], nrows=limit)['name'].tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /predict and /feedback load: Flask vs ASGI.")
+    parser.add_argument('--modes', default='flask,async')
+    parser.add_argument('--concurrency', default='1,8,32,64',
+                        help="Comma-separated numbers of concurrent clients.")
+    parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each level.")
+    parser.add_argument('--runtime', default=os.environ.get('OVEN_RUNTIME', 'keras'))
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    dishes = load_dish_names()
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    # Vary the sensors so the prediction cache does not answer everything.
+    def predict_body(worker_id, i):
+        return {'dish_name': dishes[(worker_id * 7919 + i) % len(dishes)],
+                'room_temp': 15.0 + (i % 30), 'room_humidity': 30.0 + (worker_id % 40)}
+
+    def feedback_body(worker_id, i):
+        return {'dish_name': dishes[i % len(dishes)], 'room_temp': 20.0, 'room_humidity': 50.0,
+                'predicted_temp': 350, 'predicted_duration': 30, 'user_feedback': 1}
+
+    report = {'runtime': args.runtime, 'seconds_per_level': args.seconds}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes.split(','):
+            env = dict(os.environ, OVEN_RUNTIME=args.runtime, TF_CPP_MIN_LOG_LEVEL='3',
+                       OVEN_DB_PATH=os.path.join(tmp, f'{mode}.db'),
+                       OVEN_MODEL_WATCH_INTERVAL_S='0')
+            port = free_port()
+            print(f"Starting {mode} server on port {port}...", file=sys.stderr)
+            proc = start_server(mode, port, env)
+            try:
+                wait_ready(port, proc)
+                results = {'predict': [], 'feedback': []}
+                for level in levels:
+                    print(f"  {mode}: {level} clients", file=sys.stderr)
+                    results['predict'].append(run_level(port, '/predict', predict_body, level, args.seconds))
+                    results['feedback'].append(run_level(port, '/feedback', feedback_body, level, args.seconds))
+                report[mode] = results
+            finally:
+                proc.terminate()
+                proc.wait()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
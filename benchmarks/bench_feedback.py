@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+sys.path.append(os.path.join(PROJECT_ROOT, 'api'))
+from feedback_writer import FeedbackWriter
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS feedback_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+    dish_name TEXT NOT NULL,
+    room_temp REAL,
+    room_humidity REAL,
+    predicted_temp REAL,
+    predicted_duration REAL,
+    user_feedback INTEGER
+)
+'''
+INSERT_SQL = '''
+    INSERT INTO feedback_log (
+        dish_name, room_temp, room_humidity,
+        predicted_temp, predicted_duration, user_feedback
+    ) VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+def make_rows(n, seed=0):
+    rng = random.Random(seed)
+    dishes = ['apple pie', 'pizza', 'roast chicken', 'lasagna', 'banana bread']
+    return [(rng.choice(dishes), round(rng.uniform(15, 30), 1), round(rng.uniform(30, 70), 1),
+             rng.choice([325, 350, 375, 400]), rng.randint(10, 90), rng.choice([-1, 0, 1]))
+            for _ in range(n)]
+
+
+def connect_per_request(db_path, row):
+    """What /feedback did before the write-behind writer."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.execute(INSERT_SQL, row)
+    conn.commit()
+    conn.close()
+
+
+def run_threads(n_threads, rows, insert_one):
+    chunks = [rows[i::n_threads] for i in range(n_threads)]
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        local = []
+        for row in chunk:
+            start = time.perf_counter()
+            insert_one(row)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'rows': len(rows),
+        'threads': n_threads,
+        'seconds': elapsed,
+        'inserts_per_second': len(rows) / elapsed,
+        'p50_ms': 1000 * latencies[len(latencies) // 2],
+        'p99_ms': 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def fresh_db(directory, name, wal):
+    path = os.path.join(directory, name)
+    conn = sqlite3.connect(path)
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(SCHEMA)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def count_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    n = conn.execute("SELECT COUNT(*) FROM feedback_log").fetchone()[0]
+    conn.close()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feedback insert throughput: connect-per-request vs write-behind.")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=0.0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        before_db = fresh_db(tmp, 'before.db', wal=False)
+        print("Measuring connect-per-request inserts...", file=sys.stderr)
+        report['connect_per_request'] = run_threads(
+            args.threads, rows, lambda row: connect_per_request(before_db, row))
+        report['connect_per_request']['rows_in_db'] = count_rows(before_db)
+
+        after_db = fresh_db(tmp, 'after.db', wal=True)
+        print("Measuring write-behind group commit...", file=sys.stderr)
+        writer = FeedbackWriter(after_db, max_batch_size=args.batch_size, max_wait_ms=args.max_wait_ms)
+        report['write_behind'] = run_threads(
+            args.threads, rows, lambda row: writer.submit(row).result())
+        writer_stats = writer.stats()
+        writer.close()
+        report['write_behind']['rows_in_db'] = count_rows(after_db)
+        report['write_behind']['rows_per_commit'] = writer_stats['rows_per_commit']
+
+    report['speedup'] = (report['write_behind']['inserts_per_second']
+                         / report['connect_per_request']['inserts_per_second'])
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
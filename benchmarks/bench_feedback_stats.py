@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+sys.path.append(os.path.join(PROJECT_ROOT, 'api'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'ml_model'))
+
+import synthetic
+from bench_feedback import SCHEMA
+from feedback_stats import FeedbackStats, ensure_schema
+
+# The aggregate a /stats query replaces, computed from the raw rows.
+FULL_SCAN_SQL = '''
+    SELECT COUNT(*), SUM(user_feedback = 1), SUM(user_feedback = 0), SUM(user_feedback = -1),
+           AVG(predicted_temp), AVG(predicted_duration)
+    FROM feedback_log WHERE dish_name = ?
+'''
+
+
+def feedback_rows(dish_names, n, start_ts, days, seed):
+    """feedback_log rows with timestamps spread evenly over `days` days."""
+    df = synthetic.synthetic_feedback(dish_names, n, seed)
+    ts = start_ts + np.sort(np.random.default_rng(seed).uniform(0, days * 86400, n))
+    stamps = [time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(t)) for t in ts]
+    return list(zip(stamps, df['dish_name'], df['room_temp'], df['room_humidity'],
+                    df['predicted_temp'], df['predicted_duration'], df['user_feedback'].astype(int).tolist()))
+
+
+def insert_rows(conn, rows, batch_size):
+    """Inserts in group-commit batches like FeedbackWriter; returns rows per second."""
+    t = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        conn.executemany(
+            "INSERT INTO feedback_log (timestamp, dish_name, room_temp, room_humidity, "
+            "predicted_temp, predicted_duration, user_feedback) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows[i:i + batch_size])
+        conn.commit()
+    return len(rows) / (time.perf_counter() - t)
+
+
+def latency(fn, calls):
+    runs = []
+    for args in calls:
+        t = time.perf_counter()
+        fn(*args)
+        runs.append(1000 * (time.perf_counter() - t))
+    runs.sort()
+    return {'p50_ms': statistics.median(runs), 'p99_ms': runs[int(0.99 * (len(runs) - 1))],
+            'max_ms': runs[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="feedback_log aggregates: insert overhead and /stats query latency.")
+    parser.add_argument('--rows', type=int, default=2000000,
+                        help="Rows in the benchmark table (use 20000000 or more for production scale).")
+    parser.add_argument('--dishes', type=int, default=50000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--batch-size', type=int, default=256,
+                        help="Rows per commit, as in FeedbackWriter's group commit.")
+    parser.add_argument('--insert-rows', type=int, default=50000,
+                        help="Rows inserted to compare insert throughput with and without the aggregates.")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--full-scans', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    dish_names = synthetic.synthetic_names(args.dishes, args.seed)
+    start_ts = time.time() // 86400 * 86400 - args.days * 86400
+    report = {'rows': args.rows, 'dishes': args.dishes, 'days': args.days}
+    rng = np.random.default_rng(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'oven_logs.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(SCHEMA)
+
+        print(f"Loading {args.rows} rows...", file=sys.stderr)
+        t = time.perf_counter()
+        for i in range(0, args.rows, 1000000):
+            insert_rows(conn, feedback_rows(dish_names, min(1000000, args.rows - i), start_ts,
+                                            args.days, args.seed + i), 100000)
+        report['load_s'] = time.perf_counter() - t
+
+        # Existing databases get the indexes and aggregates on the next init_db().
+        t = time.perf_counter()
+        ensure_schema(conn)
+        report['build_s'] = time.perf_counter() - t
+
+        # Insert overhead of the indexes and triggers, at the writer's commit size.
+        extra = feedback_rows(dish_names, args.insert_rows, time.time() - 3600, 1 / 24, args.seed + 1)
+        report['insert_rows_per_s'] = {'with_stats': insert_rows(conn, extra, args.batch_size)}
+        plain = sqlite3.connect(os.path.join(tmp, 'plain.db'))
+        plain.execute("PRAGMA journal_mode=WAL")
+        plain.execute(SCHEMA)
+        report['insert_rows_per_s']['plain_table'] = insert_rows(plain, extra, args.batch_size)
+        plain.close()
+        conn.close()
+
+        stats = FeedbackStats(db_path)
+        end_ts = time.time()
+        dishes = [[dish_names[i]] for i in rng.integers(0, args.dishes, args.queries)]
+        windows = []
+        for _ in range(args.queries):
+            # Random edges, so most windows have partial hours at both ends.
+            a, b = np.sort(rng.uniform(start_ts, end_ts, 2))
+            windows.append((float(a), float(b)))
+        report['query'] = {
+            'dish_all_time': latency(stats.query, dishes),
+            'dish_window': latency(stats.query, [(d[0], a, b) for d, (a, b) in zip(dishes, windows)]),
+            'all_dishes_window': latency(stats.query, [(None, a, b) for a, b in windows]),
+            'all_dishes_last_day': latency(stats.query, [(None, end_ts - 86400, end_ts)] * args.queries),
+            'all_dishes_all_time': latency(stats.query, [()] * args.queries),
+            'dish_hourly_series_7d': latency(stats.hourly, [(d[0], end_ts - 7 * 86400, end_ts) for d in dishes]),
+        }
+
+        # One check that the aggregates agree with the raw rows.
+        raw = sqlite3.connect(db_path)
+        dish = dishes[0][0]
+        a, b = windows[0]
+        expected = raw.execute(
+            "SELECT COUNT(*), TOTAL(user_feedback = 0) FROM feedback_log "
+            "WHERE dish_name = ? AND timestamp >= ? AND timestamp < ?",
+            (dish, time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(np.ceil(a))),
+             time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(np.ceil(b))))).fetchone()
+        got = stats.query(dish, a, b)
+        report['consistent'] = [got['count'], got['feedback']['undercooked']] == [expected[0], int(expected[1])]
+
+        # What a per-dish query costs without the aggregates or the dish index.
+        runs = []
+        for (dish,) in dishes[:args.full_scans]:
+            t = time.perf_counter()
+            raw.execute(FULL_SCAN_SQL.replace('FROM feedback_log', 'FROM feedback_log NOT INDEXED'),
+                        (dish,)).fetchone()
+            runs.append(1000 * (time.perf_counter() - t))
+        report['query']['dish_full_scan'] = {'p50_ms': statistics.median(runs)}
+        raw.close()
+        report['db_mb'] = os.path.getsize(db_path) / 1e6
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
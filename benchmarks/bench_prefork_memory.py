@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import http.client
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+API_DIR = os.path.join(PROJECT_ROOT, 'api')
+
+# One standalone server process that loads everything itself (no sharing).
+STANDALONE_SERVER = r'''
+import sys, app
+app.init_db()
+app.components.warm(background=False)
+print("Serving", flush=True)
+app.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)
+'''
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_kb(pid):
+    """(rss_kb, pss_kb) of one process from smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0]] = int(parts[1])
+    return values.get('Rss:', 0), values.get('Pss:', 0)
+
+
+def total_memory(pids):
+    rss = pss = 0
+    for pid in pids:
+        r, p = memory_kb(pid)
+        rss += r
+        pss += p
+    return {'processes': len(pids), 'rss_mb': rss / 1024, 'pss_mb': pss / 1024}
+
+
+def wait_for_line(proc, marker, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("Server exited during startup.")
+        if marker in line:
+            return
+    raise RuntimeError("Server did not become ready.")
+
+
+def touch(port, dish, n=20):
+    """Sends a few predictions so lazily touched pages are counted."""
+    for i in range(n):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        body = json.dumps({'dish_name': dish, 'room_temp': 15.0 + i, 'room_humidity': 50.0})
+        conn.request('POST', '/predict', body=body, headers={'Content-Type': 'application/json'})
+        conn.getresponse().read()
+        conn.close()
+
+
+def measure_prefork(workers, env, dish):
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, 'serve_prefork.py', '--workers', str(workers),
+                             '--port', str(port)],
+                            cwd=API_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        wait_for_line(proc, 'Serving on')
+        touch(port, dish, n=5 * workers)
+        return total_memory([proc.pid] + children(proc.pid))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def measure_standalone(workers, env, dish):
+    procs = []
+    try:
+        for _ in range(workers):
+            port = free_port()
+            proc = subprocess.Popen([sys.executable, '-c', STANDALONE_SERVER, str(port)],
+                                    cwd=API_DIR, env=env, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True)
+            procs.append((proc, port))
+        for proc, port in procs:
+            wait_for_line(proc, 'Serving')
+            time.sleep(0.5)
+            touch(port, dish, n=5)
+        return total_memory([proc.pid for proc, _ in procs])
+    finally:
+        for proc, _ in procs:
+            proc.terminate()
+            proc.wait()
+
+
+def first_dish_name():
+    import pandas as pd
+    path = os.path.join(PROJECT_ROOT, 'data', 'processed', 'processed_oven_recipes_v2.csv')
+    return pd.read_csv(path, usecols=['name'], nrows=1)['name'][0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Total RSS/PSS versus worker count: preforked vs independent processes.")
+    parser.add_argument('--workers', default='1,2,4,8', help="Comma-separated worker counts.")
+    parser.add_argument('--runtime', default=os.environ.get('OVEN_RUNTIME', 'lite'))
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    env = dict(os.environ, OVEN_RUNTIME=args.runtime, TF_CPP_MIN_LOG_LEVEL='3',
+               OVEN_MODEL_WATCH_INTERVAL_S='0', OVEN_PREDICT_BATCH_MAX_SIZE='1')
+    dish = first_dish_name()
+    report = {'runtime': args.runtime,
+              'note': "PSS splits shared pages between the processes that map them; "
+                      "its total is the real memory footprint. RSS counts shared pages once per process.",
+              'prefork': [], 'independent': []}
+    for workers in [int(w) for w in args.workers.split(',')]:
+        print(f"Measuring {workers} workers...", file=sys.stderr)
+        report['prefork'].append(dict(measure_prefork(workers, env, dish), workers=workers))
+        report['independent'].append(dict(measure_standalone(workers, env, dish), workers=workers))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+sys.path.append(os.path.join(PROJECT_ROOT, 'ml_model'))
+
+import synthetic
+from recipe_catalog import build_catalog, RecipeCatalog
+from sparse_inputs import to_sparse_model, CompiledModel
+
+
+def nbytes(matrix):
+    if hasattr(matrix, 'indptr'):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+
+def median_seconds(fn, repeats):
+    runs = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t)
+    return statistics.median(runs)
+
+
+def encode(catalog, preprocessors, positions, sparse):
+    multi_hot = catalog.sparse_multi_hot if sparse else catalog.multi_hot
+    return (multi_hot('ingredients', positions, preprocessors.ingredient_binarizer.classes_),
+            multi_hot('tags', positions, preprocessors.tag_binarizer.classes_))
+
+
+def model_inputs(df, preprocessors, catalog, positions, sparse):
+    ingredients, tags = encode(catalog, preprocessors, positions, sparse)
+    rows = df.iloc[positions]
+    return [preprocessors.name_encoder.transform(rows[['name']]),
+            preprocessors.env_scaler.transform(rows[['Room_Temp', 'Room_Humidity']]),
+            ingredients, tags]
+
+
+def bench_vocabulary(tmp, n_ingredients, n_tags, args):
+    import tensorflow as tf
+    import r1_engine
+
+    tf.keras.utils.set_random_seed(args.seed)
+    df = synthetic.synthetic_recipes(args.recipes, n_ingredients, n_tags, args.seed)
+    csv_path = os.path.join(tmp, f'recipes_{n_ingredients}_{n_tags}.csv')
+    catalog_path = csv_path.replace('.csv', '.npz')
+    synthetic.write_recipe_csv(df, csv_path)
+    build_catalog(csv_path, catalog_path)
+    catalog = RecipeCatalog(catalog_path)
+    preprocessors = synthetic.fit_preprocessors(df)
+    model = synthetic.build_predictor_model(len(preprocessors.name_encoder.categories_[0]),
+                                            len(preprocessors.ingredient_binarizer.classes_),
+                                            len(preprocessors.tag_binarizer.classes_))
+    sparse_model = to_sparse_model(model)
+    # model.predict() is how the dense path is served; CompiledModel is how the sparse one is.
+    models = {'dense_keras_predict': (model, False), 'dense_compiled': (CompiledModel(model), False),
+              'sparse_keras_predict': (sparse_model, True), 'sparse_compiled': (CompiledModel(sparse_model), True)}
+    rng = np.random.default_rng(args.seed)
+    report = {'ingredient_vocab': len(preprocessors.ingredient_binarizer.classes_),
+              'tag_vocab': len(preprocessors.tag_binarizer.classes_)}
+
+    # Encoding: time and bytes of the ingredient + tag inputs.
+    for rows in args.batch_sizes:
+        positions = rng.integers(0, len(catalog), rows)
+        entry = {}
+        for mode in ('dense', 'sparse'):
+            encode(catalog, preprocessors, positions, mode == 'sparse')
+            seconds = median_seconds(lambda: encode(catalog, preprocessors, positions, mode == 'sparse'),
+                                     args.repeats)
+            matrices = encode(catalog, preprocessors, positions, mode == 'sparse')
+            entry[mode] = {'encode_ms': 1000 * seconds, 'input_bytes': sum(map(nbytes, matrices))}
+        entry['memory_ratio'] = entry['dense']['input_bytes'] / entry['sparse']['input_bytes']
+        report[f'encode_{rows}'] = entry
+
+    # Inference latency on the same rows; every variant must give the same outputs.
+    for rows in args.batch_sizes:
+        positions = rng.integers(0, len(catalog), rows)
+        inputs = {sparse: model_inputs(df, preprocessors, catalog, positions, sparse) for sparse in (False, True)}
+        entry, outputs = {}, {}
+        for mode, (m, sparse) in models.items():
+            outputs[mode] = np.hstack(m.predict(inputs[sparse], verbose=0))
+            seconds = median_seconds(lambda: m.predict(inputs[sparse], verbose=0), args.repeats)
+            entry[mode] = {'predict_ms': 1000 * seconds, 'rows_per_s': rows / seconds}
+        reference = outputs['dense_keras_predict']
+        entry['max_abs_diff'] = max(float(np.abs(out - reference).max()) for out in outputs.values())
+        report[f'predict_{rows}'] = entry
+
+    # Fine-tuning: one r1_engine-style epoch over the training rows.
+    positions = rng.integers(0, len(catalog), args.train_rows)
+    Y = preprocessors.output_scaler.transform(df.iloc[positions][['Oven_Temp', 'Oven_Duration']])
+    entry = {}
+    for mode in ('dense', 'sparse'):
+        X = model_inputs(df, preprocessors, catalog, positions, mode == 'sparse')
+        trainer = r1_engine.compile_for_training(
+            to_sparse_model(model) if mode == 'sparse' else model)
+        # The first fit traces the training graph; time the second.
+        trainer.fit(X, [Y[:, 0], Y[:, 1]], epochs=1, batch_size=args.train_batch_size, verbose=0)
+        t = time.perf_counter()
+        trainer.fit(X, [Y[:, 0], Y[:, 1]], epochs=1, batch_size=args.train_batch_size, verbose=0)
+        entry[mode] = {'epoch_s': time.perf_counter() - t, 'input_bytes': sum(map(nbytes, X[2:]))}
+    entry['speedup'] = entry['dense']['epoch_s'] / entry['sparse']['epoch_s']
+    report[f'fit_{args.train_rows}_rows'] = entry
+    return report
+
+
+def vocab_pair(text):
+    ingredients, tags = text.split(':')
+    return int(ingredients), int(tags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs sparse ingredient/tag inputs: memory and latency.")
+    parser.add_argument('--vocab', type=vocab_pair, nargs='+', default=[(2000, 500), (8000, 550), (20000, 1000)],
+                        help="INGREDIENTS:TAGS vocabulary sizes (Food.com has about 8000 ingredients "
+                             "and 550 tags).")
+    parser.add_argument('--recipes', type=int, default=20000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 1024])
+    parser.add_argument('--train-rows', type=int, default=2000)
+    parser.add_argument('--train-batch-size', type=int, default=16)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    report = {'recipes': args.recipes}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_ingredients, n_tags in args.vocab:
+            print(f"Benchmarking {n_ingredients} ingredients x {n_tags} tags...", file=sys.stderr)
+            report[f'{n_ingredients}x{n_tags}'] = bench_vocabulary(tmp, n_ingredients, n_tags, args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
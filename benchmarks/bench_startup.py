@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+API_DIR = os.path.join(PROJECT_ROOT, 'api')
+
+RESULT_MARKER = 'BENCH_RESULT '
+
+# Runs inside a fresh interpreter per measurement, from the api/ directory.
+CHILD_SCRIPT = r'''
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app
+import_s = time.perf_counter() - t0
+
+t1 = time.perf_counter()
+app.components.warm(background=False)
+ready_s = time.perf_counter() - t1
+status = app.components.status()
+
+first_predict_s = None
+if app.components.ready():
+    t2 = time.perf_counter()
+    app.make_prediction_v2(app.components.get('recipes').index.names[0], 20.0, 50.0)
+    first_predict_s = time.perf_counter() - t2
+
+with open('/proc/self/statm') as f:
+    rss_pages = int(f.read().split()[1])
+result = {
+    'import_s': import_s,
+    'ready_s': ready_s,
+    'first_predict_s': first_predict_s,
+    'component_load_s': {name: s['load_seconds'] for name, s in status.items()},
+    'rss_mb': rss_pages * resource.getpagesize() / 2**20,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'tensorflow_imported': 'tensorflow' in sys.modules,
+    'predictor_loaded': status['predictor']['state'] == 'ready',
+    'classifier_loaded': status['classifier']['state'] == 'ready',
+}
+print(%r + json.dumps(result), flush=True)
+''' % RESULT_MARKER
+
+
+def measure(mode):
+    env = dict(os.environ, OVEN_RUNTIME=mode, TF_CPP_MIN_LOG_LEVEL='3',
+               OVEN_PREDICT_BATCH_MAX_SIZE='1')
+    proc = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], cwd=API_DIR, env=env,
+                          capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{mode} run failed:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+
+
+def summarize(runs):
+    summary = {'runs': runs}
+    for key in ('import_s', 'ready_s', 'first_predict_s', 'rss_mb', 'max_rss_mb'):
+        values = [run[key] for run in runs if run[key] is not None]
+        if values:
+            summary[f'median_{key}'] = statistics.median(values)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare API cold start and RSS between serving runtimes.")
+    parser.add_argument('--modes', nargs='+', default=['keras', 'lite'])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    report = {}
+    for mode in args.modes:
+        print(f"Measuring '{mode}' runtime ({args.runs} runs)...", file=sys.stderr)
+        report[mode] = summarize([measure(mode) for _ in range(args.runs)])
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
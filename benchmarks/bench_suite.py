@@ -0,0 +1,421 @@
+"""
+Benchmark suite for the prediction, ingestion, training and simulation
+hot paths. Emits one JSON report so runs can be compared across commits:
+
+    python benchmarks/bench_suite.py --output before.json
+    ... change things ...
+    python benchmarks/bench_suite.py --output after.json --compare before.json
+
+With `--models stub` (the default when the trained .h5 files or the
+processed recipe CSV are missing) everything runs on a seeded synthetic
+project built by benchmarks/synthetic.py, so the suite works offline.
+`--models real` benchmarks the artifacts app.py would serve.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import threading
+import contextlib
+import subprocess
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+for sub in ('api', 'ml_model', 'simulation'):
+    sys.path.append(os.path.join(PROJECT_ROOT, sub))
+
+BENCHMARKS = ('predict', 'name_resolution', 'image_prep', 'feedback', 'r1_engine', 'simulator')
+
+
+def latency_summary(latencies, elapsed=None):
+    latencies = sorted(latencies)
+    elapsed = sum(latencies) if elapsed is None else elapsed
+    return {
+        'n': len(latencies),
+        'per_s': len(latencies) / elapsed if elapsed else None,
+        'p50_ms': 1000 * latencies[len(latencies) // 2],
+        'p99_ms': 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def time_each(fn, items):
+    latencies = []
+    for item in items:
+        t = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t)
+    return latencies
+
+
+def median_seconds(fn, repeats):
+    runs = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t)
+    return statistics.median(runs)
+
+
+def real_artifacts_available(app):
+    return (os.path.exists(os.path.join(app.MODEL_DIR, 'oven_predictor_v2.h5'))
+            and os.path.exists(os.path.join(app.DATA_DIR, 'processed', 'processed_oven_recipes_v2.csv')))
+
+
+def setup_environment(app, mode, args, tmp):
+    """
+    Returns the recipes, predictor, preprocessors and model path to
+    benchmark, and installs them in the app's components.
+    """
+    if mode == 'real':
+        import r1_engine
+        app.components.warm(['recipes', 'predictor'], background=False)
+        return {
+            'recipes': app.components.get('recipes'),
+            'predictor': app.components.get('predictor'),
+            'preprocessors': r1_engine.load_preprocessors(),
+            'model_path': r1_engine.CURRENT_MODEL_PATH,
+        }
+
+    import synthetic
+    print(f"Building a synthetic project with {args.recipes} recipes...", file=sys.stderr)
+    stub = synthetic.build_stub_artifacts(os.path.join(tmp, 'project'), n_recipes=args.recipes,
+                                          seed=args.seed)
+    app.components['recipes'].swap(stub.recipes)
+    app.components['predictor'].swap(stub.predictor)
+    app.components['classifier'].swap(stub.classifier)
+    return {'recipes': stub.recipes, 'predictor': stub.predictor,
+            'preprocessors': stub.preprocessors, 'model_path': stub.model_path}
+
+
+def bench_predict(app, env, args):
+    """make_prediction_v2 one request at a time, and the vectorized batch path."""
+    rng = random.Random(args.seed)
+    names = env['recipes'].index.names
+    app.warm_predictor(env['predictor'])
+
+    requests = [(rng.choice(names), rng.uniform(15, 30), rng.uniform(30, 70))
+                for _ in range(args.single_requests)]
+    start = time.perf_counter()
+    latencies = time_each(lambda r: app.make_prediction_v2(*r), requests)
+    report = {'single': latency_summary(latencies, time.perf_counter() - start)}
+
+    for size in args.batch_sizes:
+        positions = [rng.randrange(len(names)) for _ in range(size)]
+        temps = [rng.uniform(15, 30) for _ in range(size)]
+        humidities = [rng.uniform(30, 70) for _ in range(size)]
+        app.predict_from_positions(positions, temps, humidities)
+        seconds = median_seconds(lambda: app.predict_from_positions(positions, temps, humidities),
+                                 args.repeats)
+        report[f'batch_{size}'] = {'rows': size, 'batch_ms': 1000 * seconds, 'rows_per_s': size / seconds}
+
+    rows = [{'dish_name': rng.choice(names), 'room_temp': rng.uniform(15, 30),
+             'room_humidity': rng.uniform(30, 70)} for _ in range(max(args.batch_sizes))]
+    seconds = median_seconds(lambda: list(app.predict_bulk(rows)), args.repeats)
+    report['predict_bulk'] = {'rows': len(rows), 'seconds': seconds, 'rows_per_s': len(rows) / seconds}
+    return report
+
+
+def bench_name_resolution(app, env, args):
+    """RecipeNameIndex build time and resolve() latency over synthetic catalogs."""
+    import synthetic
+    from recipe_index import RecipeNameIndex
+
+    report = {}
+    for size in args.catalog_sizes:
+        print(f"  name resolution over {size} recipes...", file=sys.stderr)
+        names = synthetic.synthetic_names(size, args.seed)
+        t = time.perf_counter()
+        index = RecipeNameIndex(names)
+        build_s = time.perf_counter() - t
+
+        rng = random.Random(args.seed)
+        exact = [rng.choice(names) for _ in range(args.queries)]
+        # Two-word phrases match many names: the first match in table order wins.
+        substring = [' '.join(rng.choice(names).split()[:2]) for _ in range(args.queries)]
+        # A dropped letter defeats the substring path and exercises the fuzzy fallback.
+        fuzzy = []
+        for _ in range(max(args.queries // 10, 1)):
+            name = rng.choice(names)
+            cut = rng.randrange(len(name) - 1)
+            fuzzy.append(name[:cut] + name[cut + 1:])
+
+        report[str(size)] = {
+            'build_s': build_s,
+            'exact': latency_summary(time_each(lambda q: index.resolve(q, prefer_exact=True), exact)),
+            'substring': latency_summary(time_each(index.resolve, substring)),
+            'fuzzy': latency_summary(time_each(index.resolve, fuzzy)),
+        }
+    return report
+
+
+def bench_image_prep(app, env, args):
+    """/classify_image preprocessing: per-image decode/resize and the threaded pipeline."""
+    import synthetic
+    import lite_runtime
+
+    images = synthetic.synthetic_jpegs(args.images, seed=args.seed)
+    app.load_and_prep_image(images[0])
+    report = {'images': len(images), 'bytes_per_image': sum(map(len, images)) / len(images)}
+    report[f'prep_{app.SERVING_RUNTIME}'] = latency_summary(time_each(app.load_and_prep_image, images))
+    if app.SERVING_RUNTIME != 'lite':
+        report['prep_lite'] = latency_summary(time_each(lite_runtime.load_and_prep_image, images))
+    seconds = median_seconds(lambda: app.image_pipeline.prepare(images), args.repeats)
+    report['pipeline'] = {'workers': app.IMAGE_PREP_WORKERS, 'seconds': seconds,
+                          'images_per_s': len(images) / seconds}
+    return report
+
+
+def bench_feedback(app, env, args):
+    """/feedback group-commit insert rate through the FeedbackWriter."""
+    from feedback_writer import FeedbackWriter
+
+    app.init_db()
+    rng = random.Random(args.seed)
+    names = env['recipes'].index.names
+    rows = [(rng.choice(names), 20.0, 50.0, 375.0, 45.0, rng.choice([1, 0, -1]))
+            for _ in range(args.feedback_rows)]
+    writer = FeedbackWriter(app.DB_PATH, max_batch_size=app.FEEDBACK_BATCH_MAX_SIZE)
+    report = {}
+    try:
+        for n_threads in (1, args.feedback_threads):
+            chunks = [rows[i::n_threads] for i in range(n_threads)]
+            latencies, lock = [], threading.Lock()
+
+            def worker(chunk):
+                local = time_each(lambda row: writer.submit(row).result(), chunk)
+                with lock:
+                    latencies.extend(local)
+
+            threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            report[f'threads_{n_threads}'] = latency_summary(latencies, time.perf_counter() - start)
+        report['rows_per_commit'] = writer.stats()['rows_per_commit']
+    finally:
+        writer.close()
+    return report
+
+
+def bench_r1_engine(app, env, args):
+    """r1_engine feature construction and fine-tuning, normalized per 1k feedback rows."""
+    import synthetic
+    import r1_engine
+
+    df_feedback = synthetic.synthetic_feedback(env['recipes'].index.names, args.r1_rows, args.seed)
+    per_1k = 1000.0 / args.r1_rows
+    build_s = median_seconds(lambda: r1_engine.build_training_batch(df_feedback, env['recipes'],
+                                                                    env['preprocessors']), args.repeats)
+    X, Y, n_rows = r1_engine.build_training_batch(df_feedback, env['recipes'], env['preprocessors'])
+
+    model = r1_engine.load_trainable_model(env['model_path'])
+    # The first fit traces the training graph; time the steady state.
+    model.fit(X, Y, epochs=1, batch_size=args.r1_batch_size, verbose=0)
+    t = time.perf_counter()
+    model.fit(X, Y, epochs=args.r1_epochs, batch_size=args.r1_batch_size, verbose=0)
+    fit_s = time.perf_counter() - t
+    return {
+        'rows': args.r1_rows,
+        'trainable_rows': n_rows,
+        'build_batch_s_per_1k': build_s * per_1k,
+        'fit_epoch_s_per_1k': fit_s / args.r1_epochs * per_1k,
+        'batch_size': args.r1_batch_size,
+    }
+
+
+def bench_simulator(app, env, args):
+    """SimulatedOven and OvenFleet step rates."""
+    from oven_simulation import SimulatedOven
+    from oven_fleet import OvenFleet
+
+    def run_single():
+        oven = SimulatedOven(verbose=False)
+        oven.start_cooking(target_temp_f=400, duration_min=args.sim_seconds / 60)
+        for _ in range(args.sim_seconds):
+            oven.get_sensor_values()
+
+    report = {'single_oven': {'steps_per_s': args.sim_seconds / median_seconds(run_single, args.repeats)}}
+    rng = np.random.default_rng(args.seed)
+    for size in args.fleet_sizes:
+        def run_fleet():
+            fleet = OvenFleet(size)
+            fleet.start_cooking(slice(None), rng.choice([325, 350, 375, 400, 425], size),
+                                rng.integers(10, 60, size))
+            fleet.run(args.sim_seconds)
+        seconds = median_seconds(run_fleet, args.repeats)
+        report[f'fleet_{size}'] = {'steps_per_s': args.sim_seconds / seconds,
+                                   'oven_steps_per_s': size * args.sim_seconds / seconds}
+    return report
+
+
+def flatten(tree, prefix=''):
+    out = {}
+    for key, value in tree.items():
+        name = f'{prefix}.{key}' if prefix else key
+        if isinstance(value, dict):
+            out.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def compare(baseline, current, tolerance):
+    """
+    Changes of every rate (higher is better) and time (lower is better)
+    between two reports. A metric regresses when it is worse by more than
+    `tolerance` (a fraction).
+    """
+    before, after = flatten(baseline['benchmarks']), flatten(current['benchmarks'])
+    changes, regressions = {}, []
+    for name in sorted(before.keys() & after.keys()):
+        leaf = name.rsplit('.', 1)[-1]
+        if leaf.endswith('per_s'):
+            higher_is_better = True
+        elif leaf.endswith(('_ms', '_s', '_per_1k')):
+            higher_is_better = False
+        else:
+            continue
+        if not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name]
+        changes[name] = {'before': before[name], 'after': after[name], 'change': change}
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(name)
+    return {'baseline_commit': baseline['meta'].get('commit'), 'tolerance': tolerance,
+            'regressions': regressions, 'changes': changes}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    cwd=PROJECT_ROOT, capture_output=True, text=True).stdout.strip())
+        return commit or None, dirty
+    except OSError:
+        return None, None
+
+
+def int_list(text):
+    return [int(x) for x in text.split(',') if x]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark suite for the oven API, trainer and simulator.")
+    parser.add_argument('--models', choices=('auto', 'real', 'stub'), default='auto',
+                        help="stub = seeded synthetic recipes and models; auto = real if present.")
+    parser.add_argument('--only', help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}.")
+    parser.add_argument('--quick', action='store_true', help="Small sizes, for a smoke run.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--recipes', type=int, default=5000, help="Synthetic recipes in stub mode.")
+    parser.add_argument('--single-requests', type=int, default=300)
+    parser.add_argument('--batch-sizes', type=int_list, default=[1, 32, 256, 1024])
+    parser.add_argument('--catalog-sizes', type=int_list, default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--feedback-rows', type=int, default=3000)
+    parser.add_argument('--feedback-threads', type=int, default=16)
+    parser.add_argument('--r1-rows', type=int, default=1000)
+    parser.add_argument('--r1-epochs', type=int, default=3)
+    parser.add_argument('--r1-batch-size', type=int, default=16)
+    parser.add_argument('--fleet-sizes', type=int_list, default=[1000, 10000])
+    parser.add_argument('--sim-seconds', type=int, default=600)
+    parser.add_argument('--compare', help="Baseline report to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Allowed slowdown before --compare reports a regression.")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+    if args.quick:
+        args.recipes, args.single_requests, args.batch_sizes = 500, 50, [1, 64]
+        args.catalog_sizes, args.queries, args.images = [1000, 10000], 50, 8
+        args.feedback_rows, args.r1_rows, args.r1_epochs = 500, 200, 1
+        args.fleet_sizes, args.sim_seconds, args.repeats = [1000], 120, 1
+    return args
+
+
+def main():
+    args = parse_args()
+    selected = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Measure the uncached, unbatched path against a scratch database.
+        os.environ.update({
+            'OVEN_DB_PATH': os.path.join(tmp, 'oven_logs.db'),
+            'OVEN_TELEMETRY_DIR': os.path.join(tmp, 'telemetry'),
+            'OVEN_PREDICTION_CACHE_SIZE': '0',
+            'OVEN_PREDICT_BATCH_MAX_SIZE': '1',
+            'OVEN_MODEL_WATCH_INTERVAL_S': '0',
+            'OVEN_WARM_ON_START': '0',
+        })
+        os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+        # The app and trainer log every request to stdout; keep stdout for the report.
+        with contextlib.redirect_stdout(sys.stderr):
+            import app
+            mode = args.models
+            if mode == 'auto':
+                mode = 'real' if real_artifacts_available(app) else 'stub'
+            env = setup_environment(app, mode, args, tmp)
+
+            results = {}
+            for name in selected:
+                print(f"Running {name}...", file=sys.stderr)
+                t = time.perf_counter()
+                results[name] = globals()[f'bench_{name}'](app, env, args)
+                results[name]['wall_s'] = time.perf_counter() - t
+
+    commit, dirty = git_commit()
+    try:
+        import tensorflow as tf
+        tf_version = tf.__version__
+    except ImportError:
+        tf_version = None
+    report = {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'tensorflow': tf_version,
+            'runtime': app.SERVING_RUNTIME,
+            'models': mode,
+            'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        },
+        'benchmarks': results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report['comparison'] = compare(json.load(f), report, args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare and report['comparison']['regressions']:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(report['comparison']['regressions'])}",
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+sys.path.append(os.path.join(PROJECT_ROOT, 'api'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'ml_model'))
+sys.path.append(os.path.join(PROJECT_ROOT, 'simulation'))
+from telemetry_store import TelemetryStore, TelemetryWriter, PARTITION_SECONDS
+from oven_fleet import OvenFleet
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Telemetry store: ingest rate, rollup time, query latency.")
+    parser.add_argument('--ovens', type=int, default=5000)
+    parser.add_argument('--seconds', type=int, default=900, help="Simulated seconds of 1 Hz readings.")
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    fleet = OvenFleet(args.ovens)
+    fleet.start_cooking(slice(None), rng.choice([325, 350, 375, 400, 425], args.ovens),
+                        rng.integers(10, 60, args.ovens))
+    oven_ids = [f'oven-{i}' for i in range(args.ovens)]
+    # Start two hours ago on an hour boundary so the run covers finished hours.
+    t0 = (time.time() // PARTITION_SECONDS - 2) * PARTITION_SECONDS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TelemetryStore(tmp, n_shards=args.shards)
+        writer = TelemetryWriter(store, maintain_interval_s=1e9)
+        print(f"Ingesting {args.ovens} ovens x {args.seconds}s...", file=sys.stderr)
+        submit_s = 0.0
+        start = time.perf_counter()
+        for second in range(args.seconds):
+            fleet.step()
+            s = fleet.sensor_arrays()
+            t = time.perf_counter()
+            # One batch per simulated second: every oven's reading.
+            while not writer.submit(oven_ids, t0 + second, s['temperature_c'], s['humidity_percent'],
+                                    s['time_remaining_s'], s['relay_on'], s['is_cooking']):
+                time.sleep(0.01)
+            submit_s += time.perf_counter() - t
+        writer.close()
+        ingest_s = time.perf_counter() - start
+        stats = writer.stats()
+        raw_bytes = directory_bytes(os.path.join(tmp, 'raw'))
+
+        store = TelemetryStore(tmp, n_shards=args.shards)
+        t = time.perf_counter()
+        maintenance = store.maintain(now=t0 + args.seconds + 2 * PARTITION_SECONDS)
+        rollup_s = time.perf_counter() - t
+
+        def time_queries(resolution):
+            latencies = []
+            for oven in rng.integers(0, args.ovens, args.queries):
+                t = time.perf_counter()
+                _, records = store.query(oven_ids[oven], t0, t0 + args.seconds, resolution)
+                latencies.append(time.perf_counter() - t)
+            latencies.sort()
+            return {'rows_per_query': len(records),
+                    'p50_ms': 1000 * latencies[len(latencies) // 2],
+                    'p99_ms': 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]}
+
+        report = {
+            'ovens': args.ovens,
+            'seconds': args.seconds,
+            'readings': stats['written'],
+            'dropped': stats['dropped'],
+            'ingest_readings_per_second': stats['written'] / ingest_s,
+            'submit_readings_per_second': stats['written'] / submit_s,
+            'realtime_factor_at_1hz': (stats['written'] / ingest_s) / args.ovens,
+            'raw_bytes_per_reading': raw_bytes / max(stats['written'], 1),
+            'rollup_s': rollup_s,
+            'rollup_bytes': directory_bytes(os.path.join(tmp, '1m')),
+            'maintenance': maintenance,
+            'query_raw': time_queries('raw'),
+            'query_1m': time_queries('1m'),
+        }
+        store.close()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
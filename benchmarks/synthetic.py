@@ -0,0 +1,211 @@
+"""
+Synthetic recipes, preprocessors and stub models for benchmarks.
+
+Everything here is generated from a seed, so benchmark runs work
+offline without the Food.com data or the trained .h5 files, and two
+runs with the same seed measure the same work. The stub predictor has
+the V2 architecture from notebooks/model_prototyping.ipynb (name
+embedding, env pass-through, dense ingredient/tag branches, two heads)
+at the given vocabulary sizes, so its cost is close to the real model's.
+"""
+
+import io
+import os
+import sys
+import pickle
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+sys.path.append(os.path.join(PROJECT_ROOT, 'ml_model'))
+
+WORDS = ['apple', 'pie', 'chicken', 'roast', 'pizza', 'bread', 'cake', 'lasagna', 'cookie',
+         'tart', 'beef', 'potato', 'gratin', 'muffin', 'salmon', 'baked', 'cheese', 'garlic',
+         'lemon', 'herb', 'honey', 'spicy', 'crispy', 'casserole', 'brownie', 'pork', 'loaf',
+         'vegetable', 'sweet', 'stuffed', 'pumpkin', 'banana']
+FEEDBACK_COLUMNS = ['id', 'dish_name', 'room_temp', 'room_humidity',
+                    'predicted_temp', 'predicted_duration', 'user_feedback']
+
+
+def synthetic_names(n, seed=0):
+    """`n` distinct dish names of two to four words, e.g. 'crispy pork loaf 17'."""
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS)
+    lengths = rng.integers(2, 5, n)
+    picks = rng.integers(0, len(WORDS), (n, 4))
+    return [' '.join(words[picks[i, :lengths[i]]]) + f' {i}' for i in range(n)]
+
+
+def synthetic_recipes(n, n_ingredients=2000, n_tags=500, seed=0):
+    """
+    A recipe table in the processed_oven_recipes_v2.csv layout, with
+    ingredient_ids and tags as Python lists.
+    """
+    rng = np.random.default_rng(seed)
+    ingredient_counts = rng.integers(3, 16, n)
+    tag_counts = rng.integers(1, 9, n)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'name': synthetic_names(n, seed),
+        'rating': np.round(rng.uniform(3, 5, n), 3),
+        'Room_Temp': np.round(rng.uniform(15, 30, n), 1),
+        'Room_Humidity': np.round(rng.uniform(30, 70, n), 1),
+        'ingredient_ids': [sorted(rng.choice(n_ingredients, k, replace=False).tolist())
+                           for k in ingredient_counts],
+        'tags': [[f'tag{t}' for t in rng.choice(n_tags, k, replace=False)] for k in tag_counts],
+        'Oven_Temp': rng.choice([325, 350, 375, 400, 425], n),
+        'Oven_Duration': rng.integers(10, 121, n),
+    })
+
+
+def write_recipe_csv(df, path):
+    """Writes the table with list columns as Python literals, like the real CSV."""
+    df = df.copy()
+    df['ingredient_ids'] = df['ingredient_ids'].apply(str)
+    df['tags'] = df['tags'].apply(str)
+    df.to_csv(path, index=False)
+
+
+def fit_preprocessors(df):
+    """The five V2 preprocessors, fitted the way the training notebook fits them."""
+    from sklearn.preprocessing import StandardScaler, OrdinalEncoder, MultiLabelBinarizer
+
+    name_encoder = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
+    name_encoder.fit(df[['name']])
+    env_scaler = StandardScaler().fit(df[['Room_Temp', 'Room_Humidity']])
+    output_scaler = StandardScaler().fit(df[['Oven_Temp', 'Oven_Duration']])
+    ingredient_binarizer = MultiLabelBinarizer().fit(df['ingredient_ids'])
+    tag_binarizer = MultiLabelBinarizer().fit(df['tags'])
+    return SimpleNamespace(name_encoder=name_encoder, env_scaler=env_scaler, output_scaler=output_scaler,
+                           ingredient_binarizer=ingredient_binarizer, tag_binarizer=tag_binarizer)
+
+
+def build_predictor_model(num_dishes, num_ingredients, num_tags):
+    """The V2 multi-input, two-head predictor (uncompiled)."""
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, Dense, Embedding, Flatten, Concatenate
+
+    name_input = Input(shape=(1,), name='name_input')
+    env_input = Input(shape=(2,), name='env_input')
+    ingredient_input = Input(shape=(num_ingredients,), name='ingredient_input')
+    tag_input = Input(shape=(num_tags,), name='tag_input')
+
+    name_vec = Flatten()(Embedding(input_dim=num_dishes, output_dim=10, name='name_embedding')(name_input))
+    ingredient_vec = Dense(128, activation='relu', name='ingredient_dense')(ingredient_input)
+    tag_vec = Dense(64, activation='relu', name='tag_dense')(tag_input)
+
+    x = Concatenate()([name_vec, env_input, ingredient_vec, tag_vec])
+    x = Dense(128, activation='relu')(x)
+    x = Dense(64, activation='relu')(x)
+    x = Dense(32, activation='relu')(x)
+    return Model(inputs=[name_input, env_input, ingredient_input, tag_input],
+                 outputs=[Dense(1, name='temp_output')(x), Dense(1, name='duration_output')(x)])
+
+
+def build_classifier_model(num_classes):
+    """A small stand-in for the MobileNetV2 dish classifier, same input and output shapes."""
+    from tensorflow.keras.models import Model
+    from tensorflow.keras.layers import Input, Conv2D, GlobalAveragePooling2D, Dense
+
+    image_input = Input(shape=(224, 224, 3))
+    x = Conv2D(16, 3, strides=4, activation='relu')(image_input)
+    x = GlobalAveragePooling2D()(x)
+    return Model(image_input, Dense(num_classes, activation='softmax')(x))
+
+
+def build_stub_artifacts(root, n_recipes=5000, n_ingredients=2000, n_tags=500, seed=0, train_epochs=1):
+    """
+    Writes a synthetic project under `root` in the repo layout
+    (data/processed/ and ml_model/models/) and returns the loaded
+    artifacts in the shapes app.py and r1_engine.py use:
+    recipes (feature_cache/catalog/index), predictor, preprocessors,
+    classifier, plus model_path and the recipe DataFrame.
+    """
+    import tensorflow as tf
+    from recipe_catalog import build_catalog, RecipeCatalog
+    from recipe_index import RecipeNameIndex
+
+    tf.keras.utils.set_random_seed(seed)
+    data_dir = os.path.join(root, 'data', 'processed')
+    model_dir = os.path.join(root, 'ml_model', 'models')
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(model_dir, exist_ok=True)
+
+    df = synthetic_recipes(n_recipes, n_ingredients, n_tags, seed)
+    csv_path = os.path.join(data_dir, 'processed_oven_recipes_v2.csv')
+    catalog_path = os.path.join(data_dir, 'recipe_catalog_v2.npz')
+    write_recipe_csv(df, csv_path)
+    build_catalog(csv_path, catalog_path)
+    catalog = RecipeCatalog(catalog_path)
+
+    preprocessors = fit_preprocessors(df)
+    for name, obj in (('name_encoder_v2', preprocessors.name_encoder),
+                      ('env_scaler_v2', preprocessors.env_scaler),
+                      ('output_scaler_v2', preprocessors.output_scaler),
+                      ('ingredient_binarizer', preprocessors.ingredient_binarizer),
+                      ('tag_binarizer', preprocessors.tag_binarizer)):
+        with open(os.path.join(model_dir, f'{name}.pkl'), 'wb') as f:
+            pickle.dump(obj, f)
+
+    model = build_predictor_model(len(preprocessors.name_encoder.categories_[0]),
+                                  len(preprocessors.ingredient_binarizer.classes_),
+                                  len(preprocessors.tag_binarizer.classes_))
+    if train_epochs:
+        model.compile(optimizer='adam', loss='mse')
+        Y = preprocessors.output_scaler.transform(df[['Oven_Temp', 'Oven_Duration']])
+        X = [preprocessors.name_encoder.transform(df[['name']]),
+             preprocessors.env_scaler.transform(df[['Room_Temp', 'Room_Humidity']]),
+             preprocessors.ingredient_binarizer.transform(df['ingredient_ids']),
+             preprocessors.tag_binarizer.transform(df['tags'])]
+        model.fit(X, [Y[:, 0], Y[:, 1]], epochs=train_epochs, batch_size=32, verbose=0)
+    model_path = os.path.join(model_dir, 'oven_predictor_v2.h5')
+    model.save(model_path)
+
+    class_names = [f'{WORDS[i]}_{WORDS[j]}' for i in range(10) for j in range(10)]
+    classifier = build_classifier_model(len(class_names))
+    classifier.save(os.path.join(model_dir, 'dish_classifier_v1.h5'))
+    with open(os.path.join(model_dir, 'food_101_class_names.txt'), 'w') as f:
+        f.write('\n'.join(class_names))
+
+    return SimpleNamespace(
+        root=root,
+        df=df,
+        model_path=model_path,
+        recipes=SimpleNamespace(feature_cache=None, catalog=catalog, index=RecipeNameIndex(catalog.names)),
+        predictor=SimpleNamespace(version='stub', model=model, **vars(preprocessors)),
+        preprocessors=preprocessors,
+        classifier=SimpleNamespace(model=classifier, class_names=class_names),
+    )
+
+
+def synthetic_feedback(dish_names, n, seed=0):
+    """`n` feedback_log rows for dishes drawn from `dish_names`."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'dish_name': rng.choice(np.asarray(dish_names, dtype=object), n),
+        'room_temp': np.round(rng.uniform(15, 30, n), 1),
+        'room_humidity': np.round(rng.uniform(30, 70, n), 1),
+        'predicted_temp': rng.choice([325, 350, 375, 400, 425], n).astype(float),
+        'predicted_duration': rng.integers(10, 121, n).astype(float),
+        'user_feedback': rng.choice([1, 0, -1], n, p=[0.6, 0.25, 0.15]),
+    })
+
+
+def synthetic_jpegs(n, size=(640, 480), seed=0):
+    """`n` JPEG-encoded, photo-sized images of smooth noise."""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(n):
+        # Upsampled coarse noise compresses like a photo, unlike per-pixel noise.
+        coarse = rng.integers(0, 256, (size[1] // 16, size[0] // 16, 3), dtype=np.uint8)
+        img = Image.fromarray(coarse).resize(size, Image.BILINEAR)
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=90)
+        images.append(buf.getvalue())
+    return images
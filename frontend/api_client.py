@@ -0,0 +1,168 @@
+"""
+HTTP client for the Smart Oven API, shared by the Streamlit frontend and
+scripted clients.
+
+* One pooled requests.Session: connections are kept alive and reused
+  instead of opening a new TCP connection per call.
+* Every call has a (connect, read) timeout. Connection failures are
+  retried with backoff, and so are 502/503/504 answers from /predict
+  and /classify_image. /feedback is only retried when the request never
+  reached the server, so a rating is never logged twice.
+* /predict and /classify_image results are memoized (LRU + TTL), keyed
+  on the dish name, sensor values and profile, or on the SHA-256 of the
+  image. Streamlit reruns the script on every widget change, so the same
+  request would otherwise hit the backend again and again.
+
+Usage:
+    from api_client import OvenApiClient
+    client = OvenApiClient('http://127.0.0.1:5000')
+    client.predict('apple pie', room_temp=22.0, room_humidity=55.0)
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = os.environ.get('OVEN_API_URL', 'http://127.0.0.1:5000')
+
+
+class ApiError(Exception):
+    """The API answered with an error status; `message` is its "error" field."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class OvenApiClient:
+
+    def __init__(self, base_url=API_URL, connect_timeout=3.05, read_timeout=30.0, classify_timeout=60.0,
+                 retries=3, backoff_factor=0.3, pool_size=10, cache_size=256, cache_ttl_s=300.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        # The first classification may wait for the CV model to load.
+        self.classify_timeout = (connect_timeout, classify_timeout)
+        self.cache_size = cache_size
+        self.cache_ttl_s = cache_ttl_s
+
+        self.session = requests.Session()
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({'GET', 'POST'}), raise_on_status=False)
+        self.session.mount(self.base_url, HTTPAdapter(max_retries=retry, pool_connections=pool_size,
+                                                      pool_maxsize=pool_size))
+        # Longest prefix wins: feedback POSTs are only retried on connection errors.
+        feedback_retry = Retry(total=retries, connect=retries, read=0, status=0,
+                               backoff_factor=backoff_factor, allowed_methods=frozenset({'GET'}))
+        self.session.mount(f'{self.base_url}/feedback', HTTPAdapter(max_retries=feedback_retry,
+                                                                    pool_connections=pool_size,
+                                                                    pool_maxsize=pool_size))
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._requests = 0
+
+    def _request(self, method, path, timeout=None, **kwargs):
+        with self._lock:
+            self._requests += 1
+        response = self.session.request(method, f'{self.base_url}{path}', timeout=timeout or self.timeout,
+                                        **kwargs)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if response.status_code >= 400:
+            message = body.get('error') if isinstance(body, dict) else None
+            raise ApiError(message or f"HTTP {response.status_code}", response.status_code)
+        return body
+
+    def _memoized(self, key, fetch):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[1] > now:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+        # Errors propagate and are not cached.
+        value = fetch()
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[key] = (value, now + self.cache_ttl_s)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return value
+
+    def _forget_profile(self, profile):
+        # Predictions for a profile change once it gives feedback.
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == 'predict' and k[-1] == profile]:
+                del self._cache[key]
+
+    @staticmethod
+    def _profile(user_id, oven_id):
+        return (None if user_id is None else str(user_id), None if oven_id is None else str(oven_id))
+
+    def predict(self, dish_name, room_temp=None, room_humidity=None, user_id=None, oven_id=None):
+        """/predict; without sensor values the API uses its defaults."""
+        payload = {'dish_name': dish_name}
+        for field, value in (('room_temp', room_temp), ('room_humidity', room_humidity),
+                             ('user_id', user_id), ('oven_id', oven_id)):
+            if value is not None:
+                payload[field] = value
+        key = ('predict', dish_name.strip().lower(),
+               None if room_temp is None else round(float(room_temp), 2),
+               None if room_humidity is None else round(float(room_humidity), 2),
+               self._profile(user_id, oven_id))
+        return self._memoized(key, lambda: self._request('POST', '/predict', json=payload))
+
+    def classify_image(self, img_bytes, filename='image.jpg', content_type='image/jpeg', top_k=None):
+        """/classify_image: the classified dish, top_k classes and a default-sensor prediction."""
+        data = {} if top_k is None else {'top_k': top_k}
+        key = ('classify_image', hashlib.sha256(img_bytes).hexdigest(), top_k)
+        return self._memoized(key, lambda: self._request(
+            'POST', '/classify_image', timeout=self.classify_timeout,
+            files={'file': (filename, img_bytes, content_type)}, data=data))
+
+    def feedback(self, dish_name, predicted_temp, predicted_duration, user_feedback,
+                 room_temp=None, room_humidity=None, user_id=None, oven_id=None):
+        """/feedback; never memoized. Returns the API's status body (committed or queued)."""
+        payload = {'dish_name': dish_name, 'predicted_temp': predicted_temp,
+                   'predicted_duration': predicted_duration, 'user_feedback': user_feedback}
+        for field, value in (('room_temp', room_temp), ('room_humidity', room_humidity),
+                             ('user_id', user_id), ('oven_id', oven_id)):
+            if value is not None:
+                payload[field] = value
+        body = self._request('POST', '/feedback', json=payload)
+        if user_id is not None or oven_id is not None:
+            self._forget_profile(self._profile(user_id, oven_id))
+        return body
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'requests': self._requests,
+                'cache_size': len(self._cache),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        self.session.close()
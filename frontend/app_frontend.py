@@ -4,12 +4,19 @@ import json
 import io
 import time
 import streamlit.components.v1 as components
+from api_client import OvenApiClient, ApiError, API_URL
 
 st.set_page_config(page_title="Smart Oven AI Chef", layout="centered")
 st.title("Smart Oven AI Chef 🧑‍🍳")
 st.info("ℹ️ Note: All recommendations are for a 1-person serving size.")
 st.info("💡 Pro Tip: Always preheat your oven for 10-15 minutes while doing prep work for best results!")
-API_URL = "http://127.0.0.1:5000"
+
+@st.cache_resource
+def get_api_client():
+    # One pooled, memoizing client for every session of this Streamlit server.
+    return OvenApiClient(API_URL)
+
+api = get_api_client()
 
 if 'input_method' not in st.session_state:
     st.session_state.input_method = "Enter Name Manually"
@@ -59,18 +66,15 @@ if st.session_state.input_method == "Upload Image":
         st.session_state.uploaded_image_bytes = uploaded_file.getvalue() 
         with st.spinner("Classifying image..."):
             try:
-                files = {'file': (uploaded_file.name, st.session_state.uploaded_image_bytes, uploaded_file.type)}
-                response = requests.post(f"{API_URL}/classify_image", files=files)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    st.session_state.dish_name = data['classified_dish']
-                    st.session_state.initial_prediction = data
-                    st.session_state.image_display_caption = f"Classified as: {st.session_state.dish_name}"
-                    st.success(f"AI identified dish as: **{st.session_state.dish_name}**")
-                else:
-                    st.error(f"Error from API: {response.json().get('error', 'Unknown error')}")
-                    reset_state()
+                data = api.classify_image(st.session_state.uploaded_image_bytes, uploaded_file.name,
+                                          uploaded_file.type)
+                st.session_state.dish_name = data['classified_dish']
+                st.session_state.initial_prediction = data
+                st.session_state.image_display_caption = f"Classified as: {st.session_state.dish_name}"
+                st.success(f"AI identified dish as: **{st.session_state.dish_name}**")
+            except ApiError as e:
+                st.error(f"Error from API: {e.message}")
+                reset_state()
             except requests.exceptions.ConnectionError:
                 st.error("Connection Error: Is the Flask API running?")
                 reset_state()
@@ -88,13 +92,10 @@ elif st.session_state.input_method == "Enter Name Manually":
             st.session_state.dish_name = manual_dish_name
             with st.spinner("Getting initial recommendation..."):
                 try:
-                    payload = {"dish_name": st.session_state.dish_name}
-                    response = requests.post(f"{API_URL}/predict", json=payload)
-                    if response.status_code == 200:
-                        st.session_state.initial_prediction = response.json()
-                    else:
-                        st.error(f"Error from API: {response.json().get('error', 'Could not get initial prediction')}")
-                        reset_state()
+                    st.session_state.initial_prediction = api.predict(st.session_state.dish_name)
+                except ApiError as e:
+                    st.error(f"Error from API: {e.message}")
+                    reset_state()
                 except Exception as e:
                     st.error(f"Error getting initial prediction: {e}")
                     reset_state()
@@ -111,6 +112,10 @@ if st.session_state.dish_name:
 
     if st.session_state.initial_prediction:
          st.info(f"Initial AI Suggestion (Default Sensors): **{st.session_state.initial_prediction['predicted_temp']}°F** for **{st.session_state.initial_prediction['predicted_duration']} minutes**.")
+         if st.session_state.initial_prediction.get('match_kind', 'exact') != 'exact':
+             alternatives = ", ".join(st.session_state.initial_prediction.get('alternatives', []))
+             st.warning(f"No recipe named exactly '{st.session_state.dish_name}'; using **{st.session_state.initial_prediction['matched_name']}**."
+                        + (f" Other candidates: {alternatives}." if alternatives else ""))
 
     col1, col2 = st.columns(2)
     with col1:
@@ -125,17 +130,14 @@ if st.session_state.dish_name:
     if st.button("Get Final Recommendation", key="get_final_rec", type="primary"):
         with st.spinner("Calculating final recommendation based on sensors..."):
             try:
-                payload = {
-                    "dish_name": st.session_state.dish_name,
-                    "room_temp": st.session_state.sensor_temp,
-                    "room_humidity": st.session_state.sensor_humidity
-                }
-                response = requests.post(f"{API_URL}/predict", json=payload)
-                if response.status_code == 200:
-                    st.session_state.final_prediction = response.json()
-                else:
-                    st.error(f"Error from API: {response.json().get('error', 'Could not get final prediction')}")
-                    st.session_state.final_prediction = None
+                st.session_state.final_prediction = api.predict(
+                    st.session_state.dish_name,
+                    room_temp=st.session_state.sensor_temp,
+                    room_humidity=st.session_state.sensor_humidity,
+                )
+            except ApiError as e:
+                st.error(f"Error from API: {e.message}")
+                st.session_state.final_prediction = None
             except Exception as e:
                 st.error(f"Error getting final prediction: {e}")
                 st.session_state.final_prediction = None
@@ -150,22 +152,18 @@ if st.session_state.final_prediction:
 
     def send_final_feedback(feedback_value):
         try:
-            payload = {
-                "dish_name": st.session_state.dish_name,
-                "room_temp": st.session_state.sensor_temp,
-                "room_humidity": st.session_state.sensor_humidity,
-                "predicted_temp": st.session_state.final_prediction['predicted_temp'],
-                "predicted_duration": st.session_state.final_prediction['predicted_duration'],
-                "user_feedback": feedback_value
-            }
-            response = requests.post(f"{API_URL}/feedback", json=payload)
-
-            if response.status_code == 200:
-                st.success("✅ Feedback saved! The AI will learn.")
-                st.session_state.feedback_submitted = True
-            else:
-                st.error("Failed to save feedback.")
-
+            api.feedback(
+                st.session_state.dish_name,
+                st.session_state.final_prediction['predicted_temp'],
+                st.session_state.final_prediction['predicted_duration'],
+                feedback_value,
+                room_temp=st.session_state.sensor_temp,
+                room_humidity=st.session_state.sensor_humidity,
+            )
+            st.success("✅ Feedback saved! The AI will learn.")
+            st.session_state.feedback_submitted = True
+        except ApiError:
+            st.error("Failed to save feedback.")
         except Exception as e:
             st.error(f"Error sending feedback: {e}")
 
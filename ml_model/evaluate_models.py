@@ -0,0 +1,370 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import statistics
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+sys.path.append(os.path.join(PROJECT_ROOT, 'api'))
+
+CHECKPOINT_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'checkpoints')
+REPORT_PATH = os.path.join(CHECKPOINT_DIR, 'model_eval_report.json')
+
+# How each variant of a Keras model is run, matching the ways the API can
+# serve it: model.predict() (default), a compiled call on sparse inputs
+# (OVEN_SPARSE_INPUTS=1), and TFLite exports (OVEN_RUNTIME=lite) without
+# or with weight quantization.
+VARIANTS = {'keras': None, 'sparse': None, 'tflite': None,
+            'tflite-dynamic': 'dynamic', 'tflite-float16': 'float16'}
+
+# Only light imports at module level: every variant is measured in a
+# freshly spawned interpreter, which imports this module, and a TFLite
+# variant should not pay for TensorFlow there unless it has to.
+
+
+def rss_mb():
+    """Resident memory in MB, or None where it can't be measured."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    return None
+
+
+def peak_rss_mb():
+    """Peak resident memory in MB, or None where it can't be measured."""
+    # VmHWM starts over with the new address space of an exec'd process;
+    # ru_maxrss would carry over the parent's peak, so it is only the
+    # fallback where there is no /proc (and is then an upper bound).
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if psutil is not None:
+        peak = getattr(psutil.Process().memory_info(), 'peak_wset', None)  # Windows only
+        if peak is not None:
+            return peak / 2**20
+    if resource is not None:
+        # Kilobytes on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+    return None
+
+
+def mb_diff(after, before, floor=None):
+    """after - before, or None when either wasn't measured."""
+    if after is None or before is None:
+        return None
+    return after - before if floor is None else max(floor, after - before)
+
+
+def load_variant(spec):
+    """(model, whether it takes sparse ingredient/tag inputs) for one variant."""
+    if spec['variant'].startswith('tflite'):
+        from lite_runtime import LiteModel
+        return LiteModel(spec['file'], spec['inputs'], spec['outputs']), False
+
+    import tensorflow as tf
+    from sparse_inputs import CompiledModel, to_sparse_model
+
+    model = tf.keras.models.load_model(spec['file'], compile=False)
+    if spec['variant'] == 'sparse':
+        return CompiledModel(to_sparse_model(model)), True
+    return model, False
+
+
+def to_sparse(X):
+    import scipy.sparse
+
+    return X[:2] + [scipy.sparse.csr_matrix(x) for x in X[2:]]
+
+
+def predict_batches(model, X, batch_size):
+    """Scaled (n, 2) outputs, predicted `batch_size` rows at a time."""
+    n = X[0].shape[0]
+    outputs = [np.hstack(model.predict([x[i:i + batch_size] for x in X], verbose=0))
+               for i in range(0, n, batch_size)]
+    return np.vstack(outputs)
+
+
+def run_variant(spec, data):
+    """
+    Loads one variant in a fresh process and measures it: load time,
+    resident memory, one-row latency, batch throughput, and its scaled
+    outputs for the recipe and feedback rows.
+    """
+    rss_before = rss_mb()
+    t = time.perf_counter()
+    model, sparse = load_variant(spec)
+    load_s = time.perf_counter() - t
+    rss_loaded = rss_mb()
+
+    recipe_X = to_sparse(data.recipe_X) if sparse else data.recipe_X
+    feedback_X = None
+    if data.feedback_X is not None:
+        feedback_X = to_sparse(data.feedback_X) if sparse else data.feedback_X
+
+    # Warm-up traces graphs and allocates buffers for both batch shapes.
+    model.predict([x[:1] for x in recipe_X], verbose=0)
+    recipe_outputs = predict_batches(model, recipe_X, data.batch_size)
+    feedback_outputs = None if feedback_X is None else predict_batches(model, feedback_X, data.batch_size)
+
+    n = recipe_X[0].shape[0]
+    rows = [[x[i % n:i % n + 1] for x in recipe_X] for i in range(data.latency_samples)]
+    runs = []
+    for row in rows:
+        t = time.perf_counter()
+        model.predict(row, verbose=0)
+        runs.append(1000 * (time.perf_counter() - t))
+    runs.sort()
+
+    passes = []
+    for _ in range(data.repeats):
+        t = time.perf_counter()
+        predict_batches(model, recipe_X, data.batch_size)
+        passes.append(time.perf_counter() - t)
+
+    peak = peak_rss_mb()
+    return {
+        'load_s': load_s,
+        'latency_p50_ms': statistics.median(runs),
+        'latency_p99_ms': runs[int(0.99 * (len(runs) - 1))],
+        'rows_per_s': n / statistics.median(passes),
+        'rss_before_load_mb': rss_before,
+        'model_rss_mb': mb_diff(rss_loaded, rss_before),
+        'peak_rss_mb': peak,
+        'peak_over_baseline_mb': mb_diff(peak, rss_before, floor=0.0),
+        'tensorflow_imported': 'tensorflow' in sys.modules,
+        'recipe_outputs': recipe_outputs,
+        'feedback_outputs': feedback_outputs,
+    }
+
+
+def recipe_holdout(catalog, split):
+    """
+    Catalog positions of the held-out recipes: with split 'notebook', the
+    test rows of the training notebook's split (rating >= 4, complete
+    rows, train_test_split(test_size=0.2, random_state=42)); with 'all',
+    every such recipe.
+    """
+    columns = catalog.columns
+    usable = columns['rating'] >= 4
+    for name in ('Room_Temp', 'Room_Humidity', 'Oven_Temp', 'Oven_Duration'):
+        usable &= np.isfinite(columns[name].astype(float))
+    positions = np.flatnonzero(usable)
+    if split == 'all':
+        return positions
+    from sklearn.model_selection import train_test_split
+    return np.sort(train_test_split(positions, test_size=0.2, random_state=42)[1])
+
+
+def recipe_inputs(catalog, positions, preprocessors):
+    """Dense model inputs and the (temp, duration) ground truth of catalog rows."""
+    columns = catalog.columns
+    env = np.column_stack([columns['Room_Temp'][positions], columns['Room_Humidity'][positions]]).astype(float)
+    X = [preprocessors.name_encoder.transform([[catalog.names[p]] for p in positions]),
+         preprocessors.env_scaler.transform(env),
+         catalog.multi_hot('ingredients', positions, preprocessors.ingredient_binarizer.classes_),
+         catalog.multi_hot('tags', positions, preprocessors.tag_binarizer.classes_)]
+    truth = np.column_stack([columns['Oven_Temp'][positions], columns['Oven_Duration'][positions]]).astype(float)
+    return [np.asarray(x, dtype=np.float32) for x in X], truth
+
+
+def fetch_feedback(db_path, after_id, max_rows):
+    """The `max_rows` most recent feedback rows with id > after_id, oldest first."""
+    import pandas as pd
+    from r1_engine import FEEDBACK_COLUMNS
+
+    conn = sqlite3.connect(db_path)
+    try:
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(FEEDBACK_COLUMNS)} FROM feedback_log WHERE id > ? ORDER BY id DESC LIMIT ?",
+            conn, params=(int(after_id), int(max_rows)))
+    finally:
+        conn.close()
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def model_specs(args, tmp, sample_inputs):
+    """One spec per (model, variant); TFLite variants are converted into `tmp` first."""
+    from export_runtime import export_model
+    from lite_runtime import load_manifest
+
+    specs = []
+    for path in args.models:
+        name = os.path.splitext(os.path.basename(path))[0]
+        for variant in args.variants:
+            if not variant.startswith('tflite'):
+                specs.append({'model': name, 'variant': variant, 'file': path,
+                              'bytes': os.path.getsize(path)})
+                continue
+            print(f"Converting {name} to {variant}...")
+            out_path = os.path.join(tmp, f'{name}_{variant}.tflite')
+            exported = export_model(path, out_path, sample_inputs, quantize=VARIANTS[variant])
+            specs.append({'model': name, 'variant': variant, 'file': out_path, 'bytes': exported['bytes'],
+                          'inputs': exported['inputs'], 'outputs': exported['outputs']})
+
+    if args.runtime_dir:
+        predictor = load_manifest(args.runtime_dir)['predictor']
+        quantize = predictor.get('quantize')
+        specs.append({'model': 'runtime', 'variant': f'tflite-{quantize}' if quantize else 'tflite',
+                      'file': os.path.join(args.runtime_dir, predictor['file']), 'bytes': predictor['bytes'],
+                      'inputs': predictor['inputs'], 'outputs': predictor['outputs']})
+    return specs
+
+
+def parse_args():
+    from r1_engine import DB_PATH, CURRENT_MODEL_PATH, NEW_MODEL_PATH
+
+    parser = argparse.ArgumentParser(
+        description="Compare candidate prediction models on accuracy and inference cost before deploying.")
+    parser.add_argument('--models', nargs='+',
+                        default=[p for p in (CURRENT_MODEL_PATH, NEW_MODEL_PATH) if os.path.exists(p)],
+                        help="Keras .h5 models to compare (default: oven_predictor_v2.h5 and, "
+                             "if it exists, oven_predictor_v3.h5).")
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS),
+                        default=['keras', 'sparse', 'tflite', 'tflite-dynamic'],
+                        help="How each model is run; TFLite variants are converted on the fly.")
+    parser.add_argument('--runtime-dir',
+                        help="Also evaluate the predictor exported to this directory by export_runtime.py.")
+    parser.add_argument('--recipe-split', choices=['notebook', 'all'], default='notebook',
+                        help="Recipes with ground truth: the training notebook's 20%% test split, or all.")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--feedback-rows', type=int, default=5000,
+                        help="Replay this many of the most recent feedback rows.")
+    parser.add_argument('--feedback-after-id', type=int, default=None,
+                        help="Only replay feedback with a higher id. Defaults to the last_feedback_id in "
+                             "r1_state.json, so fine-tuned models are not scored on their training rows; "
+                             "pass 0 to replay all recent feedback.")
+    parser.add_argument('--temp-tolerance', type=float, default=5.0,
+                        help="Degrees a prediction may move on a 'perfect' row and still be consistent.")
+    parser.add_argument('--duration-tolerance', type=float, default=2.0,
+                        help="Minutes a prediction may move on a 'perfect' row and still be consistent.")
+    parser.add_argument('--batch-size', type=int, default=256,
+                        help="Rows per call for the throughput and accuracy passes.")
+    parser.add_argument('--latency-samples', type=int, default=100,
+                        help="One-row predictions timed per variant.")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed throughput passes per variant.")
+    parser.add_argument('--report', default=REPORT_PATH)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from types import SimpleNamespace
+    from r1_engine import load_preprocessors, load_recipes, build_features, load_state
+    from r1_sweep import feedback_metrics
+    from recipe_catalog import load_catalog
+
+    print("--- Offline Model Evaluation ---")
+    if not args.models and not args.runtime_dir:
+        print("No models to evaluate. Exiting.")
+        return
+    preprocessors = load_preprocessors()
+    catalog = load_catalog()
+    positions = recipe_holdout(catalog, args.recipe_split)
+    recipe_X, truth = recipe_inputs(catalog, positions, preprocessors)
+    print(f"{len(positions)} held-out recipes ({args.recipe_split} split).")
+
+    trained_through = load_state()['last_feedback_id']
+    after_id = trained_through if args.feedback_after_id is None else args.feedback_after_id
+    df_feedback = fetch_feedback(args.db, after_id, args.feedback_rows)
+    feedback_X, keep = build_features(df_feedback, load_recipes(), preprocessors) if len(df_feedback) else (None, None)
+    feedback = {'rows': 0}
+    if feedback_X is not None:
+        df_feedback = df_feedback[keep].reset_index(drop=True)
+        feedback_X = [np.asarray(x, dtype=np.float32) for x in feedback_X]
+        ids = df_feedback['id'].to_numpy()
+        feedback = {'rows': len(df_feedback), 'after_id': int(after_id),
+                    'first_id': int(ids[0]), 'last_id': int(ids[-1]),
+                    'already_trained_on': int((ids <= trained_through).sum())}
+        print(f"{len(df_feedback)} feedback rows after id {after_id} "
+              f"(ids {feedback['first_id']}..{feedback['last_id']}).")
+        if feedback['already_trained_on']:
+            print(f"Warning: {feedback['already_trained_on']} of them were used by r1_engine.py (up to id "
+                  f"{trained_through}); omit --feedback-after-id to replay only unseen feedback.")
+    else:
+        print("No usable feedback; only recipe accuracy is measured.")
+
+    data = SimpleNamespace(recipe_X=recipe_X, feedback_X=feedback_X, batch_size=args.batch_size,
+                           latency_samples=args.latency_samples, repeats=args.repeats)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        specs = model_specs(args, tmp, [x[:4] for x in recipe_X])
+        for spec in specs:
+            print(f"Measuring {spec['model']} ({spec['variant']})...")
+            # A new interpreter per variant, so memory and thread pools are its own.
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                measured = pool.submit(run_variant, spec, data).result()
+
+            temp, duration = preprocessors.output_scaler.inverse_transform(measured.pop('recipe_outputs')).T
+            result = {'model': spec['model'], 'variant': spec['variant'], 'size_mb': spec['bytes'] / 2**20,
+                      'recipe_mae_temp': float(np.mean(np.abs(temp - truth[:, 0]))),
+                      'recipe_mae_duration': float(np.mean(np.abs(duration - truth[:, 1]))),
+                      'recipe_predictions': np.column_stack([temp, duration])}
+            feedback_outputs = measured.pop('feedback_outputs')
+            if feedback_outputs is not None:
+                fb_temp, fb_duration = preprocessors.output_scaler.inverse_transform(feedback_outputs).T
+                result['feedback'] = feedback_metrics(fb_temp, fb_duration, df_feedback,
+                                                      args.temp_tolerance, args.duration_tolerance)
+            result.update(measured)
+            results.append(result)
+
+    # How far each variant drifts from its model's Keras predictions.
+    reference = {r['model']: r['recipe_predictions'] for r in results if r['variant'] == 'keras'}
+    for r in results:
+        predictions = r.pop('recipe_predictions')
+        if r['model'] in reference:
+            drift = np.abs(predictions - reference[r['model']]).max(axis=0)
+            r['max_diff_vs_keras'] = {'temp': float(drift[0]), 'duration': float(drift[1])}
+
+    print(f"\n{'model':<22} {'variant':<15} {'size_mb':>7} {'mae_t':>6} {'mae_d':>6} {'consist':>7} "
+          f"{'fb_mae_t':>8} {'fb_mae_d':>8} {'p50_ms':>7} {'p99_ms':>7} {'rows/s':>8} {'peak_mb':>7}")
+    for r in results:
+        fb = r.get('feedback')
+        peak = f"{r['peak_rss_mb']:>7.0f}" if r['peak_rss_mb'] is not None else f"{'-':>7}"
+        fb_columns = (f"{fb['consistency']:>7.3f} {fb['reference_mae_temp']:>8.2f} "
+                      f"{fb['reference_mae_duration']:>8.2f}" if fb else f"{'-':>7} {'-':>8} {'-':>8}")
+        print(f"{r['model']:<22} {r['variant']:<15} {r['size_mb']:>7.2f} {r['recipe_mae_temp']:>6.2f} "
+              f"{r['recipe_mae_duration']:>6.2f} {fb_columns} {r['latency_p50_ms']:>7.2f} "
+              f"{r['latency_p99_ms']:>7.2f} {r['rows_per_s']:>8.0f} {peak}")
+
+    report = {
+        'recipes': {'split': args.recipe_split, 'rows': len(positions)},
+        'feedback': feedback,
+        'batch_size': args.batch_size,
+        'latency_samples': args.latency_samples,
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Evaluation report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
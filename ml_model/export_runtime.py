@@ -0,0 +1,165 @@
+import os
+import json
+import pickle
+import argparse
+import numpy as np
+import tensorflow as tf
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+
+MODEL_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'models')
+RUNTIME_DIR = os.path.join(MODEL_DIR, 'runtime')
+
+RUNTIME_MANIFEST = 'runtime_manifest.json'
+PREPROCESSORS_FILE = 'preprocessors_v2.npz'
+
+# Post-training weight quantization: 'dynamic' stores weights as int8
+# (dynamic-range quantization), 'float16' as float16. Both change the
+# outputs slightly; ml_model/evaluate_models.py measures by how much.
+QUANTIZATIONS = ('dynamic', 'float16')
+# Largest scaled output difference from Keras accepted for each export.
+MAX_OUTPUT_ERROR = {None: 1e-3, 'dynamic': 0.1, 'float16': 0.01}
+
+
+def convert_to_tflite(keras_model, out_path, quantize=None):
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantize is not None:
+        if quantize not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantize}', expected one of {QUANTIZATIONS}.")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantize == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+    tflite_bytes = converter.convert()
+    with open(out_path, 'wb') as f:
+        f.write(tflite_bytes)
+    return len(tflite_bytes)
+
+
+def signature_outputs_in_keras_order(keras_model, tflite_path, sample_inputs, max_error=1e-3):
+    """
+    Runs the Keras model and the converted TFLite model on the same sample
+    and returns the TFLite signature output keys in Keras output order.
+    Matching on values avoids relying on converter naming conventions.
+    """
+    keras_outputs = keras_model.predict(sample_inputs, verbose=0)
+    if not isinstance(keras_outputs, (list, tuple)):
+        keras_outputs = [keras_outputs]
+
+    interpreter = tf.lite.Interpreter(model_path=tflite_path)
+    runner = interpreter.get_signature_runner()
+    feed = {name: np.asarray(value, dtype=np.float32)
+            for name, value in zip(input_names(keras_model), sample_inputs)}
+    lite_outputs = runner(**feed)
+
+    ordered = []
+    for keras_out in keras_outputs:
+        best = min(
+            (key for key in lite_outputs if key not in ordered),
+            key=lambda key: float(np.max(np.abs(lite_outputs[key] - keras_out))),
+        )
+        error = float(np.max(np.abs(lite_outputs[best] - keras_out)))
+        if error > max_error:
+            raise Exception(f"TFLite output '{best}' differs from Keras by {error:.5f}.")
+        ordered.append(best)
+    return ordered
+
+
+def input_names(keras_model):
+    return [t.name.split(':')[0] for t in keras_model.inputs]
+
+
+def export_model(model_path, out_path, sample_inputs, quantize=None):
+    keras_model = tf.keras.models.load_model(model_path, compile=False)
+    size = convert_to_tflite(keras_model, out_path, quantize)
+    return {
+        'file': os.path.basename(out_path),
+        'source': os.path.basename(model_path),
+        'bytes': size,
+        'quantize': quantize,
+        'inputs': input_names(keras_model),
+        'outputs': signature_outputs_in_keras_order(keras_model, out_path, sample_inputs,
+                                                    MAX_OUTPUT_ERROR[quantize]),
+    }
+
+
+def export_preprocessors(out_path):
+    """
+    Flattens the fitted sklearn encoders/scalers into plain NumPy arrays
+    so the serving runtime does not need scikit-learn.
+    """
+    with open(os.path.join(MODEL_DIR, 'name_encoder_v2.pkl'), 'rb') as f:
+        name_encoder = pickle.load(f)
+    with open(os.path.join(MODEL_DIR, 'env_scaler_v2.pkl'), 'rb') as f:
+        env_scaler = pickle.load(f)
+    with open(os.path.join(MODEL_DIR, 'output_scaler_v2.pkl'), 'rb') as f:
+        output_scaler = pickle.load(f)
+    with open(os.path.join(MODEL_DIR, 'ingredient_binarizer.pkl'), 'rb') as f:
+        ingredient_binarizer = pickle.load(f)
+    with open(os.path.join(MODEL_DIR, 'tag_binarizer.pkl'), 'rb') as f:
+        tag_binarizer = pickle.load(f)
+
+    params = {
+        'name_categories': np.asarray(name_encoder.categories_[0]).astype(str),
+        'name_unknown_value': np.float32(name_encoder.unknown_value
+                                         if name_encoder.unknown_value is not None else -1),
+        'env_mean': env_scaler.mean_,
+        'env_scale': env_scaler.scale_,
+        'output_mean': output_scaler.mean_,
+        'output_scale': output_scaler.scale_,
+        'ingredient_classes': np.asarray(ingredient_binarizer.classes_),
+        'tag_classes': np.asarray(tag_binarizer.classes_).astype(str),
+    }
+    np.savez(out_path, **params)
+    return params
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the models and preprocessors for OVEN_RUNTIME=lite.")
+    parser.add_argument('--quantize', choices=QUANTIZATIONS,
+                        help="Quantize the prediction model's weights; compare the variants "
+                             "with ml_model/evaluate_models.py first.")
+    args = parser.parse_args()
+
+    print("--- Exporting lightweight serving runtime ---")
+    os.makedirs(RUNTIME_DIR, exist_ok=True)
+
+    print("Exporting preprocessors...")
+    params = export_preprocessors(os.path.join(RUNTIME_DIR, PREPROCESSORS_FILE))
+
+    n_ingredients = len(params['ingredient_classes'])
+    n_tags = len(params['tag_classes'])
+    rng = np.random.default_rng(0)
+    predictor_sample = [
+        rng.integers(0, len(params['name_categories']), size=(4, 1)).astype(np.float32),
+        rng.normal(size=(4, 2)).astype(np.float32),
+        (rng.random((4, n_ingredients)) < 0.05).astype(np.float32),
+        (rng.random((4, n_tags)) < 0.1).astype(np.float32),
+    ]
+
+    print("Converting prediction model to TFLite...")
+    predictor = export_model(
+        os.path.join(MODEL_DIR, 'oven_predictor_v2.h5'),
+        os.path.join(RUNTIME_DIR, 'oven_predictor_v2.tflite'),
+        predictor_sample,
+        quantize=args.quantize,
+    )
+
+    print("Converting CV model to TFLite...")
+    cv_sample = [rng.uniform(-1.0, 1.0, size=(2, 224, 224, 3)).astype(np.float32)]
+    classifier = export_model(
+        os.path.join(MODEL_DIR, 'dish_classifier_v1.h5'),
+        os.path.join(RUNTIME_DIR, 'dish_classifier_v1.tflite'),
+        cv_sample,
+    )
+
+    manifest = {
+        'predictor': predictor,
+        'classifier': classifier,
+        'preprocessors': PREPROCESSORS_FILE,
+    }
+    with open(os.path.join(RUNTIME_DIR, RUNTIME_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✨ Runtime exported to {RUNTIME_DIR}")
+    print(f"   Predictor: {predictor['bytes'] / 1024:.0f} KB, classifier: {classifier['bytes'] / 1024:.0f} KB")
@@ -0,0 +1,194 @@
+import os
+import json
+import pickle
+import shutil
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+
+MODEL_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'models')
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+
+LOOKUP_PATH = os.path.join(DATA_DIR, 'processed', 'processed_oven_recipes_v2.csv')
+FEATURE_CACHE_DIR = os.path.join(DATA_DIR, 'processed', 'feature_cache_v2')
+
+ENCODER_FILES = ['name_encoder_v2.pkl', 'ingredient_binarizer.pkl', 'tag_binarizer.pkl']
+
+MANIFEST_FILE = 'manifest.json'
+ROW_INDEX_FILE = 'row_index.json'
+ARRAY_FILES = {
+    'name': 'name.npy',
+    'ingredients': 'ingredients.npy',
+    'tags': 'tags.npy',
+}
+
+
+def source_signature(paths):
+    """Size and mtime of every file the cache was derived from; missing files are left out."""
+    signature = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature[os.path.basename(path)] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def sources_changed(recorded, paths):
+    """
+    True if a source file that exists now differs from its `recorded`
+    signature. A source that is missing now (e.g. the CSV in a
+    catalog-only deployment) does not make a cache stale.
+    """
+    recorded = recorded or {}
+    return any(name in recorded and recorded[name] != signature
+               for name, signature in source_signature(paths).items())
+
+
+def default_sources():
+    return [LOOKUP_PATH] + [os.path.join(MODEL_DIR, name) for name in ENCODER_FILES]
+
+
+def build_feature_cache(recipe_lookup, name_encoder, ingredient_binarizer, tag_binarizer,
+                        cache_dir=FEATURE_CACHE_DIR, sources=None, chunk_size=4096):
+    """
+    Encodes the name/ingredient/tag inputs of every recipe once and
+    writes them as .npy arrays that can be memory-mapped at startup.
+
+    Row i of every array belongs to row i of `recipe_lookup`, whose
+    names are stored in the row index file.
+
+    The cache is built in a sibling temp directory and swapped into
+    place when complete, so a rebuild never rewrites arrays that a
+    running server has memory-mapped, and a failed rebuild leaves the
+    previous cache intact.
+    """
+    cache_dir = os.path.abspath(cache_dir)
+    final_dir = cache_dir
+    cache_dir = f'{final_dir}.{os.getpid()}.tmp'
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir)
+    n_rows = len(recipe_lookup)
+    n_ingredients = len(ingredient_binarizer.classes_)
+    n_tags = len(tag_binarizer.classes_)
+
+    name_arr = open_memmap(os.path.join(cache_dir, ARRAY_FILES['name']),
+                           mode='w+', dtype=np.float32, shape=(n_rows, 1))
+    ingr_arr = open_memmap(os.path.join(cache_dir, ARRAY_FILES['ingredients']),
+                           mode='w+', dtype=np.uint8, shape=(n_rows, n_ingredients))
+    tags_arr = open_memmap(os.path.join(cache_dir, ARRAY_FILES['tags']),
+                           mode='w+', dtype=np.uint8, shape=(n_rows, n_tags))
+
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        chunk = recipe_lookup.iloc[start:stop]
+        name_arr[start:stop] = name_encoder.transform([[name] for name in chunk.index])
+        ingr_arr[start:stop] = ingredient_binarizer.transform(chunk['ingredient_ids'])
+        tags_arr[start:stop] = tag_binarizer.transform(chunk['tags'])
+        print(f"Encoded {stop}/{n_rows} recipes...")
+
+    for arr in (name_arr, ingr_arr, tags_arr):
+        arr.flush()
+    del name_arr, ingr_arr, tags_arr
+
+    with open(os.path.join(cache_dir, ROW_INDEX_FILE), 'w') as f:
+        json.dump([str(name) for name in recipe_lookup.index], f)
+
+    manifest = {
+        'rows': n_rows,
+        'num_ingredients': n_ingredients,
+        'num_tags': n_tags,
+        'sources': source_signature(sources) if sources else {},
+    }
+    # The manifest is written last so a half-built cache is never picked up.
+    with open(os.path.join(cache_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # A directory cannot be replaced over a non-empty one, so move the old
+    # cache aside first. Readers in between see no cache and encode on the fly.
+    old_dir = f'{final_dir}.{os.getpid()}.old'
+    if os.path.exists(final_dir):
+        os.replace(final_dir, old_dir)
+    os.replace(cache_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+class RecipeFeatureCache:
+    """
+    Read-only view over a feature cache built by `build_feature_cache`.
+
+    Arrays are memory-mapped, so opening the cache is cheap and the OS
+    page cache is shared between worker processes.
+    """
+
+    def __init__(self, cache_dir=FEATURE_CACHE_DIR):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(cache_dir, ROW_INDEX_FILE)) as f:
+            self.names = json.load(f)
+
+        self.name = np.load(os.path.join(cache_dir, ARRAY_FILES['name']), mmap_mode='r')
+        self.ingredients = np.load(os.path.join(cache_dir, ARRAY_FILES['ingredients']), mmap_mode='r')
+        self.tags = np.load(os.path.join(cache_dir, ARRAY_FILES['tags']), mmap_mode='r')
+
+        if not (len(self.names) == len(self.name) == len(self.ingredients) == len(self.tags)):
+            raise Exception(f"Feature cache at {cache_dir} is inconsistent.")
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_stale(self, sources):
+        """True if any source file that still exists changed since the cache was built."""
+        return sources_changed(self.manifest.get('sources'), sources)
+
+    def gather(self, positions):
+        """
+        Returns the (name, ingredients, tags) model inputs for the given
+        row positions as float32 arrays.
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        return (
+            np.asarray(self.name[positions], dtype=np.float32),
+            np.asarray(self.ingredients[positions], dtype=np.float32),
+            np.asarray(self.tags[positions], dtype=np.float32),
+        )
+
+
+def load_feature_cache(cache_dir=FEATURE_CACHE_DIR, sources=None):
+    """
+    Opens the feature cache if it exists and is up to date with its
+    sources. Returns None otherwise so callers can fall back to encoding
+    recipes on the fly.
+    """
+    if not os.path.exists(os.path.join(cache_dir, MANIFEST_FILE)):
+        return None
+    cache = RecipeFeatureCache(cache_dir)
+    if sources is not None and cache.is_stale(sources):
+        print(f"Feature cache at {cache_dir} is stale; rebuild it with ml_model/feature_cache.py.")
+        return None
+    return cache
+
+
+if __name__ == '__main__':
+    print("--- Building V2 recipe feature cache ---")
+    from recipe_catalog import load_catalog
+    recipe_lookup = load_catalog().to_dataframe()
+    print(f"Loaded {len(recipe_lookup)} recipes.")
+
+    with open(os.path.join(MODEL_DIR, 'name_encoder_v2.pkl'), 'rb') as f:
+        name_encoder = pickle.load(f)
+    with open(os.path.join(MODEL_DIR, 'ingredient_binarizer.pkl'), 'rb') as f:
+        ingredient_binarizer = pickle.load(f)
+    with open(os.path.join(MODEL_DIR, 'tag_binarizer.pkl'), 'rb') as f:
+        tag_binarizer = pickle.load(f)
+
+    manifest = build_feature_cache(recipe_lookup, name_encoder, ingredient_binarizer,
+                                   tag_binarizer, sources=default_sources())
+    print(f"Feature cache written to {FEATURE_CACHE_DIR} "
+          f"({manifest['rows']} rows, {manifest['num_ingredients']} ingredients, {manifest['num_tags']} tags).")
@@ -0,0 +1,20 @@
+# Feedback corrections shared by the reinforcement engine and the API.
+# No TensorFlow or pandas imports here, so the lite API can import it.
+
+# (temperature, duration) multipliers applied to the logged prediction for
+# each feedback value: 1 = perfect (keep), 0 = undercooked (cook longer),
+# -1 = overcooked (slightly cooler and shorter). The reinforcement engine
+# trains on these by default; /stats and personalization apply the same.
+CORRECTION_FACTORS = {1: (1.0, 1.0), 0: (1.0, 1.15), -1: (0.98, 0.85)}
+
+
+def correction_factors(undercooked_duration=None, overcooked_temp=None, overcooked_duration=None):
+    """CORRECTION_FACTORS with the tunable multipliers replaced (None keeps the default)."""
+    factors = dict(CORRECTION_FACTORS)
+    if undercooked_duration is not None:
+        factors[0] = (factors[0][0], undercooked_duration)
+    if overcooked_temp is not None:
+        factors[-1] = (overcooked_temp, factors[-1][1])
+    if overcooked_duration is not None:
+        factors[-1] = (factors[-1][0], overcooked_duration)
+    return factors
@@ -0,0 +1,41 @@
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: fall back to msvcrt byte-range locks.
+    fcntl = None
+    import msvcrt
+
+
+def lock_file(f, blocking=True):
+    """
+    Takes an exclusive lock on the open file `f`, shared with other
+    processes. With blocking=False, returns False instead of waiting
+    when another process holds it.
+    """
+    if fcntl is not None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+
+    # msvcrt locks bytes from the current position; everyone locks byte 0.
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+def unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
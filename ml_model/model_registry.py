@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from contextlib import contextmanager
+
+from file_lock import lock_file, unlock_file
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+
+MODEL_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'models')
+REGISTRY_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'registry')
+
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.lock'
+
+
+def sha256sum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Versioned directory of prediction models.
+
+    Layout:
+        registry/manifest.json     active version, all versions, activation
+                                   stack ('history') and rollback log
+        registry/<version>/        model file (+ optional extra files)
+
+    Every file is recorded with its SHA-256 so a loader can verify what
+    it reads. The manifest is only ever replaced atomically (write to a
+    temp file, then rename), so readers see either the old or the new
+    manifest, never a partial one. Changes to it (publish, activate,
+    rollback) hold an exclusive lock on registry/.lock, so concurrent
+    publishers cannot lose each other's versions.
+
+    'history' is a stack: activating a version pushes it, a rollback pops
+    the current version, so repeated rollbacks step further back.
+    """
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'active': None, 'versions': {}, 'history': []}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, LOCK_FILE), 'a') as lock:
+            lock_file(lock)
+            try:
+                yield
+            finally:
+                unlock_file(lock)
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def manifest_mtime(self):
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def active_version(self):
+        return self.read_manifest()['active']
+
+    def version_info(self, version):
+        manifest = self.read_manifest()
+        if version not in manifest['versions']:
+            raise KeyError(f"Unknown model version '{version}'.")
+        return manifest['versions'][version]
+
+    def model_path(self, version):
+        info = self.version_info(version)
+        return os.path.join(self.root, version, info['model_file'])
+
+    def verify(self, version):
+        """Raises if any file of `version` is missing or its checksum differs."""
+        info = self.version_info(version)
+        for name, expected in info['checksums'].items():
+            path = os.path.join(self.root, version, name)
+            if not os.path.exists(path):
+                raise Exception(f"Model version '{version}' is missing {name}.")
+            actual = sha256sum(path)
+            if actual != expected:
+                raise Exception(f"Checksum mismatch for {version}/{name}.")
+        return info
+
+    def _next_version(self, manifest):
+        numbers = [int(v[1:]) for v in manifest['versions'] if v.startswith('v') and v[1:].isdigit()]
+        return f"v{max(numbers, default=0) + 1}"
+
+    def publish(self, model_path, extra_files=(), version=None, metadata=None, activate=True):
+        """
+        Copies a model (and any extra files) into a new version directory,
+        records checksums and optionally makes it the active version.
+        Returns the version name.
+        """
+        with self._locked():
+            return self._publish(model_path, extra_files, version, metadata, activate)
+
+    def _publish(self, model_path, extra_files, version, metadata, activate):
+        manifest = self.read_manifest()
+        version = version or self._next_version(manifest)
+        if version in manifest['versions']:
+            raise Exception(f"Model version '{version}' already exists.")
+
+        version_dir = os.path.join(self.root, version)
+        staging_dir = version_dir + '.staging'
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        checksums = {}
+        for path in [model_path, *extra_files]:
+            target = os.path.join(staging_dir, os.path.basename(path))
+            shutil.copy2(path, target)
+            checksums[os.path.basename(path)] = sha256sum(target)
+        os.replace(staging_dir, version_dir)
+
+        manifest['versions'][version] = {
+            'model_file': os.path.basename(model_path),
+            'checksums': checksums,
+            'created_at': time.time(),
+            'metadata': metadata or {},
+        }
+        if activate:
+            self._activate(manifest, version)
+        self._write_manifest(manifest)
+        return version
+
+    def _activate(self, manifest, version):
+        if manifest['active'] != version:
+            manifest['history'].append(version)
+        manifest['active'] = version
+
+    def activate(self, version):
+        """Makes an existing version active (deploy or roll forward)."""
+        with self._locked():
+            manifest = self.read_manifest()
+            if version not in manifest['versions']:
+                raise KeyError(f"Unknown model version '{version}'.")
+            self.verify(version)
+            self._activate(manifest, version)
+            self._write_manifest(manifest)
+        return version
+
+    def rollback(self):
+        """
+        Re-activates the version that was active before the current one,
+        popping the current one off the activation stack.
+        """
+        with self._locked():
+            manifest = self.read_manifest()
+            current = manifest['active']
+            history = list(manifest['history'])
+            while history and history[-1] == current:
+                history.pop()
+            if not history:
+                raise Exception("No earlier model version to roll back to.")
+            previous = history[-1]
+            self.verify(previous)
+            manifest['history'] = history
+            manifest['active'] = previous
+            manifest.setdefault('rollbacks', []).append({'from': current, 'to': previous, 'at': time.time()})
+            self._write_manifest(manifest)
+        return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the versioned prediction model registry.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    publish = sub.add_parser('publish', help="Add a model file as a new version.")
+    publish.add_argument('model_path')
+    publish.add_argument('--version')
+    publish.add_argument('--no-activate', action='store_true')
+
+    sub.add_parser('list', help="Show all versions.")
+    activate = sub.add_parser('activate', help="Make a version active.")
+    activate.add_argument('version')
+    sub.add_parser('rollback', help="Re-activate the previous version.")
+
+    args = parser.parse_args()
+    registry = ModelRegistry()
+
+    if args.command == 'publish':
+        version = registry.publish(args.model_path, version=args.version, activate=not args.no_activate)
+        print(f"Published {args.model_path} as {version}.")
+    elif args.command == 'list':
+        manifest = registry.read_manifest()
+        for version, info in sorted(manifest['versions'].items(), key=lambda kv: kv[1]['created_at']):
+            marker = '*' if version == manifest['active'] else ' '
+            created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(info['created_at']))
+            print(f"{marker} {version:8s} {info['model_file']:32s} {created}")
+    elif args.command == 'activate':
+        print(f"Active model version is now {registry.activate(args.version)}.")
+    elif args.command == 'rollback':
+        print(f"Rolled back; active model version is now {registry.rollback()}.")
+
+
+if __name__ == '__main__':
+    main()
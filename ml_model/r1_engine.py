@@ -1,12 +1,18 @@
 import os
+import json
 import pickle
 import sqlite3
+import argparse
 import numpy as np
 import pandas as pd
 import tensorflow as tf
-import ast
-
-print("--- Smart Reinforcement Engine (V2) ---")
+from types import SimpleNamespace
+from recipe_index import RecipeNameIndex
+from feature_cache import load_feature_cache, default_sources
+from recipe_catalog import load_catalog
+from model_registry import ModelRegistry
+from sparse_inputs import to_sparse_model
+from feedback_corrections import CORRECTION_FACTORS, correction_factors
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
@@ -18,54 +24,117 @@ DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 CURRENT_MODEL_PATH = os.path.join(MODEL_DIR, 'oven_predictor_v2.h5')
 NEW_MODEL_PATH = os.path.join(MODEL_DIR, 'oven_predictor_v3.h5')
 
-try:
-    conn = sqlite3.connect(DB_PATH)
-    df_feedback = pd.read_sql_query("SELECT * FROM feedback_log", conn)
-    conn.close()
-    
-    if df_feedback.empty:
-        print("No new feedback found in database. Exiting.")
-        exit()
-        
-    print(f"Loaded {len(df_feedback)} new feedback entries.")
-except Exception as e:
-    print(f"Error loading feedback: {e}")
-    exit()
-
-try:
-    print("Loading recipe lookup data...")
-    lookup_path = os.path.join(DATA_DIR, 'processed', 'processed_oven_recipes_v2.csv')
-    recipe_lookup = pd.read_csv(lookup_path)
-    recipe_lookup['ingredient_ids'] = recipe_lookup['ingredient_ids'].apply(ast.literal_eval)
-    recipe_lookup['tags'] = recipe_lookup['tags'].apply(ast.literal_eval)
-    recipe_lookup.set_index('name', inplace=True)
-    print("Recipe lookup loaded.")
-except Exception as e:
-    print(f"CRITICAL ERROR: Could not load recipe lookup data. {e}")
-    exit()
-
-def generate_corrected_targets(row):
-    temp = row['predicted_temp']
-    duration = row['predicted_duration']
-    feedback = row['user_feedback']
-    
-    if feedback == 1: 
-        return temp, duration
-    elif feedback == 0:
-        return temp, duration * 1.15 
-    elif feedback == -1: 
-        return temp * 0.98, duration * 0.85
-    
-df_feedback[['Corrected_Temp', 'Corrected_Duration']] = df_feedback.apply(
-    generate_corrected_targets, axis=1, result_type='expand'
-)
-print("Applied correction logic to feedback.")
-print(df_feedback[['dish_name', 'predicted_duration', 'Corrected_Duration']].head())
-
-print("Loading V2 preprocessors and model...")
-try:
-    model = tf.keras.models.load_model(CURRENT_MODEL_PATH)
-    
+# Fine-tuning progress: the last feedback id that has been trained on, the
+# checkpoint that contains it and the last feedback id whose model was
+# written to --output (and published). Feedback rows are never deleted.
+CHECKPOINT_DIR = os.path.join(PROJECT_ROOT, 'ml_model', 'checkpoints')
+STATE_PATH = os.path.join(CHECKPOINT_DIR, 'r1_state.json')
+
+FEEDBACK_COLUMNS = ['id', 'dish_name', 'room_temp', 'room_humidity',
+                    'predicted_temp', 'predicted_duration', 'user_feedback']
+
+
+def generate_corrected_targets(df_feedback, factors=CORRECTION_FACTORS):
+    """
+    Turns user feedback into corrected (temp, duration) training targets
+    using the per-feedback-value multipliers in `factors`.
+    Rows with any other feedback value get NaN targets.
+    """
+    temp = df_feedback['predicted_temp'].to_numpy(dtype=float)
+    duration = df_feedback['predicted_duration'].to_numpy(dtype=float)
+    feedback = df_feedback['user_feedback'].to_numpy()
+
+    conditions = [feedback == value for value in factors]
+    corrected_temp = np.select(conditions, [temp * t for t, _ in factors.values()], default=np.nan)
+    corrected_duration = np.select(conditions, [duration * d for _, d in factors.values()], default=np.nan)
+    return corrected_temp, corrected_duration
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {'last_feedback_id': 0, 'checkpoint': None, 'trained_rows': 0}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+
+def save_state(state):
+    # Write-then-rename so a crash never leaves a half-written state file.
+    tmp_path = STATE_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def save_checkpoint(model, state, last_feedback_id, trained_rows):
+    """
+    Saves the model under a name tied to its high-water mark, then points
+    the state file at it. The previous checkpoint is removed only after
+    the new state is on disk.
+    """
+    checkpoint = checkpoint_path(last_feedback_id)
+    model.save(checkpoint)
+    return commit_checkpoint(checkpoint, state, last_feedback_id,
+                             state.get('trained_rows', 0) + trained_rows)
+
+
+def checkpoint_path(last_feedback_id):
+    return os.path.join(CHECKPOINT_DIR, f'oven_predictor_ckpt_{last_feedback_id}.h5')
+
+
+def commit_checkpoint(checkpoint, state, last_feedback_id, trained_rows):
+    """
+    Points the state file at a checkpoint already written to
+    CHECKPOINT_DIR, then removes the previous checkpoint.
+    """
+    previous = state.get('checkpoint')
+    # State files from before exported_feedback_id count as exported.
+    exported = state.get('exported_feedback_id', state.get('last_feedback_id', 0))
+    state = dict(state, last_feedback_id=int(last_feedback_id), checkpoint=os.path.basename(checkpoint),
+                 trained_rows=int(trained_rows), exported_feedback_id=int(exported))
+    save_state(state)
+    if previous and previous != state['checkpoint']:
+        try:
+            os.remove(os.path.join(CHECKPOINT_DIR, previous))
+        except OSError:
+            pass
+    return state
+
+
+def export_pending(state):
+    """True if a run stopped after its last checkpoint but before writing --output."""
+    checkpoint = state.get('checkpoint')
+    return (bool(checkpoint) and os.path.exists(os.path.join(CHECKPOINT_DIR, checkpoint))
+            and state['last_feedback_id'] > state.get('exported_feedback_id', state['last_feedback_id']))
+
+
+def mark_exported(state):
+    state = dict(state, exported_feedback_id=state['last_feedback_id'])
+    save_state(state)
+    return state
+
+
+def fetch_feedback(conn, after_id, limit):
+    """Next `limit` feedback rows with id > after_id, oldest first."""
+    return pd.read_sql_query(
+        f"SELECT {', '.join(FEEDBACK_COLUMNS)} FROM feedback_log WHERE id > ? ORDER BY id LIMIT ?",
+        conn, params=(int(after_id), int(limit)))
+
+
+def compile_for_training(model, learning_rate=0.001):
+    """Compiles the same way the training notebook does (Adam, MSE on both heads)."""
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate), loss='mse')
+    return model
+
+
+def load_trainable_model(path, learning_rate=0.001):
+    """
+    Loads a saved predictor and compiles it for fine-tuning.
+    """
+    model = tf.keras.models.load_model(path, compile=False)
+    return compile_for_training(model, learning_rate)
+
+
+def load_preprocessors():
     with open(os.path.join(MODEL_DIR, 'name_encoder_v2.pkl'), 'rb') as f:
         name_encoder = pickle.load(f)
     with open(os.path.join(MODEL_DIR, 'env_scaler_v2.pkl'), 'rb') as f:
@@ -76,60 +145,258 @@ try:
         ingredient_binarizer = pickle.load(f)
     with open(os.path.join(MODEL_DIR, 'tag_binarizer.pkl'), 'rb') as f:
         tag_binarizer = pickle.load(f)
-        
-    print("All V2 models loaded successfully.")
-except Exception as e:
-    print(f"Error loading models: {e}")
-    exit()
-
-print("Creating new training batch...")
-X_name_list, X_env_list, X_ingr_list, X_tags_list = [], [], [], []
-
-for index, row in df_feedback.iterrows():
-    dish_name = row['dish_name']
-    
+    return SimpleNamespace(name_encoder=name_encoder, env_scaler=env_scaler, output_scaler=output_scaler,
+                           ingredient_binarizer=ingredient_binarizer, tag_binarizer=tag_binarizer)
+
+
+def load_recipes(sparse=False):
+    """
+    Recipe name index plus the feature cache if it is up to date,
+    otherwise the binary recipe catalog. Sparse batches always come from
+    the catalog.
+    """
+    feature_cache = None if sparse else load_feature_cache(sources=default_sources())
+    if feature_cache is not None:
+        print(f"Using feature cache with {len(feature_cache)} encoded recipes.")
+        return SimpleNamespace(feature_cache=feature_cache, catalog=None,
+                               index=RecipeNameIndex(feature_cache.names))
+
+    catalog = load_catalog()
+    print(f"Using recipe catalog with {len(catalog)} recipes.")
+    return SimpleNamespace(feature_cache=None, catalog=catalog,
+                           index=RecipeNameIndex(catalog.names))
+
+
+def resolve_positions(recipes, dish_names):
+    """
+    Recipe row position for every dish name (-1 if unknown). Each
+    distinct name is resolved once.
+    """
+    resolved = {}
+    for name in dict.fromkeys(dish_names):
+        match = recipes.index.resolve(name, prefer_exact=True)
+        if match is None:
+            print(f"Warning: Could not find ingredients for '{name}'. Skipping.")
+        resolved[name] = -1 if match is None else match.position
+    return np.array([resolved[name] for name in dish_names], dtype=np.intp)
+
+
+def build_features(df_feedback, recipes, preprocessors, sparse=False):
+    """
+    Model inputs for a block of feedback rows, plus the boolean mask of
+    the rows they cover; rows whose dish cannot be found or whose
+    feedback value is unknown are dropped. With `sparse` (and a
+    catalog), the ingredient and tag inputs are scipy CSR matrices.
+    """
+    feedback = df_feedback['user_feedback'].to_numpy()
+    logged = df_feedback[['predicted_temp', 'predicted_duration']].to_numpy(dtype=float)
+    positions = resolve_positions(recipes, df_feedback['dish_name'].tolist())
+    keep = (positions >= 0) & np.isin(feedback, list(CORRECTION_FACTORS)) & ~np.isnan(logged).any(axis=1)
+    if not keep.any():
+        return None, keep
+
+    positions = positions[keep]
+    if recipes.feature_cache is not None and not sparse:
+        X_name, X_ingr, X_tags = recipes.feature_cache.gather(positions)
+    else:
+        catalog = recipes.catalog
+        multi_hot = catalog.sparse_multi_hot if sparse else catalog.multi_hot
+        X_name = preprocessors.name_encoder.transform([[catalog.names[p]] for p in positions])
+        X_ingr = multi_hot('ingredients', positions, preprocessors.ingredient_binarizer.classes_)
+        X_tags = multi_hot('tags', positions, preprocessors.tag_binarizer.classes_)
+
+    env = df_feedback[['room_temp', 'room_humidity']].to_numpy(dtype=float)[keep]
+    X_env = preprocessors.env_scaler.transform(env)
+    return [X_name, X_env, X_ingr, X_tags], keep
+
+
+def build_targets(df_feedback, preprocessors, factors=CORRECTION_FACTORS):
+    """Scaled (temp, duration) training targets for feedback rows, corrected with `factors`."""
+    corrected_temp, corrected_duration = generate_corrected_targets(df_feedback, factors)
+    Y_scaled = preprocessors.output_scaler.transform(np.column_stack([corrected_temp, corrected_duration]))
+    return [Y_scaled[:, 0], Y_scaled[:, 1]]
+
+
+def build_training_batch(df_feedback, recipes, preprocessors, sparse=False, factors=CORRECTION_FACTORS):
+    """
+    Vectorized feature/target construction for a block of feedback rows.
+    Returns (X_list, Y_list, n_rows); see build_features() for which rows
+    are dropped.
+    """
+    X, keep = build_features(df_feedback, recipes, preprocessors, sparse)
+    if X is None:
+        return None, None, 0
+    return X, build_targets(df_feedback[keep], preprocessors, factors), int(keep.sum())
+
+
+def default_base_model(registry):
+    active = registry.active_version()
+    if active is not None:
+        registry.verify(active)
+        return registry.model_path(active)
+    return CURRENT_MODEL_PATH
+
+
+def publish_model(registry, model_path, state, metadata=None):
+    """
+    Publishes a fine-tuned model as the registry's new active version; a
+    running API picks it up without a restart. An empty registry is first
+    seeded with the V2 base model so there is always a version to roll
+    back to. `metadata` is added to (or overrides) the recorded metadata.
+    """
+    if registry.active_version() is None and os.path.exists(CURRENT_MODEL_PATH):
+        base = registry.publish(CURRENT_MODEL_PATH, metadata={'source': 'base'})
+        print(f"Seeded model registry with the base model as {base}.")
+    version = registry.publish(model_path, metadata={
+        'source': 'r1_engine',
+        'last_feedback_id': state['last_feedback_id'],
+        'trained_rows': state['trained_rows'],
+        **(metadata or {}),
+    })
+    return version
+
+
+def add_correction_args(parser, nargs=None):
+    """--undercooked-duration/--overcooked-temp/--overcooked-duration (lists with nargs='+')."""
+    defaults = CORRECTION_FACTORS
+    for flag, default, help_text in (
+            ('--undercooked-duration', defaults[0][1], "Duration multiplier for undercooked feedback."),
+            ('--overcooked-temp', defaults[-1][0], "Temperature multiplier for overcooked feedback."),
+            ('--overcooked-duration', defaults[-1][1], "Duration multiplier for overcooked feedback.")):
+        parser.add_argument(flag, type=float, nargs=nargs, default=[default] if nargs else default,
+                            help=help_text)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Incrementally fine-tune the oven predictor on new feedback.")
+    parser.add_argument('--epochs', type=int, default=15)
+    parser.add_argument('--batch-size', type=int, default=16,
+                        help="Mini-batch size for fine-tuning.")
+    parser.add_argument('--chunk-rows', type=int, default=5000,
+                        help="Feedback rows read and trained per checkpoint.")
+    parser.add_argument('--base-model', default=None,
+                        help="Model to start from when there is no checkpoint "
+                             "(default: the registry's active version, else oven_predictor_v2.h5; "
+                             "oven_predictor_v2.h5 with --reset).")
+    parser.add_argument('--output', default=NEW_MODEL_PATH)
+    parser.add_argument('--no-publish', action='store_true',
+                        help="Only write --output; do not publish it to the model registry.")
+    parser.add_argument('--reset', action='store_true',
+                        help="Ignore the saved high-water mark and retrain on all feedback.")
+    parser.add_argument('--sparse', action='store_true',
+                        help="Build ingredient/tag inputs as sparse matrices and train through "
+                             "a sparse-input view of the model.")
+    parser.add_argument('--learning-rate', type=float, default=0.001)
+    add_correction_args(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("--- Smart Reinforcement Engine (V2) ---")
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+
+    registry = ModelRegistry()
+    state = load_state()
+    # With --reset the old checkpoint is removed once a new one replaces it.
+    stale_checkpoint = state.get('checkpoint') if args.reset else None
+    if args.reset:
+        state = {'last_feedback_id': 0, 'checkpoint': None, 'trained_rows': 0}
+    print(f"High-water mark: feedback id {state['last_feedback_id']}.")
+
     try:
-        recipe_data = recipe_lookup.loc[dish_name].iloc[0]
-    except Exception:
-        possible_matches = recipe_lookup[recipe_lookup.index.str.lower().str.contains(dish_name.lower())]
-        if possible_matches.empty:
-            print(f"Warning: Could not find ingredients for '{dish_name}'. Skipping.")
-            continue
-        recipe_data = possible_matches.iloc[0]
-
-    X_name_list.append(name_encoder.transform([[recipe_data.name]]))
-    X_env_list.append(env_scaler.transform([[row['room_temp'], row['room_humidity']]]))
-    X_ingr_list.append(ingredient_binarizer.transform([recipe_data['ingredient_ids']]))
-    X_tags_list.append(tag_binarizer.transform([recipe_data['tags']]))
-
-X_name_new = np.concatenate(X_name_list, axis=0)
-X_env_new = np.concatenate(X_env_list, axis=0)
-X_ingr_new = np.concatenate(X_ingr_list, axis=0)
-X_tags_new = np.concatenate(X_tags_list, axis=0)
-
-X_train_list = [X_name_new, X_env_new, X_ingr_new, X_tags_new]
-
-Y_new = df_feedback[['Corrected_Temp', 'Corrected_Duration']]
-Y_new_scaled = output_scaler.transform(Y_new)
-Y_temp_new = Y_new_scaled[:, 0]
-Y_duration_new = Y_new_scaled[:, 1]
-Y_train_list = [Y_temp_new, Y_duration_new]
-
-print(f"Fine-tuning model on {len(X_name_new)} new data points...")
-history = model.fit(
-    X_train_list,
-    Y_train_list,
-    epochs=15,  
-    batch_size=1,
-    verbose=1
-)
-print("Fine-tuning complete.")
-
-model.save(NEW_MODEL_PATH)
-print(f"✨ New, smarter model saved as: {NEW_MODEL_PATH}")
-
-conn = sqlite3.connect(DB_PATH)
-conn.execute("DELETE FROM feedback_log")
-conn.commit()
-conn.close()
-print("Feedback log cleared. Ready for new feedback.")
\ No newline at end of file
+        conn = sqlite3.connect(DB_PATH)
+        df_feedback = fetch_feedback(conn, state['last_feedback_id'], args.chunk_rows)
+    except Exception as e:
+        print(f"Error loading feedback: {e}")
+        return
+
+    if df_feedback.empty:
+        conn.close()
+        if not export_pending(state):
+            print("No new feedback found in database. Exiting.")
+            return
+        # The previous run was interrupted after its last checkpoint.
+        print(f"No new feedback, but checkpoint {state['checkpoint']} was never exported; exporting it.")
+        try:
+            model = load_trainable_model(os.path.join(CHECKPOINT_DIR, state['checkpoint']), args.learning_rate)
+        except Exception as e:
+            print(f"Error loading checkpoint: {e}")
+            return
+        export_model(model, registry, state, args)
+        return
+
+    try:
+        recipes = load_recipes(sparse=args.sparse)
+    except Exception as e:
+        print(f"CRITICAL ERROR: Could not load recipe lookup data. {e}")
+        conn.close()
+        return
+
+    print("Loading V2 preprocessors and model...")
+    try:
+        preprocessors = load_preprocessors()
+        checkpoint = state.get('checkpoint')
+        if checkpoint and os.path.exists(os.path.join(CHECKPOINT_DIR, checkpoint)):
+            print(f"Resuming from checkpoint {checkpoint}.")
+            model = load_trainable_model(os.path.join(CHECKPOINT_DIR, checkpoint), args.learning_rate)
+        else:
+            # --reset retrains on all feedback, so it starts from the untuned base model.
+            base_model = args.base_model or (CURRENT_MODEL_PATH if args.reset else default_base_model(registry))
+            print(f"Starting from {base_model}.")
+            model = load_trainable_model(base_model, args.learning_rate)
+        # The sparse view shares the model's weights; the dense model is what gets saved.
+        trainer = compile_for_training(to_sparse_model(model), args.learning_rate) if args.sparse else model
+        factors = correction_factors(args.undercooked_duration, args.overcooked_temp, args.overcooked_duration)
+        print("All V2 models loaded successfully.")
+    except Exception as e:
+        print(f"Error loading models: {e}")
+        conn.close()
+        return
+
+    total_rows = 0
+    while not df_feedback.empty:
+        last_id = int(df_feedback['id'].max())
+        print(f"Creating training batch from {len(df_feedback)} feedback entries "
+              f"(ids {int(df_feedback['id'].min())}..{last_id})...")
+        X_train_list, Y_train_list, n_rows = build_training_batch(df_feedback, recipes, preprocessors,
+                                                                  sparse=args.sparse, factors=factors)
+
+        if n_rows:
+            print(f"Fine-tuning model on {n_rows} new data points...")
+            trainer.fit(
+                X_train_list,
+                Y_train_list,
+                epochs=args.epochs,
+                batch_size=args.batch_size,
+                verbose=1
+            )
+        state = save_checkpoint(model, state, last_id, n_rows)
+        if stale_checkpoint and stale_checkpoint != state['checkpoint']:
+            try:
+                os.remove(os.path.join(CHECKPOINT_DIR, stale_checkpoint))
+            except OSError:
+                pass
+            stale_checkpoint = None
+        total_rows += n_rows
+        print(f"Checkpoint saved; high-water mark is now feedback id {last_id}.")
+
+        df_feedback = fetch_feedback(conn, last_id, args.chunk_rows)
+    conn.close()
+    print(f"Fine-tuning complete ({total_rows} new data points).")
+    export_model(model, registry, state, args)
+
+
+def export_model(model, registry, state, args):
+    """Writes the fine-tuned model to --output, publishes it and records that in the state."""
+    model.save(args.output)
+    print(f"✨ New, smarter model saved as: {args.output}")
+
+    if not args.no_publish:
+        version = publish_model(registry, args.output, state)
+        print(f"Published as model version {version}; the running API will switch to it.")
+    return mark_exported(state)
+
+
+if __name__ == '__main__':
+    main()
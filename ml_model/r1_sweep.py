@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import itertools
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from r1_engine import (DB_PATH, CHECKPOINT_DIR, CURRENT_MODEL_PATH, NEW_MODEL_PATH, FEEDBACK_COLUMNS,
+                       CORRECTION_FACTORS, correction_factors, generate_corrected_targets, add_correction_args,
+                       load_recipes, load_preprocessors, build_features, build_targets, load_trainable_model,
+                       compile_for_training, publish_model, load_state, checkpoint_path, commit_checkpoint,
+                       mark_exported)
+from model_registry import ModelRegistry
+from sparse_inputs import to_sparse_model
+
+REPORT_PATH = os.path.join(CHECKPOINT_DIR, 'r1_sweep_report.json')
+
+# Holdout metrics and whether higher is better.
+SELECT_METRICS = {'consistency': True, 'reference_mae_duration': False,
+                  'reference_mae_temp': False, 'holdout_mse': False}
+# Ties on --select are broken on these, in order. holdout_mse is measured
+# against each candidate's own corrected targets, so it does not compare
+# candidates with different correction factors.
+TIE_BREAK_METRICS = ('consistency', 'reference_mae_duration', 'reference_mae_temp')
+
+# Set in each pool process by init_worker().
+_worker = None
+
+
+def fetch_recent_feedback(conn, max_rows):
+    """The `max_rows` most recent feedback rows, oldest first."""
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(FEEDBACK_COLUMNS)} FROM feedback_log ORDER BY id DESC LIMIT ?",
+        conn, params=(int(max_rows),))
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def split_rows(X, df, start, stop):
+    return [x[start:stop] for x in X], df.iloc[start:stop].reset_index(drop=True)
+
+
+def sweep_grid(args):
+    """Every combination of the swept hyperparameters, numbered from 1."""
+    grid = itertools.product(args.epochs, args.batch_sizes, args.learning_rates,
+                             args.undercooked_duration, args.overcooked_temp, args.overcooked_duration)
+    return [{'id': i, 'epochs': e, 'batch_size': b, 'learning_rate': lr, 'undercooked_duration': ud,
+             'overcooked_temp': ot, 'overcooked_duration': od}
+            for i, (e, b, lr, ud, ot, od) in enumerate(grid, start=1)]
+
+
+def init_worker(data, threads):
+    """Pool initializer: the shared training data arrives once per process."""
+    global _worker
+    import tensorflow as tf
+
+    # Candidates train side by side, so each process gets its share of the cores.
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+    _worker = data
+
+
+def feedback_metrics(temp, duration, fb, temp_tolerance, duration_tolerance):
+    """
+    How well new (temp, duration) predictions for feedback rows `fb`
+    follow that feedback:
+      reference_mae_temp/_duration: MAE against targets corrected with the
+        production CORRECTION_FACTORS (degrees, minutes).
+      consistency: fraction of rows where the new prediction agrees with
+        the feedback: kept within tolerance for perfect, longer for
+        undercooked, shorter for overcooked.
+    """
+    reference_temp, reference_duration = generate_corrected_targets(fb, CORRECTION_FACTORS)
+    value = fb['user_feedback'].to_numpy()
+    temp_change = temp - fb['predicted_temp'].to_numpy(dtype=float)
+    duration_change = duration - fb['predicted_duration'].to_numpy(dtype=float)
+    kept = (np.abs(temp_change) <= temp_tolerance) & (np.abs(duration_change) <= duration_tolerance)
+    consistent = np.select([value == 1, value == 0, value == -1],
+                           [kept, duration_change > 0, duration_change < 0], default=False)
+    return {
+        'reference_mae_temp': float(np.mean(np.abs(temp - reference_temp))),
+        'reference_mae_duration': float(np.mean(np.abs(duration - reference_duration))),
+        'consistency': float(consistent.mean()),
+    }
+
+
+def evaluate(model, data, factors):
+    """
+    Holdout metrics of a model, from its predictions for the held-out
+    feedback rows: holdout_mse, the scaled MSE against the candidate's
+    own corrected targets, plus feedback_metrics().
+    """
+    scaled = np.hstack(to_sparse_model(model).predict(data.holdout_X, batch_size=1024, verbose=0))
+    temp, duration = data.preprocessors.output_scaler.inverse_transform(scaled).T
+
+    fb = data.holdout_feedback
+    own = np.column_stack(build_targets(fb, data.preprocessors, factors))
+    return dict(holdout_mse=float(np.mean((scaled - own) ** 2)),
+                **feedback_metrics(temp, duration, fb, data.temp_tolerance, data.duration_tolerance))
+
+
+def train_candidate(candidate):
+    """Fine-tunes the base model with one candidate's settings; runs in a pool process."""
+    import tensorflow as tf
+
+    data = _worker
+    tf.keras.utils.set_random_seed(data.seed)
+    factors = correction_factors(candidate['undercooked_duration'], candidate['overcooked_temp'],
+                                 candidate['overcooked_duration'])
+    t = time.perf_counter()
+    model = load_trainable_model(data.base_model, candidate['learning_rate'])
+    if candidate['epochs']:
+        # The sparse view shares the model's weights, as in r1_engine.py --sparse.
+        trainer = compile_for_training(to_sparse_model(model), candidate['learning_rate'])
+        trainer.fit(data.train_X, build_targets(data.train_feedback, data.preprocessors, factors),
+                    epochs=candidate['epochs'], batch_size=candidate['batch_size'], verbose=0)
+    train_s = time.perf_counter() - t
+
+    model_path = os.path.join(data.out_dir, f"candidate_{candidate['id']}.h5")
+    model.save(model_path)
+    return dict(candidate, train_s=train_s, model_path=model_path, pid=os.getpid(),
+                **evaluate(model, data, factors))
+
+
+def rank_key(result, select):
+    """Sort key: best on `select` first, ties broken on TIE_BREAK_METRICS."""
+    metrics = [select] + [m for m in TIE_BREAK_METRICS if m != select]
+    return tuple(-result[m] if SELECT_METRICS[m] else result[m] for m in metrics)
+
+
+def r1_engine_args(candidate):
+    """r1_engine.py flags that train with a candidate's settings."""
+    return (f"--epochs {candidate['epochs']} --batch-size {candidate['batch_size']} "
+            f"--learning-rate {candidate['learning_rate']} "
+            f"--undercooked-duration {candidate['undercooked_duration']} "
+            f"--overcooked-temp {candidate['overcooked_temp']} "
+            f"--overcooked-duration {candidate['overcooked_duration']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Fine-tune several candidate models in parallel and keep the best on held-out feedback.")
+    parser.add_argument('--epochs', type=int, nargs='+', default=[5, 15])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[16, 64])
+    parser.add_argument('--learning-rates', type=float, nargs='+', default=[0.001, 0.0003])
+    add_correction_args(parser, nargs='+')
+    parser.add_argument('--max-rows', type=int, default=20000,
+                        help="Train and evaluate on this many of the most recent feedback rows.")
+    parser.add_argument('--holdout', type=float, default=0.2,
+                        help="Fraction of those rows, the most recent ones, held out for evaluation.")
+    parser.add_argument('--select', choices=sorted(SELECT_METRICS), default='consistency',
+                        help="Holdout metric that picks the best candidate.")
+    parser.add_argument('--temp-tolerance', type=float, default=5.0,
+                        help="Degrees a prediction may move on a 'perfect' row and still be consistent.")
+    parser.add_argument('--duration-tolerance', type=float, default=2.0,
+                        help="Minutes a prediction may move on a 'perfect' row and still be consistent.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--base-model', default=CURRENT_MODEL_PATH,
+                        help="Model every candidate starts from (default: the untuned V2 model, "
+                             "which has not seen the held-out rows).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=NEW_MODEL_PATH, help="Where the best candidate is written.")
+    parser.add_argument('--report', default=REPORT_PATH)
+    parser.add_argument('--publish', action='store_true',
+                        help="Publish the best candidate to the model registry as the active version "
+                             "(only if it beats the base model on --select, unless --force).")
+    parser.add_argument('--force', action='store_true',
+                        help="With --publish, publish the best candidate even if it does not beat the base model.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("--- Reinforcement Engine Sweep ---")
+    candidates = sweep_grid(args)
+
+    conn = sqlite3.connect(DB_PATH)
+    df_feedback = fetch_recent_feedback(conn, args.max_rows)
+    conn.close()
+    recipes = load_recipes(sparse=True)
+    preprocessors = load_preprocessors()
+    X, keep = build_features(df_feedback, recipes, preprocessors, sparse=True)
+    if X is None or keep.sum() < 2:
+        print("Not enough usable feedback to train and evaluate. Exiting.")
+        return
+
+    # Features are built once here; only the targets depend on the candidate.
+    df_feedback = df_feedback[keep].reset_index(drop=True)
+    n_holdout = max(1, int(round(len(df_feedback) * args.holdout)))
+    n_train = len(df_feedback) - n_holdout
+    train_X, train_feedback = split_rows(X, df_feedback, 0, n_train)
+    holdout_X, holdout_feedback = split_rows(X, df_feedback, n_train, len(df_feedback))
+    print(f"{len(candidates)} candidates; {n_train} training rows, {n_holdout} held-out rows "
+          f"(feedback ids {int(df_feedback['id'].iloc[n_train])}..{int(df_feedback['id'].iloc[-1])}).")
+
+    # The base model itself, untrained, is the baseline every candidate is compared with.
+    baseline = dict(candidates[0], id=0, epochs=0, learning_rate=0.001, **{
+        'undercooked_duration': CORRECTION_FACTORS[0][1], 'overcooked_temp': CORRECTION_FACTORS[-1][0],
+        'overcooked_duration': CORRECTION_FACTORS[-1][1]})
+    workers = max(1, min(args.workers, len(candidates) + 1))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    higher_is_better = SELECT_METRICS[args.select]
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as out_dir:
+        data = SimpleNamespace(train_X=train_X, train_feedback=train_feedback, holdout_X=holdout_X,
+                               holdout_feedback=holdout_feedback, preprocessors=preprocessors,
+                               base_model=args.base_model, out_dir=out_dir, seed=args.seed,
+                               temp_tolerance=args.temp_tolerance, duration_tolerance=args.duration_tolerance)
+        print(f"Training on {workers} processes with {threads} thread(s) each...")
+        results = []
+        # spawn, not fork: TensorFlow's thread pools do not survive a fork.
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_worker, initargs=(data, threads)) as pool:
+            futures = [pool.submit(train_candidate, c) for c in [baseline] + candidates]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"  candidate {result['id']}: {args.select}={result[args.select]:.4f} "
+                      f"({result['train_s']:.1f}s)")
+        wall_s = time.perf_counter() - started
+
+        baseline = next(r for r in results if r['id'] == 0)
+        # Ties are common for consistency on small holdouts.
+        ranked = sorted((r for r in results if r['id'] != 0), key=lambda r: rank_key(r, args.select))
+        best = ranked[0]
+        improves = (best[args.select] > baseline[args.select] if higher_is_better
+                    else best[args.select] < baseline[args.select])
+        shutil.copy(best['model_path'], args.output)
+
+    print(f"\n{'rank':>4} {'id':>3} {'epochs':>6} {'batch':>5} {'lr':>8} {'under_d':>7} {'over_t':>6} "
+          f"{'over_d':>6} {'consist':>7} {'mae_temp':>8} {'mae_dur':>7} {'train_s':>7}")
+    for rank, r in enumerate([baseline] + ranked):
+        print(f"{'base' if rank == 0 else rank:>4} {r['id']:>3} {r['epochs']:>6} {r['batch_size']:>5} "
+              f"{r['learning_rate']:>8g} {r['undercooked_duration']:>7g} {r['overcooked_temp']:>6g} "
+              f"{r['overcooked_duration']:>6g} {r['consistency']:>7.3f} {r['reference_mae_temp']:>8.2f} "
+              f"{r['reference_mae_duration']:>7.2f} {r['train_s']:>7.1f}")
+    if not improves:
+        print(f"Warning: no candidate beats the base model on {args.select}.")
+    print(f"✨ Best candidate {best['id']} saved as: {args.output}")
+    print(f"   Continue incrementally with: python ml_model/r1_engine.py {r1_engine_args(best)}")
+
+    for r in results:
+        del r['model_path']
+    report = {
+        'base_model': args.base_model,
+        'select': args.select,
+        'rows': {'train': n_train, 'holdout': n_holdout,
+                 'holdout_first_id': int(df_feedback['id'].iloc[n_train]),
+                 'last_feedback_id': int(df_feedback['id'].iloc[-1])},
+        'workers': workers,
+        'threads_per_worker': threads,
+        'wall_s': wall_s,
+        'serial_s': sum(r['train_s'] for r in results),
+        'baseline': baseline,
+        'best': dict(best, improves_on_baseline=improves, output=args.output, r1_engine_args=r1_engine_args(best)),
+        'candidates': ranked,
+    }
+
+    if args.publish and not improves and not args.force:
+        print("Not publishing: the best candidate does not beat the base model (pass --force to publish anyway).")
+        report['published_version'] = None
+    elif args.publish:
+        # The candidate has seen the training rows only, so r1_engine.py
+        # resumes from it and goes on with the held-out rows.
+        last_trained_id = int(train_feedback['id'].iloc[-1]) if n_train else 0
+        state = {'last_feedback_id': last_trained_id, 'trained_rows': n_train}
+        version = publish_model(ModelRegistry(), args.output, state, metadata={
+            'source': 'r1_sweep', 'candidate': r1_engine_args(best), args.select: best[args.select]})
+        report['published_version'] = version
+        print(f"Published as model version {version}; the running API will switch to it.")
+
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        checkpoint = checkpoint_path(last_trained_id)
+        shutil.copy(args.output, checkpoint)
+        state = mark_exported(commit_checkpoint(checkpoint, load_state(), last_trained_id, n_train))
+        report['r1_state'] = state
+        print(f"r1_engine.py will resume from {state['checkpoint']} after feedback id {last_trained_id}.")
+
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Comparison report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+import os
+import ast
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from feature_cache import source_signature, sources_changed
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+LOOKUP_PATH = os.path.join(DATA_DIR, 'processed', 'processed_oven_recipes_v2.csv')
+CATALOG_PATH = os.path.join(DATA_DIR, 'processed', 'recipe_catalog_v2.npz')
+
+CATALOG_VERSION = 1
+LIST_FIELDS = {'ingredients': 'ingredient_ids', 'tags': 'tags'}
+
+
+def _encode_strings(strings):
+    """One UTF-8 blob of NUL-separated strings (recipe names never contain NUL)."""
+    return np.frombuffer('\x00'.join(strings).encode('utf-8'), dtype=np.uint8)
+
+
+def _decode_strings(blob, count):
+    if count == 0:
+        return []
+    return blob.tobytes().decode('utf-8').split('\x00')
+
+
+def _csr(lists):
+    """(indptr, indices, vocab) for a column of label lists."""
+    vocab = {}
+    indices = []
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    for i, labels in enumerate(lists):
+        for label in labels:
+            indices.append(vocab.setdefault(label, len(vocab)))
+        indptr[i + 1] = len(indices)
+    return indptr, np.asarray(indices, dtype=np.int32), list(vocab)
+
+
+def build_catalog(csv_path=LOOKUP_PATH, catalog_path=CATALOG_PATH):
+    """
+    Converts the processed recipe CSV into a binary catalog: a string
+    table of recipe names, one CSR matrix (indptr + indices into a
+    vocabulary) per list column, and numeric columns as plain arrays.
+
+    This is the only place the list columns are parsed with
+    `ast.literal_eval`; loading the catalog parses nothing.
+    """
+    df = pd.read_csv(csv_path)
+    arrays = {}
+    meta = {
+        'version': CATALOG_VERSION,
+        'rows': len(df),
+        'sources': source_signature([csv_path]),
+        'columns': [],
+        'string_columns': [],
+        'list_fields': {},
+    }
+
+    names = [str(name) for name in df['name']]
+    arrays['name_blob'] = _encode_strings(names)
+
+    for field, column in LIST_FIELDS.items():
+        indptr, indices, vocab = _csr(df[column].map(ast.literal_eval))
+        arrays[f'{field}_indptr'] = indptr
+        arrays[f'{field}_indices'] = indices
+        if all(isinstance(v, (int, np.integer)) for v in vocab):
+            arrays[f'{field}_vocab'] = np.asarray(vocab, dtype=np.int64)
+            meta['list_fields'][field] = {'column': column, 'vocab': 'int', 'size': len(vocab)}
+        else:
+            arrays[f'{field}_vocab'] = _encode_strings([str(v) for v in vocab])
+            meta['list_fields'][field] = {'column': column, 'vocab': 'str', 'size': len(vocab)}
+
+    for column in df.columns:
+        if column == 'name' or column in LIST_FIELDS.values():
+            continue
+        if pd.api.types.is_numeric_dtype(df[column]):
+            arrays[f'col_{column}'] = df[column].to_numpy()
+            meta['columns'].append(column)
+        else:
+            arrays[f'col_{column}'] = _encode_strings(df[column].astype(str).tolist())
+            meta['string_columns'].append(column)
+
+    arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+
+    # Write-then-rename so concurrent readers never see a partial file.
+    os.makedirs(os.path.dirname(catalog_path), exist_ok=True)
+    tmp_path = catalog_path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, catalog_path)
+    return meta
+
+
+class RecipeCatalog:
+    """
+    Read-only recipe table loaded from a catalog written by `build_catalog`.
+
+    Row i everywhere is row i of the source CSV. List columns stay in CSR
+    form; `labels()` materializes Python lists only for the rows asked
+    for, and `multi_hot()` / `sparse_multi_hot()` encode rows straight
+    from the CSR arrays.
+    """
+
+    def __init__(self, catalog_path=CATALOG_PATH):
+        self.catalog_path = catalog_path
+        with np.load(catalog_path) as data:
+            self.meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            n_rows = self.meta['rows']
+            self.names = _decode_strings(data['name_blob'], n_rows)
+
+            self._indptr, self._indices, self._vocab = {}, {}, {}
+            self._column_maps = {}
+            for field, info in self.meta['list_fields'].items():
+                self._indptr[field] = data[f'{field}_indptr']
+                self._indices[field] = data[f'{field}_indices']
+                vocab = data[f'{field}_vocab']
+                self._vocab[field] = vocab if info['vocab'] == 'int' else \
+                    np.array(_decode_strings(vocab, info['size']), dtype=object)
+
+            self.columns = {column: data[f'col_{column}'] for column in self.meta['columns']}
+            for column in self.meta['string_columns']:
+                self.columns[column] = np.array(_decode_strings(data[f'col_{column}'], n_rows), dtype=object)
+
+        if len(self.names) != n_rows:
+            raise Exception(f"Recipe catalog at {catalog_path} is inconsistent.")
+
+    def __len__(self):
+        return len(self.names)
+
+    def is_stale(self, csv_path):
+        """True if the CSV changed since the catalog was built (False without a CSV)."""
+        return sources_changed(self.meta.get('sources'), [csv_path])
+
+    def labels(self, field, positions):
+        """Label lists ('ingredients' or 'tags') for the given rows."""
+        indptr, indices, vocab = self._indptr[field], self._indices[field], self._vocab[field]
+        return [vocab[indices[indptr[p]:indptr[p + 1]]].tolist() for p in positions]
+
+    def ingredient_ids(self, position):
+        return self.labels('ingredients', [position])[0]
+
+    def tags(self, position):
+        return self.labels('tags', [position])[0]
+
+    def _vocab_columns(self, field, classes):
+        """Column in `classes` of every catalog vocabulary entry (-1 if absent), memoized per classes array."""
+        key = (field, id(classes))
+        cached = self._column_maps.get(key)
+        if cached is not None and cached[0] is classes:
+            return cached[1]
+        column_of = {label: j for j, label in enumerate(np.asarray(classes).tolist())}
+        vocab_columns = np.array([column_of.get(label, -1) for label in self._vocab[field].tolist()],
+                                 dtype=np.int64)
+        # Holding `classes` keeps its id from being reused by another array.
+        self._column_maps[key] = (classes, vocab_columns)
+        return vocab_columns
+
+    def _coordinates(self, field, positions, classes):
+        """(rows, columns) of the ones in the multi-hot encoding of the given rows."""
+        positions = np.asarray(positions, dtype=np.intp)
+        indptr, indices = self._indptr[field], self._indices[field]
+        vocab_columns = self._vocab_columns(field, classes)
+
+        starts = indptr[positions]
+        lengths = indptr[positions + 1] - starts
+        rows = np.repeat(np.arange(len(positions)), lengths)
+        flat = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+        columns = vocab_columns[indices[flat]]
+        known = columns >= 0
+        return rows[known], columns[known]
+
+    def multi_hot(self, field, positions, classes):
+        """
+        (len(positions), len(classes)) float32 matrix, like
+        MultiLabelBinarizer(classes).transform(self.labels(field, positions)).
+        Labels not in `classes` are ignored.
+        """
+        rows, columns = self._coordinates(field, positions, classes)
+        out = np.zeros((len(positions), len(classes)), dtype=np.float32)
+        out[rows, columns] = 1.0
+        return out
+
+    def sparse_multi_hot(self, field, positions, classes):
+        """
+        `multi_hot()` as a float32 scipy.sparse CSR matrix. Memory is
+        proportional to the number of labels rather than rows x classes.
+        """
+        import scipy.sparse
+
+        rows, columns = self._coordinates(field, positions, classes)
+        out = scipy.sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                                      shape=(len(positions), len(classes)))
+        # A label listed twice in a row is still a single one.
+        out.sum_duplicates()
+        out.data[:] = 1.0
+        return out
+
+    def to_dataframe(self):
+        """The recipe table in the CSV's shape (list columns as Python lists), indexed by name."""
+        all_rows = range(len(self))
+        df = pd.DataFrame({column: values for column, values in self.columns.items()})
+        for field, info in self.meta['list_fields'].items():
+            df[info['column']] = self.labels(field, all_rows)
+        df.index = pd.Index(self.names, name='name')
+        return df
+
+
+def load_catalog(catalog_path=CATALOG_PATH, csv_path=LOOKUP_PATH, build=True):
+    """
+    Opens the binary recipe catalog. If it is missing or older than the
+    CSV (and `build` is set), it is rebuilt from the CSV first, so the
+    slow parse happens once rather than at every startup.
+    """
+    catalog = None
+    if os.path.exists(catalog_path):
+        catalog = RecipeCatalog(catalog_path)
+        if catalog.is_stale(csv_path) and build and os.path.exists(csv_path):
+            print(f"Recipe catalog at {catalog_path} is stale; rebuilding it from {os.path.basename(csv_path)}.")
+            catalog = None
+    if catalog is None:
+        if not build:
+            return None
+        print(f"Building recipe catalog from {os.path.basename(csv_path)}...")
+        build_catalog(csv_path, catalog_path)
+        catalog = RecipeCatalog(catalog_path)
+    return catalog
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert the processed recipe CSV into a binary catalog.")
+    parser.add_argument('--csv', default=LOOKUP_PATH)
+    parser.add_argument('--output', default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    print("--- Building V2 recipe catalog ---")
+    meta = build_catalog(args.csv, args.output)
+    sizes = ', '.join(f"{info['size']} {field}" for field, info in meta['list_fields'].items())
+    print(f"Recipe catalog written to {args.output} ({meta['rows']} rows, {sizes}).")
@@ -0,0 +1,153 @@
+import difflib
+from array import array
+from collections import Counter, namedtuple
+
+NameMatch = namedtuple('NameMatch', ['position', 'name', 'score', 'kind'])
+
+
+class RecipeNameIndex:
+    """
+    Precomputed dish-name index over the recipe lookup table.
+
+    Built once at startup so resolving a query no longer lowercases and
+    scans every recipe name per request. It keeps three structures:
+    an exact-match hash on the lowercased name, an n-gram inverted index
+    for substring queries, and a fuzzy fallback ranked by shared n-grams.
+    The fuzzy fallback counts the query's rarest n-grams first and stops
+    at `max_fuzzy_postings` posting entries, so a common n-gram (" pi"
+    in a million recipes) doesn't make one lookup scan the catalog.
+
+    Positions returned are row positions in the table the names came
+    from, so callers use `recipe_lookup.iloc[position]`.
+    """
+
+    def __init__(self, names, ngram=3, max_candidates=2000, fuzzy_cutoff=0.6,
+                 max_fuzzy_postings=50000):
+        self.names = [str(name) for name in names]
+        self.ngram = ngram
+        self.max_candidates = max_candidates
+        self.max_fuzzy_postings = max_fuzzy_postings
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self._lower = [name.lower() for name in self.names]
+        self._exact = {}
+        self._postings = {}
+        for pos, name in enumerate(self._lower):
+            self._exact.setdefault(name, pos)
+            for gram in set(self._grams(name)):
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array('I')
+                postings.append(pos)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _grams(self, text):
+        n = self.ngram
+        return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+    def get(self, name):
+        """Exact (case-insensitive) lookup. Returns a row position or None."""
+        return self._exact.get(str(name).strip().lower())
+
+    def _substring_positions(self, query):
+        """Yields positions whose name contains `query`, in table order."""
+        grams = self._grams(query)
+        if not grams:
+            # Query shorter than the n-gram size: scan the cached lowercase names.
+            return (pos for pos, name in enumerate(self._lower) if query in name)
+
+        postings = [self._postings.get(gram) for gram in set(grams)]
+        if any(p is None for p in postings):
+            return iter(())
+        rarest = min(postings, key=len)
+        return (pos for pos in rarest if query in self._lower[pos])
+
+    def _fuzzy(self, query, limit):
+        postings = sorted((p for p in map(self._postings.get, set(self._grams(query))) if p),
+                          key=len)
+        shared = Counter()
+        budget = self.max_fuzzy_postings
+        for i, p in enumerate(postings):
+            if len(p) > budget:
+                if i == 0:
+                    # Even the rarest n-gram is common: rank a bounded slice of it.
+                    shared.update(p[:budget])
+                break
+            shared.update(p)
+            budget -= len(p)
+        if shared:
+            candidates = [pos for pos, _ in shared.most_common(self.max_candidates)]
+        else:
+            candidates = range(min(len(self._lower), self.max_candidates))
+
+        scored = []
+        for pos in candidates:
+            ratio = difflib.SequenceMatcher(None, query, self._lower[pos]).ratio()
+            if ratio >= self.fuzzy_cutoff:
+                scored.append((ratio, pos))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [NameMatch(pos, self.names[pos], ratio, 'fuzzy') for ratio, pos in scored[:limit]]
+
+    def search(self, query, limit=5):
+        """
+        Returns up to `limit` ranked matches for `query`.
+
+        Exact matches rank first, then substring matches (prefix matches
+        and shorter names first), then fuzzy matches if nothing contains
+        the query.
+        """
+        query = str(query).strip().lower()
+        if not query:
+            return []
+
+        matches = []
+        exact_pos = self._exact.get(query)
+        if exact_pos is not None:
+            matches.append(NameMatch(exact_pos, self.names[exact_pos], 1.0, 'exact'))
+
+        substring = []
+        for pos in self._substring_positions(query):
+            if pos != exact_pos:
+                substring.append(pos)
+            if len(substring) >= self.max_candidates:
+                break
+        substring.sort(key=lambda pos: (not self._lower[pos].startswith(query), len(self._lower[pos]), pos))
+        for pos in substring[:max(limit - len(matches), 0)]:
+            score = len(query) / len(self._lower[pos])
+            kind = 'prefix' if self._lower[pos].startswith(query) else 'substring'
+            matches.append(NameMatch(pos, self.names[pos], score, kind))
+
+        if not matches:
+            matches = self._fuzzy(query, limit)
+        return matches[:limit]
+
+    def resolve(self, query, prefer_exact=False, fuzzy=True):
+        """
+        Resolves a user query to a single recipe.
+
+        Keeps the original "first match" semantics: the first recipe in
+        table order whose lowercased name contains the query. With
+        `prefer_exact`, an exact name match wins over that. Falls back to
+        the best fuzzy match when nothing contains the query. Returns a
+        NameMatch or None.
+        """
+        query = str(query).strip().lower()
+        if not query:
+            return None
+
+        if prefer_exact:
+            pos = self._exact.get(query)
+            if pos is not None:
+                return NameMatch(pos, self.names[pos], 1.0, 'exact')
+
+        for pos in self._substring_positions(query):
+            kind = 'exact' if self._lower[pos] == query else 'substring'
+            return NameMatch(pos, self.names[pos], len(query) / len(self._lower[pos]), kind)
+
+        if fuzzy:
+            fuzzy_matches = self._fuzzy(query, 1)
+            if fuzzy_matches:
+                return fuzzy_matches[0]
+        return None
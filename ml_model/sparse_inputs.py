@@ -0,0 +1,83 @@
+import numpy as np
+
+# Multi-hot inputs of the V2 predictor. Their first layer is a Dense
+# layer, so a sparse input computes the same embedding-bag sum over the
+# active rows of its kernel, without the zeros.
+SPARSE_INPUT_NAMES = ('ingredient_input', 'tag_input')
+
+
+def input_name(tensor):
+    # Keras names input tensors after their InputLayer, sometimes with a suffix.
+    return tensor.name.split(':')[0]
+
+
+def to_sparse_model(model, sparse_inputs=SPARSE_INPUT_NAMES):
+    """
+    A model that takes `sparse_inputs` as sparse tensors (scipy.sparse
+    matrices work for predict() and fit()) and shares every layer and
+    weight with `model`. Fitting it trains `model`, so callers keep
+    saving `model`, which still has the dense input signature that
+    app.py and the model registry expect.
+    """
+    from tensorflow import keras
+
+    inputs = []
+    for tensor in model.inputs:
+        name = input_name(tensor)
+        inputs.append(keras.Input(shape=tuple(tensor.shape[1:]), dtype=tensor.dtype, name=name,
+                                  sparse=name in sparse_inputs))
+    outputs = model(inputs)
+    return keras.Model(inputs=inputs, outputs=outputs, name=f'{model.name}_sparse')
+
+
+class CompiledModel:
+    """
+    Runs a Keras model as one compiled tf.function call per batch, with
+    scipy.sparse inputs converted to tf.SparseTensor. model.predict()
+    builds an input pipeline on every call, which for the one-row
+    batches the API serves costs far more than the model itself, and
+    more still with sparse inputs. Same `predict(X, verbose=0)` and
+    `inputs` interface as the Keras model.
+    """
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        self.inputs = model.inputs
+        self._call = tf.function(lambda inputs: model(inputs, training=False), reduce_retracing=True)
+
+    def _tensor(self, array):
+        import tensorflow as tf
+
+        if hasattr(array, 'tocsr'):
+            # SparseTensor needs its entries in row-major order.
+            csr = array.tocsr()
+            if not csr.has_sorted_indices:
+                csr = csr.sorted_indices()
+            coo = csr.tocoo()
+            indices = np.column_stack([coo.row, coo.col]).astype(np.int64)
+            return tf.SparseTensor(indices, coo.data.astype(np.float32), coo.shape)
+        return tf.convert_to_tensor(np.asarray(array, dtype=np.float32))
+
+    def predict(self, inputs, verbose=0):
+        outputs = self._call([self._tensor(array) for array in inputs])
+        return [np.asarray(output) for output in outputs]
+
+
+def is_sparse_input(tensor):
+    return bool(getattr(tensor, 'sparse', False))
+
+
+def dummy_inputs(model, rows=1):
+    """All-zero inputs for warming `model`, sparse where the model expects sparse."""
+    import scipy.sparse
+
+    dummy = []
+    for tensor in model.inputs:
+        shape = (rows,) + tuple(tensor.shape[1:])
+        if is_sparse_input(tensor):
+            dummy.append(scipy.sparse.csr_matrix(shape, dtype=np.float32))
+        else:
+            dummy.append(np.zeros(shape, dtype=np.float32))
+    return dummy
@@ -0,0 +1,394 @@
+"""
+Closed-loop load generator for the Smart Oven API.
+
+Virtual ovens (one thread each, built on SimulatedOven) repeatedly run the
+full cooking loop against a running API:
+
+    /predict (or /classify_image)  ->  simulated cook  ->  /feedback
+
+Sessions arrive as a Poisson process at --rate per second (or, with
+--rate 0, every oven starts its next session as soon as the last one
+ends). Dishes are drawn from a Zipf or uniform popularity distribution
+over the recipe catalog. The feedback rating comes from comparing the
+simulated cook with a hidden "ideal" setting per dish, so the outcome
+depends on how good the prediction was.
+
+Reports throughput, error rate and latency percentiles per endpoint as
+JSON. Pass --server flask|async|prefork to start a local server on a
+scratch database, or --url to target one that is already running.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import socket
+import random
+import bisect
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlparse
+
+from oven_simulation import SimulatedOven
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
+API_DIR = os.path.join(PROJECT_ROOT, 'api')
+
+FLASK_SERVER = r'''
+import sys, app
+app.init_db()
+app.components.warm(background=False)
+app.app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)
+'''
+
+PERFECT_BAND = 0.10  # cooks within +-10% of the ideal doneness are rated perfect
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, env, workers):
+    if kind == 'flask':
+        cmd = [sys.executable, '-c', FLASK_SERVER, str(port)]
+    elif kind == 'async':
+        cmd = [sys.executable, '-m', 'uvicorn', 'app_async:app', '--host', '127.0.0.1',
+               '--port', str(port), '--log-level', 'warning', '--no-access-log']
+    elif kind == 'prefork':
+        cmd = [sys.executable, 'serve_prefork.py', '--workers', str(workers), '--port', str(port)]
+    else:
+        raise ValueError(f"Unknown server kind '{kind}'.")
+    return subprocess.Popen(cmd, cwd=API_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def load_dish_names(limit):
+    sys.path.append(os.path.join(PROJECT_ROOT, 'ml_model'))
+    from recipe_catalog import load_catalog
+    return load_catalog().names[:limit]
+
+
+class Popularity:
+    """Draws dish indices uniformly or from a Zipf(s) distribution over rank."""
+
+    def __init__(self, n_dishes, kind='zipf', s=1.1):
+        self.n_dishes = n_dishes
+        self.cumulative = None
+        if kind == 'zipf':
+            weights = [1.0 / (rank ** s) for rank in range(1, n_dishes + 1)]
+            total = sum(weights)
+            self.cumulative = []
+            acc = 0.0
+            for w in weights:
+                acc += w / total
+                self.cumulative.append(acc)
+
+    def sample(self, rng):
+        if self.cumulative is None:
+            return rng.randrange(self.n_dishes)
+        return min(bisect.bisect_left(self.cumulative, rng.random()), self.n_dishes - 1)
+
+
+def ideal_setting(dish_name):
+    """Hidden per-dish (temp_f, duration_min) the synthetic outcomes are judged against."""
+    digest = hashlib.sha256(dish_name.encode('utf-8')).digest()
+    return 325 + 25 * (digest[0] % 6), 15 + digest[1] % 60
+
+
+def doneness(target_temp_f, duration_min, max_seconds=4 * 3600):
+    """Degree-seconds above 100 C over a simulated cook."""
+    oven = SimulatedOven(verbose=False)
+    oven.start_cooking(target_temp_f=target_temp_f, duration_min=duration_min)
+    total = 0.0
+    for _ in range(min(int(duration_min * 60), max_seconds)):
+        oven.get_sensor_values()
+        total += max(0.0, oven.current_temp - 100.0)
+    return total
+
+
+class OutcomeModel:
+    """Rates a cook 1 (perfect), 0 (undercooked) or -1 (overcooked)."""
+
+    def __init__(self, noise=0.05):
+        self.noise = noise
+        self._ideal = {}
+
+    def rate(self, dish_name, temp_f, duration_min, rng):
+        if dish_name not in self._ideal:
+            self._ideal[dish_name] = doneness(*ideal_setting(dish_name))
+        ideal = self._ideal[dish_name]
+        ratio = doneness(temp_f, duration_min) / ideal if ideal > 0 else 1.0
+        ratio *= rng.lognormvariate(0.0, self.noise)
+        if ratio < 1.0 - PERFECT_BAND:
+            return 0
+        if ratio > 1.0 + PERFECT_BAND:
+            return -1
+        return 1
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.outcomes = {1: 0, 0: 0, -1: 0}
+        self.sessions = 0
+        self.queue_delays = []
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            if ok:
+                self.latencies.setdefault(endpoint, []).append(seconds)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def session_done(self, outcome, queue_delay):
+        with self._lock:
+            self.sessions += 1
+            self.queue_delays.append(queue_delay)
+            if outcome is not None:
+                self.outcomes[outcome] += 1
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def summarize(values, errors, elapsed):
+    values = sorted(values)
+    total = len(values) + errors
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': errors / total if total else 0.0,
+        'requests_per_second': total / elapsed,
+        'p50_ms': 1000 * percentile(values, 0.50) if values else None,
+        'p90_ms': 1000 * percentile(values, 0.90) if values else None,
+        'p99_ms': 1000 * percentile(values, 0.99) if values else None,
+        'max_ms': 1000 * values[-1] if values else None,
+    }
+
+
+class ApiClient:
+    def __init__(self, host, port, stats, timeout=60):
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.timeout = timeout
+
+    def post(self, endpoint, body, content_type='application/json'):
+        """Returns the decoded JSON response, or None on any failure."""
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request('POST', endpoint, body=body, headers={'Content-Type': content_type})
+                response = conn.getresponse()
+                payload = response.read()
+                ok = response.status < 300
+            finally:
+                conn.close()
+        except OSError:
+            payload, ok = None, False
+        self.stats.record(endpoint, time.perf_counter() - start, ok)
+        return json.loads(payload) if ok else None
+
+    def post_json(self, endpoint, data):
+        return self.post(endpoint, json.dumps(data))
+
+    def post_image(self, endpoint, filename, img_bytes):
+        boundary = uuid.uuid4().hex
+        body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8') + img_bytes + \
+               f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        return self.post(endpoint, body, content_type=f'multipart/form-data; boundary={boundary}')
+
+
+def run_session(client, args, dishes, popularity, images, outcome_model, rng):
+    """One predict -> cook -> feedback cycle. Returns the rating or None."""
+    room_temp = round(rng.uniform(15.0, 30.0), 1)
+    room_humidity = round(rng.uniform(30.0, 70.0), 1)
+
+    if images and rng.random() < args.image_fraction:
+        filename, img_bytes = images[rng.randrange(len(images))]
+        prediction = client.post_image('/classify_image', filename, img_bytes)
+        if prediction is None:
+            return None
+        dish_name = prediction['classified_dish']
+    else:
+        dish_name = dishes[popularity.sample(rng)]
+        prediction = client.post_json('/predict', {'dish_name': dish_name, 'room_temp': room_temp,
+                                                   'room_humidity': room_humidity})
+        if prediction is None:
+            return None
+
+    temp_f, duration_min = prediction['predicted_temp'], prediction['predicted_duration']
+    if args.cook_speed > 0:
+        time.sleep(duration_min * 60 / args.cook_speed)
+    rating = outcome_model.rate(dish_name, temp_f, duration_min, rng)
+
+    if rng.random() < args.feedback_fraction:
+        client.post_json('/feedback', {'dish_name': dish_name, 'room_temp': room_temp,
+                                       'room_humidity': room_humidity, 'predicted_temp': temp_f,
+                                       'predicted_duration': duration_min, 'user_feedback': rating})
+    return rating
+
+
+def run_load(args, host, port, dishes, images):
+    stats = Stats()
+    client = ApiClient(host, port, stats)
+    popularity = Popularity(len(dishes), args.popularity, args.zipf_s)
+    outcome_model = OutcomeModel()
+    sessions = queue.Queue()
+    deadline = time.perf_counter() + args.duration
+
+    def oven_worker(oven_id):
+        rng = random.Random(args.seed * 100003 + oven_id)
+        while True:
+            if args.rate > 0:
+                arrived_at = sessions.get()
+                if arrived_at is None:
+                    return
+            else:
+                if time.perf_counter() >= deadline:
+                    return
+                arrived_at = time.perf_counter()
+            queue_delay = time.perf_counter() - arrived_at
+            rating = run_session(client, args, dishes, popularity, images, outcome_model, rng)
+            stats.session_done(rating, queue_delay)
+
+    workers = [threading.Thread(target=oven_worker, args=(i,), daemon=True) for i in range(args.ovens)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+
+    if args.rate > 0:
+        rng = random.Random(args.seed)
+        next_arrival = start
+        while True:
+            next_arrival += rng.expovariate(args.rate)
+            if next_arrival >= deadline:
+                break
+            time.sleep(max(0.0, next_arrival - time.perf_counter()))
+            sessions.put(time.perf_counter())
+        for _ in workers:
+            sessions.put(None)
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    endpoints = sorted(set(stats.latencies) | set(stats.errors))
+    delays = sorted(stats.queue_delays)
+    return {
+        'elapsed_s': elapsed,
+        'sessions': stats.sessions,
+        'sessions_per_second': stats.sessions / elapsed,
+        'session_queue_delay_p50_ms': 1000 * percentile(delays, 0.5) if delays else None,
+        'session_queue_delay_p99_ms': 1000 * percentile(delays, 0.99) if delays else None,
+        'outcomes': {'perfect': stats.outcomes[1], 'undercooked': stats.outcomes[0],
+                     'overcooked': stats.outcomes[-1]},
+        'endpoints': {endpoint: summarize(stats.latencies.get(endpoint, []),
+                                          stats.errors.get(endpoint, 0), elapsed)
+                      for endpoint in endpoints},
+    }
+
+
+def wait_ready(host, port, proc, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError("Server exited during startup.")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request('GET', '/readyz')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("Server did not become ready.")
+
+
+def load_images(directory):
+    if not directory:
+        return []
+    images = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.jpg', '.jpeg', '.png')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                images.append((name, f.read()))
+    return images
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive the predict -> cook -> feedback loop from virtual ovens.")
+    parser.add_argument('--server', choices=['flask', 'async', 'prefork'], default='flask',
+                        help="Local server to start (ignored with --url).")
+    parser.add_argument('--url', help="Target an already running API, e.g. http://127.0.0.1:5000.")
+    parser.add_argument('--workers', type=int, default=4, help="Workers for --server prefork.")
+    parser.add_argument('--ovens', type=int, default=32, help="Virtual ovens (concurrent sessions).")
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help="Session arrivals per second (Poisson); 0 = closed loop.")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to generate load.")
+    parser.add_argument('--popularity', choices=['zipf', 'uniform'], default='zipf')
+    parser.add_argument('--zipf-s', type=float, default=1.1)
+    parser.add_argument('--dishes', type=int, default=1000, help="Use the first N catalog dishes.")
+    parser.add_argument('--images', help="Directory of dish photos for /classify_image sessions.")
+    parser.add_argument('--image-fraction', type=float, default=0.2)
+    parser.add_argument('--feedback-fraction', type=float, default=1.0)
+    parser.add_argument('--cook-speed', type=float, default=0.0,
+                        help="Simulated seconds per real second while cooking (0 = no waiting).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    dishes = load_dish_names(args.dishes)
+    images = load_images(args.images)
+
+    proc = None
+    tmp = tempfile.TemporaryDirectory()
+    try:
+        if args.url:
+            target = urlparse(args.url)
+            host, port = target.hostname, target.port or 80
+        else:
+            host, port = '127.0.0.1', free_port()
+            env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3', OVEN_MODEL_WATCH_INTERVAL_S='0',
+                       OVEN_DB_PATH=os.path.join(tmp.name, 'oven_logs.db'))
+            print(f"Starting {args.server} server on port {port}...", file=sys.stderr)
+            proc = start_server(args.server, port, env, args.workers)
+        wait_ready(host, port, proc)
+        print(f"Running {args.ovens} ovens for {args.duration:.0f}s...", file=sys.stderr)
+        report = dict(run_load(args, host, port, dishes, images),
+                      server=args.url or args.server, ovens=args.ovens, rate=args.rate,
+                      popularity=args.popularity)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        tmp.cleanup()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
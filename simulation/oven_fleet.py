@@ -0,0 +1,159 @@
+import time
+import argparse
+import numpy as np
+
+ROOM_TEMP_C = 20.0
+ROOM_HUMIDITY = 45.0
+
+
+class OvenFleet:
+    """
+    Many simulated ovens stepped together.
+
+    Holds the state of every oven in NumPy arrays and advances all of them
+    by one second per `step()` with the same update rules, in the same
+    order and with the same float64 arithmetic as `SimulatedOven`, so a
+    single oven produces exactly the same readings. Time only moves when
+    `step()` is called, so runs can go as fast as the CPU allows, or be
+    paced with `run(..., speed=...)`.
+    """
+
+    def __init__(self, n_ovens, room_temp=ROOM_TEMP_C, room_humidity=ROOM_HUMIDITY):
+        self.n_ovens = n_ovens
+        self.current_temp = np.full(n_ovens, room_temp, dtype=np.float64)
+        self.current_humidity = np.full(n_ovens, room_humidity, dtype=np.float64)
+        self.relay_on = np.zeros(n_ovens, dtype=bool)
+        self.cook_time_remaining_s = np.zeros(n_ovens, dtype=np.float64)
+        self.target_temp = np.full(n_ovens, room_temp, dtype=np.float64)
+        self.is_cooking = np.zeros(n_ovens, dtype=bool)
+        self.elapsed_s = 0
+
+    def __len__(self):
+        return self.n_ovens
+
+    def start_cooking(self, ovens, target_temp_f, duration_min):
+        """
+        Starts the given ovens (an index, list, slice or boolean mask).
+        `target_temp_f` and `duration_min` are scalars or per-oven arrays.
+        """
+        target_temp_f = np.asarray(target_temp_f, dtype=np.float64)
+        self.target_temp[ovens] = (target_temp_f - 32) * 5.0 / 9.0
+        self.cook_time_remaining_s[ovens] = np.asarray(duration_min, dtype=np.float64) * 60
+        self.relay_on[ovens] = True
+        self.is_cooking[ovens] = True
+
+    def stop_cooking(self, ovens):
+        self.relay_on[ovens] = False
+        self.is_cooking[ovens] = False
+        self.cook_time_remaining_s[ovens] = 0
+
+    def step(self):
+        """
+        Advances every oven by one second. Returns the indices of the
+        ovens that finished cooking during this second.
+        """
+        temp = self.current_temp
+        heating = self.relay_on
+        below = heating & (temp < self.target_temp)
+        settling = heating & ~below
+        cooling = ~heating & (temp > 20.0)
+
+        temp[below] += 5.0
+        temp[settling] += (self.target_temp[settling] - temp[settling]) * 0.1
+        temp[cooling] -= 1.0
+
+        drying = heating & (self.current_humidity > 15.0)
+        self.current_humidity[drying] -= 0.1
+
+        counting = self.is_cooking & (self.cook_time_remaining_s > 0)
+        self.cook_time_remaining_s[counting] -= 1
+        finished = counting & (self.cook_time_remaining_s == 0)
+        self.relay_on[finished] = False
+        self.is_cooking[finished] = False
+
+        self.elapsed_s += 1
+        return np.flatnonzero(finished)
+
+    def run(self, seconds, speed=None, callback=None):
+        """
+        Steps the fleet `seconds` times. With `speed`, paces the run at
+        that many simulated seconds per wall-clock second (1.0 = real
+        time); without it, runs as fast as possible. `callback(fleet,
+        finished)` is called after every step. Returns the indices of all
+        ovens that finished during the run.
+        """
+        finished = []
+        start = time.perf_counter()
+        for i in range(seconds):
+            done = self.step()
+            if len(done):
+                finished.append(done)
+            if callback is not None:
+                callback(self, done)
+            if speed:
+                delay = start + (i + 1) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        return np.concatenate(finished) if finished else np.empty(0, dtype=np.intp)
+
+    def sensor_arrays(self):
+        """Unrounded state of every oven as arrays."""
+        return {
+            "temperature_c": self.current_temp.copy(),
+            "humidity_percent": self.current_humidity.copy(),
+            "relay_on": self.relay_on.copy(),
+            "time_remaining_s": self.cook_time_remaining_s.copy(),
+            "is_cooking": self.is_cooking.copy(),
+        }
+
+    def get_sensor_values(self, oven):
+        """The reading of one oven, in `SimulatedOven.get_sensor_values()` format."""
+        remaining = float(self.cook_time_remaining_s[oven])
+        return {
+            "temperature_c": round(float(self.current_temp[oven]), 2),
+            "humidity_percent": round(float(self.current_humidity[oven]), 2),
+            "relay_state": "ON" if self.relay_on[oven] else "OFF",
+            "time_remaining_s": int(remaining) if remaining.is_integer() else remaining,
+            "is_cooking": bool(self.is_cooking[oven]),
+        }
+
+
+def check_against_single_oven(target_temp_f=400, duration_min=1, seconds=200):
+    """True if a one-oven fleet reproduces SimulatedOven reading for reading."""
+    from oven_simulation import SimulatedOven
+
+    oven = SimulatedOven(verbose=False)
+    oven.start_cooking(target_temp_f=target_temp_f, duration_min=duration_min)
+    expected = [oven.get_sensor_values() for _ in range(seconds)]
+
+    fleet = OvenFleet(1)
+    fleet.start_cooking(0, target_temp_f, duration_min)
+    actual = []
+    for _ in range(seconds):
+        fleet.step()
+        actual.append(fleet.get_sensor_values(0))
+    return actual == expected
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a fleet of simulated ovens faster than real time.")
+    parser.add_argument('--ovens', type=int, default=10000)
+    parser.add_argument('--seconds', type=int, default=3600)
+    parser.add_argument('--speed', type=float, default=None,
+                        help="Simulated seconds per wall-clock second (default: as fast as possible).")
+    args = parser.parse_args()
+
+    print("--- Running Oven Fleet Simulation ---")
+    print(f"Matches SimulatedOven for a single oven: {check_against_single_oven()}")
+
+    rng = np.random.default_rng(0)
+    fleet = OvenFleet(args.ovens)
+    fleet.start_cooking(slice(None), rng.choice([325, 350, 375, 400, 425], args.ovens),
+                        rng.integers(10, 60, args.ovens))
+
+    start = time.perf_counter()
+    finished = fleet.run(args.seconds, speed=args.speed)
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {args.ovens} ovens for {args.seconds}s in {elapsed:.2f}s "
+          f"({args.ovens * args.seconds / elapsed:,.0f} oven-seconds/s, "
+          f"{args.seconds / elapsed:,.0f}x real time); {len(finished)} finished cooking.")
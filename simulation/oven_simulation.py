@@ -7,7 +7,8 @@ class SimulatedOven:
     the cooking process over time.
     """
     
-    def __init__(self):
+    def __init__(self, verbose=True):
+        self.verbose = verbose
         self.current_temp = 20.0     # Start at room temp (C)
         self.current_humidity = 45.0   # Start at room humidity (%)
         self.relay_state = "OFF"     # Heating element
@@ -26,14 +27,16 @@ class SimulatedOven:
         self.relay_state = "ON"
         self.is_cooking = True
         
-        print(f"[OVEN_SIM] STARTING. Target: {self.target_temp:.0f}°C ({target_temp_f}°F) for {duration_min} min.")
+        if self.verbose:
+            print(f"[OVEN_SIM] STARTING. Target: {self.target_temp:.0f}°C ({target_temp_f}°F) for {duration_min} min.")
 
     def stop_cooking(self):
         """Public command to stop the oven."""
         self.relay_state = "OFF"
         self.is_cooking = False
         self.cook_time_remaining_s = 0
-        print("[OVEN_SIM] STOPPED MANUALLY.")
+        if self.verbose:
+            print("[OVEN_SIM] STOPPED MANUALLY.")
         
     def get_sensor_values(self):
         """
@@ -56,7 +59,8 @@ class SimulatedOven:
             self.cook_time_remaining_s -= 1
             
             if self.cook_time_remaining_s == 0:
-                print("[OVEN_SIM] COOKING COMPLETE. DING!")
+                if self.verbose:
+                    print("[OVEN_SIM] COOKING COMPLETE. DING!")
                 self.relay_state = "OFF"
                 self.is_cooking = False
 